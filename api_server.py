@@ -0,0 +1,388 @@
+"""
+Local JSON API for screening, separate from the Streamlit UI.
+
+Other tools can run screens and look up metrics over HTTP and share this
+process's warm caches (fundamentals, bars, indicators) instead of each
+scanning the universe on their own:
+
+    GET  /health
+    GET  /screen?max_pe=20&top=10        screen (or rank with top) the universe
+    POST /screen                         same, with a JSON body:
+                                         {"params": {...}, "tickers": [...],
+                                          "top": 10, "weights": {...}}
+    GET  /metrics/<symbol>?timeframe=1h  every screening metric, unfiltered
+    GET  /info/<symbol>                  get_stock_info (info and 1y of bars)
+
+Handlers are coroutines on one asyncio event loop, built on the standard
+library; the blocking screener calls run in a thread pool, and at most
+MAX_SCANS screens run at once. Identical requests in flight are coalesced
+into one computation, and responses are kept for CACHE_DURATION (longer
+while the market is closed, as for the data caches) with an ETag, so a
+client revalidating with If-None-Match gets 304 Not Modified. There is no
+authentication: bind it to localhost.
+
+    python api_server.py --port 8600
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from config import get_config
+from data_cache import ByteLRU
+from market_calendar import still_current
+from scoring import MARGINS, run_scored_screening
+from screens import PARAM_CHOICES, coerce_param, screen_params
+from stock_screener import DEFAULT_PARAMS, fetch_ticker_metrics, get_stock_info, run_stock_screening
+from validation import RunReport
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8600
+MAX_SCANS = 2
+THREADS = 8
+MAX_BODY_BYTES = 1024 * 1024
+RESPONSE_CACHE_BYTES = 64 * 1024 * 1024
+READ_TIMEOUT = 30
+
+SYMBOL = re.compile(r'^[A-Za-z0-9.\-^=]{1,15}$')
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class ApiError(Exception):
+    """A request the API can't serve, answered with status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _jsonable(value):
+    """Convert screener output (numpy scalars, NaN, frames, timestamps) to plain JSON types."""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient='split', date_format='iso'))
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _coerce(key, value):
+    """coerce_param with invalid values answered by 400."""
+    try:
+        return coerce_param(key, value)
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+
+def parse_screen_request(query, body):
+    """
+    Screening request from a query string and/or JSON body
+
+    Returns:
+        dict: params (full), tickers (list or None), top (int or None) and
+        weights (dict)
+
+    Raises:
+        ApiError: For unknown parameters or invalid values
+    """
+    request = dict(body or {})
+    overrides = request.pop('params', None) or {}
+    if not isinstance(overrides, dict):
+        raise ApiError(400, "params must be an object")
+    overrides = dict(overrides)
+    for key, value in query.items():
+        if key in ('tickers', 'top', 'weights'):
+            request.setdefault(key, value)
+        elif key in DEFAULT_PARAMS:
+            overrides[key] = value
+        else:
+            raise ApiError(400, f"Unknown parameter '{key}'")
+    unknown = sorted(set(request) - {'tickers', 'top', 'weights'})
+    if unknown:
+        raise ApiError(400, f"Unknown field(s): {', '.join(unknown)}")
+
+    # Query text and JSON values alike (screen_params rejects unknown keys)
+    for key, value in overrides.items():
+        if key in DEFAULT_PARAMS:
+            overrides[key] = _coerce(key, value)
+    overrides.setdefault('enable_finviz', get_config().enable_finviz)
+    try:
+        params = screen_params(overrides)
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+    tickers = request.get('tickers')
+    if isinstance(tickers, str):
+        tickers = [t.strip().upper() for t in tickers.split(',') if t.strip()]
+    if tickers is not None and not (isinstance(tickers, list) and all(map(SYMBOL.match, map(str, tickers)))):
+        raise ApiError(400, "tickers must be a list (or comma-separated string) of symbols")
+
+    top = request.get('top')
+    if top is not None:
+        try:
+            top = int(top)
+        except (TypeError, ValueError):
+            raise ApiError(400, f"Invalid top: '{top}'")
+        if top < 1:
+            raise ApiError(400, "top must be at least 1")
+
+    weights = request.get('weights') or {}
+    if isinstance(weights, str):
+        weights = dict(item.partition('=')[::2] for item in weights.split(',') if item.strip())
+    if weights and top is None:
+        raise ApiError(400, "weights need top")
+    try:
+        weights = {name: float(value) for name, value in weights.items()}
+    except (TypeError, ValueError, AttributeError):
+        raise ApiError(400, "weights must map criteria to numbers")
+    unknown = sorted(set(weights) - set(MARGINS))
+    if unknown:
+        raise ApiError(400, f"Unknown criteria in weights: {', '.join(unknown)}")
+    return {'params': params, 'tickers': tickers, 'top': top, 'weights': weights}
+
+
+def run_screen_request(request):
+    """Run a parsed screening request (blocking) and describe its result."""
+    report = RunReport()
+    if request['top'] is not None:
+        results = run_scored_screening(request['params'], k=request['top'], weights=request['weights'],
+                                       tickers=request['tickers'], report=report)
+    else:
+        results = run_stock_screening(request['params'], tickers=request['tickers'], report=report)
+    return {
+        'run_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'count': len(results),
+        'results': results,
+        'params': request['params'],
+        'data_quality': report.summary(),
+        'quarantined': report.quarantined,
+    }
+
+
+def ticker_metrics(symbol, timeframe='1d', enable_finviz=False):
+    """Every screening metric of one ticker (blocking)."""
+    metrics, _ = fetch_ticker_metrics(symbol, enable_finviz=enable_finviz, timeframe=timeframe)
+    if metrics is None:
+        raise ApiError(404, f"No quote for {symbol}")
+    return {'symbol': symbol, 'timeframe': timeframe, 'metrics': metrics}
+
+
+def stock_info(symbol):
+    """get_stock_info for one ticker (blocking)."""
+    details = get_stock_info(symbol)
+    if details is None:
+        raise ApiError(404, f"No data for {symbol}")
+    return dict(details, symbol=symbol)
+
+
+class ApiServer:
+    """
+    Request handling: routing, coalescing and the response cache
+
+    Args:
+        ttl (float): Seconds responses are served from the cache (defaults
+            to CACHE_DURATION)
+        max_scans (int): Screens allowed to run concurrently
+        threads (int): Threads for blocking screener calls
+    """
+
+    def __init__(self, ttl=None, max_scans=MAX_SCANS, threads=THREADS):
+        self.ttl = get_config().cache_duration if ttl is None else ttl
+        self.max_scans = max_scans
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='api')
+        self._responses = ByteLRU(RESPONSE_CACHE_BYTES, sizeof=lambda entry: len(entry[1]))
+        self._inflight = {}
+        self._scans = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _compute(self, key, fn, args, scan):
+        if scan:
+            if self._scans is None:
+                self._scans = asyncio.Semaphore(self.max_scans)
+            async with self._scans:
+                value = await self._run(fn, *args)
+        else:
+            value = await self._run(fn, *args)
+        body = json.dumps(_jsonable(value), ensure_ascii=False).encode()
+        entry = (time.time(), body, f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+        self._responses.put(key, entry)
+        return entry
+
+    async def cached(self, key, fn, *args, scan=False):
+        """
+        Response for key: cached if fresh, else computed once for every
+        concurrent request with the same key
+
+        Returns:
+            tuple: (time computed, JSON body bytes, ETag)
+        """
+        entry = self._responses.get(key)
+        if entry is not None and still_current(entry[0], self.ttl):
+            return entry
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, fn, args, scan))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A client hanging up doesn't cancel the work others are waiting on
+        return await asyncio.shield(task)
+
+    async def handle(self, method, target, headers, body):
+        """
+        Answer one request
+
+        Returns:
+            tuple: (status, extra headers dict, body bytes)
+        """
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if method not in ('GET', 'HEAD', 'POST'):
+                raise ApiError(405, f"Method {method} not allowed")
+            if method == 'POST' and parts != ['screen']:
+                raise ApiError(405, "Only /screen accepts POST")
+
+            if parts == ['health']:
+                return 200, {}, b'{"status": "ok"}'
+            if parts == ['screen']:
+                payload = None
+                if body:
+                    try:
+                        payload = json.loads(body)
+                    except ValueError as e:
+                        raise ApiError(400, f"Invalid JSON body: {e}")
+                    if not isinstance(payload, dict):
+                        raise ApiError(400, "JSON body must be an object")
+                request = parse_screen_request(query, payload)
+                key = 'screen:' + json.dumps(_jsonable(request), sort_keys=True)
+                entry = await self.cached(key, run_screen_request, request, scan=True)
+            elif len(parts) == 2 and parts[0] in ('metrics', 'info'):
+                symbol = parts[1].upper()
+                if not SYMBOL.match(symbol):
+                    raise ApiError(400, f"Invalid symbol '{parts[1]}'")
+                if parts[0] == 'metrics':
+                    timeframe = query.get('timeframe', '1d')
+                    if timeframe not in PARAM_CHOICES['timeframe']:
+                        raise ApiError(400, f"Invalid timeframe '{timeframe}'")
+                    finviz = _coerce('enable_finviz', query.get('finviz', 'false'))
+                    entry = await self.cached(f"metrics:{symbol}:{timeframe}:{finviz}",
+                                              ticker_metrics, symbol, timeframe, finviz)
+                else:
+                    entry = await self.cached(f"info:{symbol}", stock_info, symbol)
+            else:
+                raise ApiError(404, f"No route for {url.path}")
+        except ApiError as e:
+            return e.status, {}, json.dumps({'error': str(e)}).encode()
+        except Exception as e:
+            print(f"API request {method} {target} failed: {e}", file=sys.stderr)
+            return 500, {}, json.dumps({'error': str(e)}).encode()
+
+        _, payload, etag = entry
+        extra = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in (tag.strip() for tag in headers.get('if-none-match', '').split(',')):
+            return 304, extra, b''
+        return 200, extra, payload
+
+    async def serve_connection(self, reader, writer):
+        """HTTP/1.1 over one connection (keep-alive until the client closes)."""
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not line.strip():
+                    break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {}, b'{"error": "Malformed request line"}', False)
+                    break
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {}, b'{"error": "Invalid Content-Length"}', False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {}, b'{"error": "Request body too large"}', False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() != 'HTTP/1.0')
+                status, extra, payload = await self.handle(method.upper(), target, headers, body)
+                await self._respond(writer, status, extra, b'' if method.upper() == 'HEAD' else payload,
+                                    keep_alive, content_length=len(payload))
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, extra, payload, keep_alive, content_length=None):
+        head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(payload) if content_length is None else content_length}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{name}: {value}" for name, value in extra.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+        await writer.drain()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Accept connections until cancelled."""
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        bound = ', '.join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"Stock screener API listening on {bound}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve screening results and metrics as a local JSON API")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Interface to bind (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument('--max-scans', type=int, default=MAX_SCANS,
+                        help=f"Screens run concurrently (default: {MAX_SCANS})")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(ApiServer(max_scans=args.max_scans).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Cold-start cost of the dashboard and its modules.
+
+Every measurement runs in a fresh interpreter, like a new container:
+
+- import time of each module (python -X importtime, cumulative)
+- the dashboard's first script run on the welcome page (Streamlit AppTest),
+  and which heavy modules that run pulled in
+
+    python benchmarks/import_time.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['streamlit', 'config', 'pandas', 'plotly.express', 'yfinance',
+           'chart_builder', 'stock_screener']
+HEAVY_MODULES = ['pandas', 'numpy', 'plotly', 'yfinance', 'bs4', 'stock_screener', 'chart_builder']
+
+WELCOME_RUN = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file('dashboard.py', default_timeout=120)
+before = set(sys.modules)
+start = time.perf_counter()
+app.run()
+elapsed = time.perf_counter() - start
+assert not app.exception, app.exception
+loaded = [m for m in {heavy!r} if m in sys.modules and m not in before]
+print(elapsed, ','.join(loaded))
+"""
+
+
+def import_seconds(module):
+    """Cumulative import time of module in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in reversed(proc.stderr.splitlines()):
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def welcome_run():
+    """Seconds for the dashboard's first (welcome page) script run, and heavy modules it imported."""
+    code = WELCOME_RUN.format(heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    elapsed, _, loaded = proc.stdout.strip().splitlines()[-1].partition(' ')
+    return float(elapsed), [m for m in loaded.split(',') if m]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per measurement")
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<18} {'median import (ms)':>20}")
+    for module in MODULES:
+        times = [import_seconds(module) for _ in range(args.repeat)]
+        print(f"{module:<18} {statistics.median(times) * 1e3:>20.0f}")
+
+    runs = [welcome_run() for _ in range(args.repeat)]
+    print(f"\ndashboard welcome run: {statistics.median(r[0] for r in runs) * 1e3:.0f} ms median "
+          f"(streamlit already imported)")
+    print(f"heavy modules imported by the run: {', '.join(runs[-1][1]) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Steady-state memory of simulated dashboard reruns.
+
+Each rerun does what a Streamlit rerun of a results page does: sort and
+format the session's result table, load the selected ticker's history
+through the bar store/history LRU, and build its detail figures. Every
+--scan-every reruns a scan recomputes every ticker's technicals at a moved
+quote, as a long-running dashboard does while prices tick (the metrics cache
+is keyed by the quote). Bars are synthetic and written to a temporary bar
+store, so no network is used.
+
+    python benchmarks/memory_reruns.py --reruns 1000 --tickers 300
+
+RSS and the metrics cache size are printed every --report reruns; with the
+bounded caches both should level off once every ticker has been visited.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import _parse_size, get_config, set_config  # noqa: E402
+from data_cache import get_cache  # noqa: E402
+from chart_builder import get_detail_figures  # noqa: E402
+from indicators import _store as indicator_store  # noqa: E402
+from result_table import display_frame, results_frame  # noqa: E402
+from stock_screener import ticker_technicals  # noqa: E402
+from timeframes import _memory_store, get_bars, write_stored_bars  # noqa: E402
+
+
+def rss_bytes():
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def synthetic_bars(rng, days=504):
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days, tz='America/New_York')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    spread = close * rng.uniform(0.005, 0.02, days)
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.5, days),
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 20_000_000, days),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index)
+
+
+def synthetic_rows(symbols, rng):
+    sectors = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Industrials']
+    return [{
+        'Ticker': sym, 'Price': rng.uniform(15, 500), 'Fwd P/E': rng.uniform(5, 15),
+        'Market Cap': rng.uniform(1e10, 2e12), 'Volume': int(rng.integers(2e6, 5e7)),
+        'RSI': rng.uniform(30, 70), 'MA Position': 'Above 50/200d ✓',
+        'Sector': sectors[i % len(sectors)], 'Beta': rng.uniform(1, 2),
+        'Momentum': '↑', 'Bollinger': '–', 'Consec Up-Days': '✓',
+        'Stop-Loss': rng.uniform(10, 400), '5d Return': '6.1%',
+    } for i, sym in enumerate(symbols)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reruns', type=int, default=1000)
+    parser.add_argument('--tickers', type=int, default=300)
+    parser.add_argument('--results', type=int, default=50, help="Rows in the result table")
+    parser.add_argument('--history-bytes', default='16M', help="HISTORY_CACHE_BYTES for the run")
+    parser.add_argument('--scan-every', type=int, default=50,
+                        help="Rescan every ticker at a moved quote every N reruns (0: never)")
+    parser.add_argument('--memory-entries', type=int, default=get_config().memory_cache_entries,
+                        help="MEMORY_CACHE_ENTRIES for the run")
+    parser.add_argument('--report', type=int, default=100, help="Print RSS every N reruns")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    cache_dir = tempfile.mkdtemp(prefix='screener-bench-')
+    set_config(replace(get_config(), cache_dir=cache_dir, cache_duration=86400, cache_backend='memory',
+                       history_cache_bytes=_parse_size(args.history_bytes),
+                       memory_cache_entries=args.memory_entries))
+    symbols = [f"T{i:04d}" for i in range(args.tickers)]
+    last_close = {}
+    for sym in symbols:
+        bars = synthetic_bars(rng)
+        write_stored_bars(sym, '1d', bars)
+        last_close[sym] = float(bars['Close'].iloc[-1])
+
+    session_results = results_frame(synthetic_rows(symbols[:args.results], rng))
+    sort_columns = ['Market Cap', 'Price', 'Fwd P/E', 'RSI', 'Beta']
+
+    baseline = rss_bytes()
+    print(f"baseline RSS {baseline / 1e6:.1f} MB")
+    samples = []
+    start = time.perf_counter()
+    for i in range(1, args.reruns + 1):
+        results_df = session_results.sort_values(by=sort_columns[i % len(sort_columns)],
+                                                 ascending=bool(i % 2))
+        display_frame(results_df)
+        symbol = symbols[(i * 7) % len(symbols)]
+        hist = get_bars(symbol, '1d')
+        get_detail_figures(symbol, hist.iloc[-63:], period='3mo',
+                           theme='dark' if i % 3 else 'light')
+        if args.scan_every and i % args.scan_every == 0:
+            # Quotes move a little between scans, so every ticker gets a new metrics key
+            tick = i // args.scan_every
+            for sym in symbols:
+                ticker_technicals(sym, '1d', round(last_close[sym] * (1 + 0.001 * (tick % 20)), 2))
+        if i % args.report == 0:
+            rss = rss_bytes()
+            samples.append(rss)
+            print(f"rerun {i:5d}  RSS {rss / 1e6:7.1f} MB  "
+                  f"histories {_memory_store().nbytes / 1e6:6.1f} MB ({len(_memory_store())})  "
+                  f"indicators {indicator_store.nbytes / 1e6:6.1f} MB  "
+                  f"metrics cache {len(get_cache('metrics'))}")
+
+    elapsed = time.perf_counter() - start
+    print(f"{args.reruns} reruns in {elapsed:.1f}s ({elapsed / args.reruns * 1e3:.1f} ms each)")
+    if len(samples) >= 2:
+        settled = samples[len(samples) // 2:]
+        print(f"steady-state RSS {min(settled) / 1e6:.1f}-{max(settled) / 1e6:.1f} MB "
+              f"(growth over second half {(settled[-1] - settled[0]) / 1e6:+.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
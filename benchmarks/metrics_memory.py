@@ -0,0 +1,116 @@
+"""
+Memory held by a full-universe scan's per-ticker metrics.
+
+Every ticker of a synthetic universe gets a complete set of screening
+metrics (the shape fetch_ticker_metrics returns), stored either the old way,
+one dict per ticker collected until the scan ends and then turned into a
+DataFrame, or written into a MetricsTable as the tickers complete. No
+network is used.
+
+    python benchmarks/metrics_memory.py --tickers 10000
+
+For each layout the bytes still held after the scan (before the DataFrame is
+built) and the peak including the DataFrame conversion are traced with
+tracemalloc; RSS growth is printed for reference.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_screener import MetricsTable  # noqa: E402
+
+
+def rss_bytes():
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def synthetic_metrics(symbols, rng):
+    """Metrics dicts as a scan produces them, one at a time."""
+    sectors = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Industrials',
+               'Utilities', 'Real Estate', 'Consumer Defensive', 'Basic Materials', 'Unknown']
+    recs = ['strong_buy', 'buy', 'hold', 'underperform', 'sell', '']
+    for i, symbol in enumerate(symbols):
+        price = float(rng.uniform(5, 500))
+        yield symbol, {
+            'fwd_pe': float(rng.uniform(5, 40)), 'price': price,
+            'market_cap': float(rng.uniform(1e8, 2e12)), 'beta': float(rng.uniform(0.2, 2.5)),
+            'rec': recs[i % len(recs)], 'sector': sectors[i % len(sectors)],
+            'return_5d': float(rng.normal(0, 0.05)), 'ma50': price * float(rng.uniform(0.9, 1.1)),
+            'ma200': price * float(rng.uniform(0.8, 1.2)), 'rsi': float(rng.uniform(10, 90)),
+            'avg_volume': float(rng.uniform(1e4, 5e7)), 'up_streak': int(rng.integers(0, 8)),
+            'near_upper': bool(rng.random() < 0.2), 'stop_loss': price * 0.93,
+            'finviz_ok': True,
+        }
+
+
+def scan_dicts(symbols, rng):
+    rows = {symbol: metrics for symbol, metrics in synthetic_metrics(symbols, rng)}
+    return rows, lambda: pd.DataFrame.from_dict(rows, orient='index')
+
+
+def scan_table(symbols, rng):
+    table = MetricsTable(symbols)
+    for symbol, metrics in synthetic_metrics(symbols, rng):
+        table.set(symbol, metrics)
+    return table, table.to_frame
+
+
+LAYOUTS = {'dicts': scan_dicts, 'table': scan_table}
+
+
+def measure(layout, symbols, seed):
+    gc.collect()
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held, to_frame = LAYOUTS[layout](symbols, np.random.default_rng(seed))
+    gc.collect()
+    scanned = tracemalloc.get_traced_memory()[0]
+    frame = to_frame()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rss = rss_bytes() - rss_before
+    del held, to_frame, frame
+    return scanned, peak, rss, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=10000)
+    parser.add_argument('--layout', choices=['both', *LAYOUTS], default='both')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    symbols = [f"T{i:05d}" for i in range(args.tickers)]
+    layouts = list(LAYOUTS) if args.layout == 'both' else [args.layout]
+    held = {}
+    for layout in layouts:
+        scanned, peak, rss, elapsed = measure(layout, symbols, args.seed)
+        held[layout] = scanned
+        print(f"{layout:6s} held after scan {scanned / 1e6:7.2f} MB "
+              f"({scanned / args.tickers:6.0f} B/ticker)  peak with DataFrame {peak / 1e6:7.2f} MB  "
+              f"RSS +{rss / 1e6:6.1f} MB  {elapsed:.2f}s")
+    if len(held) == 2:
+        print(f"MetricsTable holds {held['dicts'] / held['table']:.1f}x less than per-ticker dicts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""
+Figure construction for the dashboard's detail charts.
+
+Overlays (SMA, Bollinger Bands, RSI) come from the shared indicator registry,
+computed on the same bars the screener uses at the scan's timeframe (or
+carried over from the screening run), and the built Plotly figures are cached
+by (ticker, timeframe, period, theme) plus a fingerprint of the underlying
+bars, so Streamlit reruns reuse them. Long histories are downsampled before
+they reach the browser: line traces with Largest-Triangle-Three-Buckets
+(LTTB), candles and volume with per-bucket OHLCV aggregation so highs, lows
+and totals are preserved.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from indicators import compute_indicators, indicators_for, spec
+from providers import period_slice
+from timeframes import get_bars, series_key
+
+MAX_POINTS = 500
+CACHE_SIZE = 64
+
+PERIOD_LABELS = {
+    '5d': '5 Days', '1mo': '1 Month', '3mo': '3 Months', '6mo': '6 Months',
+    '1y': '1 Year', '2y': '2 Years', '5y': '5 Years', 'max': 'Max',
+}
+
+TIMEFRAME_LABELS = {'1d': 'daily', '1h': 'hourly', '15m': '15-minute', '5m': '5-minute'}
+
+# History shown in the detail view per screening timeframe
+DETAIL_PERIODS = {'1d': '3mo', '1h': '1mo', '15m': '5d', '5m': '5d'}
+
+THEMES = {
+    'dark': {
+        'paper_bgcolor': 'rgba(0,0,0,0)',
+        'plot_bgcolor': 'rgba(0,0,0,0)',
+        'font_color': '#e2e8f0',
+        'grid_color': '#4a5568',
+        'volume_color': 'rgba(79, 172, 254, 0.7)',
+    },
+    'light': {
+        'paper_bgcolor': 'rgba(0,0,0,0)',
+        'plot_bgcolor': 'rgba(0,0,0,0)',
+        'font_color': '#262730',
+        'grid_color': '#e9ecef',
+        'volume_color': 'rgba(102, 126, 234, 0.7)',
+    },
+}
+
+_figure_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def lttb_indices(y, threshold):
+    """
+    Select row positions with Largest-Triangle-Three-Buckets
+
+    Args:
+        y (array-like): Series values (NaNs are treated as 0 for selection)
+        threshold (int): Maximum number of points to keep
+
+    Returns:
+        numpy.ndarray: Sorted integer positions into y
+    """
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_start = end
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[-1]
+        # Point in this bucket forming the largest triangle with a and the average
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                       - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_ohlcv(hist, max_points=MAX_POINTS):
+    """
+    Aggregate an OHLCV frame into at most max_points equal-count buckets
+
+    Args:
+        hist (DataFrame): History with Open/High/Low/Close/Volume columns
+        max_points (int): Maximum number of bars to return
+
+    Returns:
+        DataFrame: Bucketed bars indexed by each bucket's first timestamp
+    """
+    n = len(hist)
+    if n <= max_points:
+        return hist
+    bucket = np.arange(n) * max_points // n
+    grouped = hist.groupby(bucket)
+    out = pd.DataFrame({
+        'Open': grouped['Open'].first().to_numpy(),
+        'High': grouped['High'].max().to_numpy(),
+        'Low': grouped['Low'].min().to_numpy(),
+        'Close': grouped['Close'].last().to_numpy(),
+        'Volume': grouped['Volume'].sum().to_numpy(),
+    }, index=hist.index[np.searchsorted(bucket, np.arange(max_points))])
+    return out
+
+
+# Overlays drawn on the detail charts (see indicators.py for definitions)
+OVERLAY_SPECS = [
+    spec('sma', window=20),
+    spec('sma', window=50),
+    spec('bb', window=20, num_std=2),
+    spec('rsi', period=14),
+]
+
+
+def detail_history(ticker, timeframe='1d', period=None):
+    """
+    Bars shown in the detail view: the screener's bars at a timeframe, cut to period
+
+    Args:
+        ticker (str): Stock ticker symbol
+        timeframe (str): Screening timeframe
+        period (str): History shown (defaults to DETAIL_PERIODS[timeframe])
+
+    Returns:
+        DataFrame: OHLCV bars
+    """
+    return period_slice(get_bars(ticker, timeframe), period or DETAIL_PERIODS[timeframe])
+
+
+def compute_overlays(hist, ticker=None, timeframe='1d'):
+    """
+    Compute every chart overlay once for a history
+
+    For a ticker the overlays are computed on the bars the screener uses at
+    the timeframe (get_bars: same source and warm-up), reusing the screener's
+    stored indicator frame when there is one, and then cut to hist. The
+    detail view therefore shows the values that qualified the pick even
+    after the frame was evicted, in a new process or on another replica.
+
+    Args:
+        hist (DataFrame): OHLCV history shown (a trailing slice of the
+            ticker's screening bars)
+        ticker (str): Stock ticker symbol (optional)
+        timeframe (str): Timeframe of hist's bars
+
+    Returns:
+        DataFrame: Overlay columns (sma_20, sma_50, bb_*_20_2, rsi_14)
+        aligned to hist
+    """
+    if ticker is not None:
+        bars = get_bars(ticker, timeframe)
+        if len(hist) and hist.index.isin(bars.index).all():
+            return indicators_for(series_key(ticker, timeframe), bars, OVERLAY_SPECS).loc[hist.index]
+    return compute_indicators(hist, OVERLAY_SPECS)
+
+
+def _line(x, y, keep, **kwargs):
+    return go.Scatter(x=x[keep], y=np.asarray(y)[keep], mode='lines', **kwargs)
+
+
+def _layout(fig, theme, **kwargs):
+    colors = THEMES[theme]
+    layout = dict(
+        paper_bgcolor=colors['paper_bgcolor'],
+        plot_bgcolor=colors['plot_bgcolor'],
+        font_color=colors['font_color'],
+        title_font_color=colors['font_color'],
+        xaxis=dict(gridcolor=colors['grid_color']),
+        yaxis=dict(gridcolor=colors['grid_color']),
+    )
+    layout.update(kwargs)
+    if 'yaxis_range' in layout:
+        layout['yaxis'] = dict(layout['yaxis'], range=layout.pop('yaxis_range'))
+    fig.update_layout(**layout)
+    return fig
+
+
+def build_figures(ticker, hist, overlays, period='3mo', theme='light', max_points=MAX_POINTS,
+                  timeframe='1d'):
+    """
+    Build the price, volume and RSI figures for the detail view
+
+    Args:
+        ticker (str): Stock ticker symbol
+        hist (DataFrame): OHLCV history
+        overlays (DataFrame): Output of compute_overlays for hist
+        period (str): History period (used for the title)
+        theme (str): 'light' or 'dark'
+        max_points (int): Maximum points per trace sent to the browser
+        timeframe (str): Timeframe of hist's bars (used for the titles)
+
+    Returns:
+        dict: {'price': Figure, 'volume': Figure, 'rsi': Figure}
+    """
+    bar_label = TIMEFRAME_LABELS.get(timeframe, timeframe)
+    x = hist.index
+    keep = lttb_indices(hist['Close'], max_points)
+    bars = downsample_ohlcv(hist, max_points)
+
+    # Main candlestick chart with technical overlays
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(
+        x=bars.index,
+        open=bars['Open'],
+        high=bars['High'],
+        low=bars['Low'],
+        close=bars['Close'],
+        name=ticker
+    ))
+    fig.add_trace(_line(x, overlays['sma_20'], keep, name='SMA 20',
+                        line=dict(color='orange', width=2)))
+    fig.add_trace(_line(x, overlays['sma_50'], keep, name='SMA 50',
+                        line=dict(color='blue', width=2)))
+    fig.add_trace(_line(x, overlays['bb_upper_20_2'], keep, name='BB Upper',
+                        line=dict(color='gray', width=1, dash='dash'),
+                        showlegend=False))
+    fig.add_trace(_line(x, overlays['bb_lower_20_2'], keep, name='BB Lower',
+                        line=dict(color='gray', width=1, dash='dash'),
+                        fill='tonexty', fillcolor='rgba(128,128,128,0.1)',
+                        showlegend=False))
+    _layout(fig, theme,
+            title=f"{ticker} - Advanced Technical Analysis ({PERIOD_LABELS.get(period, period)}, "
+                  f"{bar_label} bars)",
+            xaxis_title="Date",
+            yaxis_title="Price ($)",
+            height=500,
+            showlegend=True,
+            legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01))
+
+    # Volume chart
+    fig_vol = go.Figure()
+    fig_vol.add_trace(go.Bar(
+        x=bars.index,
+        y=bars['Volume'],
+        name='Volume',
+        marker_color=THEMES[theme]['volume_color']
+    ))
+    _layout(fig_vol, theme,
+            title="📊 Trading Volume",
+            xaxis_title="Date",
+            yaxis_title="Volume",
+            height=300,
+            showlegend=False)
+
+    # RSI chart
+    fig_rsi = go.Figure()
+    fig_rsi.add_trace(_line(x, overlays['rsi_14'], keep, name='RSI',
+                            line=dict(color='purple', width=2)))
+    fig_rsi.add_hline(y=70, line_dash="dash", line_color="red", annotation_text="Overbought")
+    fig_rsi.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Oversold")
+    fig_rsi.add_hline(y=50, line_dash="dot", line_color="gray", annotation_text="Neutral")
+    _layout(fig_rsi, theme,
+            title=f"📈 RSI Indicator (14 {bar_label} bars)",
+            xaxis_title="Date",
+            yaxis_title="RSI",
+            yaxis_range=[0, 100],
+            height=300,
+            showlegend=False)
+
+    return {'price': fig, 'volume': fig_vol, 'rsi': fig_rsi}
+
+
+def _bars_digest(hist):
+    """Digest of a history's timestamps and OHLCV values."""
+    columns = [col for col in ('Open', 'High', 'Low', 'Close', 'Volume') if col in hist.columns]
+    hashed = pd.util.hash_pandas_object(hist[columns], index=True)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()
+
+
+def get_detail_figures(ticker, hist, period='3mo', theme='light', max_points=MAX_POINTS,
+                       timeframe='1d'):
+    """
+    Return cached detail figures and overlays, building them on a miss
+
+    The cache key includes a digest of the bars (timestamps and OHLCV), so
+    a refreshed history for the same (ticker, timeframe, period, theme) is
+    rebuilt, including when only the current bar's prices moved during the session.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        hist (DataFrame): OHLCV history
+        period (str): History period
+        theme (str): 'light' or 'dark'
+        max_points (int): Maximum points per trace sent to the browser
+        timeframe (str): Screening timeframe of hist's bars
+
+    Returns:
+        tuple: (figures dict, overlays DataFrame)
+    """
+    key = (series_key(ticker, timeframe), period, theme, max_points, _bars_digest(hist))
+    with _cache_lock:
+        cached = _figure_cache.get(key)
+        if cached is not None:
+            _figure_cache.move_to_end(key)
+            return cached
+
+    overlays = compute_overlays(hist, ticker, timeframe)
+    figures = build_figures(ticker, hist, overlays, period, theme, max_points, timeframe)
+
+    with _cache_lock:
+        _figure_cache[key] = (figures, overlays)
+        _figure_cache.move_to_end(key)
+        while len(_figure_cache) > CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return figures, overlays
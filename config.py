@@ -0,0 +1,166 @@
+"""
+Runtime configuration.
+
+Settings are read once from the environment, falling back to a local .env
+file (see .env.example) and then to the defaults below, so deployments can
+tune caching and request pacing without code changes.
+"""
+import os
+from dataclasses import dataclass, fields
+
+ENV_FILE = '.env'
+
+_SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+CACHE_BACKENDS = ('files', 'sqlite', 'memory')
+
+
+def _parse_bool(value):
+    lowered = value.strip().lower()
+    if lowered in ('1', 'true', 'yes', 'on'):
+        return True
+    if lowered in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f"expected true/false, got '{value}'")
+
+
+def _parse_size(value):
+    """Parse a byte size such as 536870912, 512M or 2G."""
+    text = value.strip().upper().rstrip('B')
+    if text and text[-1] in _SIZE_SUFFIXES:
+        return int(float(text[:-1]) * _SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def _parse_provider(value):
+    spec = value.strip()
+    kind, _, root = spec.partition(':')
+    if not ((kind == 'live' and not root) or (kind in ('record', 'replay') and root)):
+        raise ValueError("expected live, record:DIR or replay:DIR")
+    return spec
+
+
+def _parse_backend(value):
+    backend = value.strip().lower()
+    if backend not in CACHE_BACKENDS:
+        raise ValueError(f"expected one of {', '.join(CACHE_BACKENDS)}")
+    return backend
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    """Typed runtime settings; see ENV_VARS for the environment variable names."""
+    cache_duration: int = 3600
+    api_delay: float = 0.05
+    finviz_delay: float = 0.1
+    ticker_list: str = 'sp500_tickers.csv'
+    enable_finviz: bool = True
+    workers: int = 4
+    cache_dir: str = '.cache'
+    cache_max_bytes: int = 512 * 1024 ** 2
+    cache_backend: str = 'files'
+    history_cache_bytes: int = 128 * 1024 ** 2
+    memory_cache_entries: int = 10000
+    data_provider: str = 'live'
+    calendar_freshness: bool = True
+
+    @property
+    def bar_store_dir(self):
+        return os.path.join(self.cache_dir, 'bars')
+
+    @property
+    def fundamentals_dir(self):
+        return os.path.join(self.cache_dir, 'fundamentals')
+
+
+# field -> (environment variable, parser)
+ENV_VARS = {
+    'cache_duration': ('CACHE_DURATION', int),
+    'api_delay': ('API_DELAY', float),
+    'finviz_delay': ('FINVIZ_DELAY', float),
+    'ticker_list': ('DEFAULT_TICKER_LIST', str),
+    'enable_finviz': ('ENABLE_FINVIZ_SCRAPING', _parse_bool),
+    'workers': ('SCREENER_WORKERS', int),
+    'cache_dir': ('CACHE_DIR', str),
+    'cache_max_bytes': ('CACHE_MAX_BYTES', _parse_size),
+    'cache_backend': ('CACHE_BACKEND', _parse_backend),
+    'history_cache_bytes': ('HISTORY_CACHE_BYTES', _parse_size),
+    'memory_cache_entries': ('MEMORY_CACHE_ENTRIES', int),
+    'data_provider': ('DATA_PROVIDER', _parse_provider),
+    'calendar_freshness': ('CALENDAR_FRESHNESS', _parse_bool),
+}
+
+_config = None
+
+
+def read_env_file(path=ENV_FILE):
+    """
+    Parse a KEY=VALUE .env file (blank lines and # comments ignored)
+
+    Returns:
+        dict: Variables defined in the file (empty if it doesn't exist)
+    """
+    values = {}
+    if not os.path.exists(path):
+        return values
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            value = value.split(' #', 1)[0].strip().strip('"').strip("'")
+            values[key.strip()] = value
+    return values
+
+
+def load_config(environ=None, env_file=ENV_FILE):
+    """
+    Build a RuntimeConfig from environment variables and the .env file
+
+    Args:
+        environ (dict): Environment to read (defaults to os.environ)
+        env_file (str): .env file consulted for variables not in environ
+
+    Returns:
+        RuntimeConfig: Validated configuration
+
+    Raises:
+        ValueError: If a variable can't be parsed or is out of range
+    """
+    source = read_env_file(env_file) if env_file else {}
+    source.update(os.environ if environ is None else environ)
+
+    values = {}
+    for field in fields(RuntimeConfig):
+        var, parse = ENV_VARS[field.name]
+        raw = source.get(var)
+        if raw is None or str(raw).strip() == '':
+            continue
+        try:
+            values[field.name] = parse(str(raw).split(' #', 1)[0].strip())
+        except ValueError as e:
+            raise ValueError(f"Invalid {var}={raw!r}: {e}")
+
+    config = RuntimeConfig(**values)
+    for name in ('cache_duration', 'api_delay', 'finviz_delay', 'cache_max_bytes',
+                 'history_cache_bytes', 'memory_cache_entries'):
+        if getattr(config, name) < 0:
+            raise ValueError(f"{ENV_VARS[name][0]} must not be negative")
+    if config.workers < 1:
+        raise ValueError("SCREENER_WORKERS must be at least 1")
+    return config
+
+
+def get_config():
+    """Return the process-wide configuration, loading it on first use."""
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
+
+
+def set_config(config):
+    """Replace the process-wide configuration (e.g. from CLI overrides)."""
+    global _config
+    _config = config
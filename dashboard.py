@@ -1,12 +1,11 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import yfinance as yf
-import numpy as np
-import time
-from stock_screener import run_stock_screening  # We'll create this module
+import os
+from datetime import datetime
+from config import get_config
+
+# Charting (plotly), data (yfinance, pandas) and the screener (requests,
+# BeautifulSoup) are imported where first used, so the welcome page and a
+# fresh container's first page load don't wait for them.
 
 # Page configuration
 st.set_page_config(
@@ -394,11 +393,31 @@ with st.sidebar:
     
     # Advanced options
     with st.expander("⚙️ Advanced Options"):
-        enable_finviz = st.checkbox("Enable Finviz Scraping", True)
+        enable_finviz = st.checkbox("Enable Finviz Scraping", get_config().enable_finviz)
         consecutive_days = st.slider("Min Consecutive Up Days", 1, 5, 3)
         recommendation_filter = st.selectbox("Minimum Recommendation", 
                                            ["Any", "Buy", "Strong Buy"], 
                                            index=2)
+        timeframe = st.selectbox("Timeframe", ["1d", "1h", "15m", "5m"], index=0,
+                                 help="Bar size for technical filters; windows and the 5-bar return are counted in bars")
+        ranking_mode = st.checkbox("Rank instead of filter", False,
+                                   help="Score every stock against the criteria and show the best K "
+                                        "instead of only those passing every filter")
+        top_k = st.slider("Top K", 5, 50, 20, disabled=not ranking_mode)
+        sector_filters = st.checkbox("Sector-relative filters", False,
+                                     help="Compare each stock with its sector peers in the scanned universe")
+        max_sector_pe_pct = st.slider("Max P/E Percentile in Sector", 10, 100, 50,
+                                      disabled=not sector_filters)
+        min_sector_rs = st.slider("Min 5-day Return vs Sector Median (%)", -10, 10, 0,
+                                  disabled=not sector_filters)
+        profile_scan = st.checkbox("Profile this scan", False,
+                                   help="Record where the scan spends its time and write a profile "
+                                        "artifact (flame graph or pstats) for it")
+        profile_mode = st.selectbox("Profiler", ["sample", "cprofile"], index=0,
+                                    disabled=not profile_scan,
+                                    help="sample: low-overhead stack sampling (.folded); "
+                                         "cprofile: deterministic call counts (.prof)")
+        profile_memory = st.checkbox("Trace memory allocations", False, disabled=not profile_scan)
 
 # Convert market cap and volume to numbers
 market_cap_values = {"1B": 1e9, "5B": 5e9, "10B": 1e10, "50B": 5e10, "100B": 1e11}
@@ -418,6 +437,9 @@ if 'last_run' not in st.session_state:
 
 # Run screening button
 if st.button("🚀 Run Stock Screening", type="primary"):
+    # The last results' prefetch would compete with the scan for requests
+    if st.session_state.get('prefetcher') is not None:
+        st.session_state.prefetcher.cancel()
     # Create a styled container for progress indicators based on theme
     progress_container = st.container()
     with progress_container:
@@ -467,21 +489,66 @@ if st.button("🚀 Run Stock Screening", type="primary"):
             'min_volume': min_volume_value,
             'enable_finviz': enable_finviz,
             'consecutive_days': consecutive_days,
-            'recommendation_filter': recommendation_filter.lower().replace(' ', '_')
+            'recommendation_filter': recommendation_filter.lower().replace(' ', '_'),
+            'timeframe': timeframe,
+            'max_sector_pe_pct': max_sector_pe_pct if sector_filters else None,
+            'min_sector_rs': min_sector_rs / 100 if sector_filters else None,
         }
         
         try:
-            # Run the screening (we'll implement this)
-            results = run_stock_screening(params, progress_bar, status_text)
-            st.session_state.screening_results = results
+            from result_table import results_frame
+            from profiling import RunProfile
+            from validation import RunReport
+
+            report = RunReport()
+            profile = RunProfile(profile_mode, profile_memory) if profile_scan else None
+            if ranking_mode:
+                from scoring import run_scored_screening
+                results = run_scored_screening(params, k=top_k, progress_bar=progress_bar,
+                                               status_text=status_text, report=report,
+                                               profile=profile)
+            else:
+                from stock_screener import run_stock_screening
+                results = run_stock_screening(params, progress_bar, status_text, report=report,
+                                              profile=profile)
+            st.session_state.screening_results = results_frame(results)
+            st.session_state.data_report = report
+            st.session_state.last_profile = profile
             st.session_state.last_run = datetime.now()
+            st.session_state.last_params = dict(params, mode='rank' if ranking_mode else 'filter')
+            st.session_state.prepared_export = None
             st.success(f"✅ Screening completed! Found {len(results)} qualifying stocks.")
         except Exception as e:
             st.error(f"❌ Error during screening: {str(e)}")
 
 # Display results if available
 if st.session_state.screening_results is not None:
-    results_df = pd.DataFrame(st.session_state.screening_results)
+    import plotly.express as px
+    from result_table import display_frame
+
+    data_report = st.session_state.get('data_report')
+    if data_report is not None and data_report.issues:
+        with st.expander(f"🩺 {data_report.summary()}"):
+            st.dataframe(data_report.to_frame(), use_container_width=True, hide_index=True)
+
+    last_profile = st.session_state.get('last_profile')
+    if last_profile is not None and last_profile.artifact:
+        with st.expander(f"🔬 Profile: {last_profile.wall_seconds}s ({last_profile.mode})"):
+            st.caption("Top hotspots")
+            st.dataframe(last_profile.hotspots_frame(), use_container_width=True, hide_index=True)
+            if last_profile.allocations:
+                st.caption(f"Top memory allocators (peak {last_profile.peak_bytes / 1e6:.1f} MB)")
+                st.dataframe(last_profile.allocations_frame(), use_container_width=True,
+                             hide_index=True)
+            try:
+                with open(last_profile.artifact, 'rb') as f:
+                    st.download_button("📥 Download Profile", f.read(),
+                                       file_name=os.path.basename(last_profile.artifact),
+                                       mime="application/octet-stream")
+            except OSError:
+                st.caption(f"Profile written to {last_profile.artifact}")
+
+    results_df = st.session_state.screening_results
     
     if len(results_df) > 0:
         # Metrics row
@@ -605,8 +672,10 @@ if st.session_state.screening_results is not None:
         # Add sorting options
         sort_col1, sort_col2 = st.columns(2)
         with sort_col1:
-            sort_by = st.selectbox("Sort by:", 
-                                 ['Market Cap', 'Price', 'Fwd P/E', 'RSI', 'Beta'])
+            sort_options = ['Market Cap', 'Price', 'Fwd P/E', 'RSI', 'Beta']
+            if 'Score' in results_df.columns:
+                sort_options.insert(0, 'Score')
+            sort_by = st.selectbox("Sort by:", sort_options)
         with sort_col2:
             sort_order = st.selectbox("Order:", ['Descending', 'Ascending'])
         
@@ -615,16 +684,14 @@ if st.session_state.screening_results is not None:
         if sort_by in results_df.columns:
             results_df = results_df.sort_values(by=sort_by, ascending=ascending)
         
+        # Warm the detail view for every pick, in the order shown
+        if 'prefetcher' not in st.session_state:
+            from prefetch import Prefetcher
+            st.session_state.prefetcher = Prefetcher(period="3mo")
+        st.session_state.prefetcher.request(results_df['Ticker'].tolist())
+        
         # Format the dataframe for display
-        display_df = results_df.copy()
-        if 'Market Cap' in display_df.columns:
-            display_df['Market Cap'] = display_df['Market Cap'].apply(
-                lambda x: f"${x/1e9:.1f}B" if pd.notnull(x) else "N/A"
-            )
-        if 'Price' in display_df.columns:
-            display_df['Price'] = display_df['Price'].apply(
-                lambda x: f"${x:.2f}" if pd.notnull(x) else "N/A"
-            )
+        display_df = display_frame(results_df)
         
         # Display with styling
         st.dataframe(
@@ -633,14 +700,73 @@ if st.session_state.screening_results is not None:
             height=400
         )
         
-        # Download button
-        csv = results_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Download Results as CSV",
-            data=csv,
-            file_name=f"stock_screening_results_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-            mime="text/csv"
-        )
+        # Exports are rendered only when requested (and cached per result)
+        from exports import EXPORT_FORMATS, available_formats, export_results, run_metadata
+
+        export_col1, export_col2, export_col3 = st.columns([2, 2, 3])
+        with export_col1:
+            export_format = st.selectbox("Export format:", available_formats(),
+                                         format_func=lambda fmt: EXPORT_FORMATS[fmt][0])
+        with export_col2:
+            include_series = st.checkbox("Include indicator series",
+                                         help="Every pick's bars and indicators, for offline analysis")
+        export_request = (export_format, include_series, sort_by, sort_order)
+        prepared = st.session_state.get('prepared_export')
+        with export_col3:
+            if prepared is None or prepared[0] != export_request:
+                if st.button("📦 Prepare Export"):
+                    last_params = dict(st.session_state.get('last_params') or {})
+                    run = run_metadata(st.session_state.last_run, len(results_df),
+                                       st.session_state.get('data_report'),
+                                       mode=last_params.pop('mode', 'filter'),
+                                       timeframe=last_params.get('timeframe', '1d'))
+                    with st.spinner("Preparing export..."):
+                        prepared = (export_request, export_results(
+                            results_df, export_format, params=last_params, run=run,
+                            include_series=include_series,
+                            timeframe=last_params.get('timeframe', '1d')))
+                    st.session_state.prepared_export = prepared
+            if prepared is not None and prepared[0] == export_request:
+                data, extension, mime = prepared[1]
+                st.download_button(
+                    label=f"📥 Download Results ({EXPORT_FORMATS[export_format][0]})",
+                    data=data,
+                    file_name=f"stock_screening_results_{st.session_state.last_run.strftime('%Y%m%d_%H%M')}.{extension}",
+                    mime=mime
+                )
+        
+        # Universe analytics over the stored daily bars
+        if len(results_df) > 1 and st.checkbox("🔗 Show correlation, relative strength and price beta"):
+            import pandas as pd
+            from universe_analytics import INDEX_PROXY, redundant_pairs, universe_analytics
+
+            with st.spinner("Computing universe analytics..."):
+                analytics = universe_analytics(results_df['Ticker'].tolist())
+            corr = analytics['correlation']
+            if corr.empty:
+                st.info("No stored price history for these stocks yet.")
+            else:
+                reported_beta = results_df.set_index('Ticker')['Beta'] if 'Beta' in results_df.columns else None
+                summary = pd.DataFrame({
+                    f'3M RS vs {INDEX_PROXY}': (analytics['relative_strength'] * 100).round(1),
+                    'Price Beta (1Y)': analytics['beta'].round(2),
+                })
+                if reported_beta is not None:
+                    summary['Reported Beta'] = reported_beta.reindex(summary.index)
+                ana_col1, ana_col2 = st.columns(2)
+                with ana_col1:
+                    fig_corr = px.imshow(corr, zmin=-1, zmax=1, color_continuous_scale='RdBu_r',
+                                         title="Daily Return Correlation (1Y)")
+                    fig_corr.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                                           font_color='#e2e8f0' if st.session_state.dark_mode else '#262730')
+                    st.plotly_chart(fig_corr, use_container_width=True)
+                with ana_col2:
+                    st.dataframe(summary, use_container_width=True)
+                    pairs = redundant_pairs(corr, threshold=0.8)
+                    if len(pairs):
+                        st.warning(f"{len(pairs)} highly correlated pair(s) (ρ ≥ 0.8); "
+                                   "these picks largely duplicate each other")
+                        st.dataframe(pairs.round(2), use_container_width=True, hide_index=True)
         
         # Enhanced Individual stock details
         if len(results_df) > 0:
@@ -649,17 +775,25 @@ if st.session_state.screening_results is not None:
                                         results_df['Ticker'].tolist())
             
             if selected_stock:
+                from chart_builder import DETAIL_PERIODS, PERIOD_LABELS, detail_history, get_detail_figures
+                from stock_screener import get_stock_info_many
+
                 with st.spinner(f"Loading comprehensive details for {selected_stock}..."):
                     try:
-                        ticker = yf.Ticker(selected_stock)
-                        info = ticker.info
-                        hist_1y = ticker.history(period="1y")
-                        hist_3mo = ticker.history(period="3mo")
+                        details = get_stock_info_many([selected_stock], period="3mo")
+                        if selected_stock not in details:
+                            raise RuntimeError(details.errors.get(selected_stock, "no data"))
+                        info = details.info[selected_stock]
+                        # Charts and indicators use the scan's timeframe, like the table
+                        timeframe = (st.session_state.get('last_params') or {}).get('timeframe', '1d')
+                        detail_period = DETAIL_PERIODS[timeframe]
+                        hist = (details.history[selected_stock] if timeframe == '1d'
+                                else detail_history(selected_stock, timeframe))
                         
                         # Get current stock info from results
                         stock_row = results_df[results_df['Ticker'] == selected_stock].iloc[0]
                         
-                        if not hist_3mo.empty:
+                        if not hist.empty:
                             # === STOCK OVERVIEW SECTION ===
                             st.markdown(f"### 📊 {selected_stock} - {info.get('longName', 'N/A')}")
                             
@@ -709,24 +843,23 @@ if st.session_state.screening_results is not None:
                             # === TECHNICAL ANALYSIS ===
                             st.markdown("#### 📈 Technical Analysis")
                             
-                            # Calculate technical indicators
-                            current_price = hist_3mo['Close'].iloc[-1]
-                            sma_20 = hist_3mo['Close'].rolling(20).mean().iloc[-1]
-                            sma_50 = hist_3mo['Close'].rolling(50).mean().iloc[-1]
+                            # Build (or reuse) the detail figures; overlays come from the screening run when available
+                            theme = 'dark' if st.session_state.dark_mode else 'light'
+                            detail_figures, overlays = get_detail_figures(selected_stock, hist,
+                                                                          period=detail_period, theme=theme,
+                                                                          timeframe=timeframe)
+                            latest = overlays.iloc[-1]
                             
-                            # RSI Calculation
-                            delta = hist_3mo['Close'].diff()
-                            up = delta.clip(lower=0)
-                            down = -1 * delta.clip(upper=0)
-                            ma_up = up.ewm(com=13).mean()
-                            ma_down = down.ewm(com=13).mean()
-                            current_rsi = 100 - (100 / (1 + ma_up.iloc[-1] / ma_down.iloc[-1]))
+                            # Technical indicators (same values the screener used)
+                            current_price = hist['Close'].iloc[-1]
+                            sma_20 = latest['sma_20']
+                            sma_50 = latest['sma_50']
+                            current_rsi = latest['rsi_14']
                             
                             # Bollinger Bands
-                            bb_period = 20
-                            bb_std = hist_3mo['Close'].rolling(bb_period).std().iloc[-1]
-                            bb_upper = sma_20 + (bb_std * 2)
-                            bb_lower = sma_20 - (bb_std * 2)
+                            bb_std = latest['bb_std_20_2']
+                            bb_upper = latest['bb_upper_20_2']
+                            bb_lower = latest['bb_lower_20_2']
                             
                             tech_col1, tech_col2 = st.columns(2)
                             
@@ -738,7 +871,7 @@ if st.session_state.screening_results is not None:
                                 
                                 st.markdown(f"""
                                 **🎯 Technical Indicators**
-                                - **RSI (14):** {current_rsi:.1f} {rsi_color}
+                                - **RSI (14, {timeframe}):** {current_rsi:.1f} {rsi_color}
                                 - **MA Signal:** {ma_signal}
                                 - **BB Position:** {bb_position}
                                 - **Volatility:** {(bb_std/sma_20)*100:.1f}%
@@ -746,176 +879,31 @@ if st.session_state.screening_results is not None:
                             
                             with tech_col2:
                                 # Price targets and support/resistance
-                                high_3mo = hist_3mo['High'].max()
-                                low_3mo = hist_3mo['Low'].min()
-                                price_range = high_3mo - low_3mo
+                                period_high = hist['High'].max()
+                                period_low = hist['Low'].min()
+                                price_range = period_high - period_low
                                 
                                 st.markdown(f"""
-                                **🎯 Key Levels (3M)**
-                                - **Resistance:** ${high_3mo:.2f}
-                                - **Support:** ${low_3mo:.2f}
-                                - **Range:** {(price_range/low_3mo)*100:.1f}%
-                                - **Current Position:** {((current_price-low_3mo)/price_range)*100:.0f}%
+                                **🎯 Key Levels ({PERIOD_LABELS[detail_period]})**
+                                - **Resistance:** ${period_high:.2f}
+                                - **Support:** ${period_low:.2f}
+                                - **Range:** {(price_range/period_low)*100:.1f}%
+                                - **Current Position:** {((current_price-period_low)/price_range)*100:.0f}%
                                 """)
 
                             # === ENHANCED CHARTS SECTION ===
                             st.markdown("#### 📊 Advanced Price Analysis")
                             
-                            # Chart styling
-                            if st.session_state.dark_mode:
-                                paper_bgcolor = 'rgba(0,0,0,0)'
-                                plot_bgcolor = 'rgba(0,0,0,0)'
-                                font_color = '#e2e8f0'
-                                grid_color = '#4a5568'
-                            else:
-                                paper_bgcolor = 'rgba(0,0,0,0)'
-                                plot_bgcolor = 'rgba(0,0,0,0)'
-                                font_color = '#262730'
-                                grid_color = '#e9ecef'
-                            
-                            # Main candlestick chart with technical overlays
-                            fig = go.Figure()
-                            
-                            # Candlestick data
-                            fig.add_trace(go.Candlestick(
-                                x=hist_3mo.index,
-                                open=hist_3mo['Open'],
-                                high=hist_3mo['High'],
-                                low=hist_3mo['Low'],
-                                close=hist_3mo['Close'],
-                                name=selected_stock
-                            ))
-                            
-                            # Add moving averages
-                            fig.add_trace(go.Scatter(
-                                x=hist_3mo.index,
-                                y=hist_3mo['Close'].rolling(20).mean(),
-                                mode='lines',
-                                name='SMA 20',
-                                line=dict(color='orange', width=2)
-                            ))
-                            
-                            fig.add_trace(go.Scatter(
-                                x=hist_3mo.index,
-                                y=hist_3mo['Close'].rolling(50).mean(),
-                                mode='lines',
-                                name='SMA 50',
-                                line=dict(color='blue', width=2)
-                            ))
-                            
-                            # Add Bollinger Bands
-                            bb_upper_series = hist_3mo['Close'].rolling(20).mean() + (hist_3mo['Close'].rolling(20).std() * 2)
-                            bb_lower_series = hist_3mo['Close'].rolling(20).mean() - (hist_3mo['Close'].rolling(20).std() * 2)
-                            
-                            fig.add_trace(go.Scatter(
-                                x=hist_3mo.index,
-                                y=bb_upper_series,
-                                mode='lines',
-                                name='BB Upper',
-                                line=dict(color='gray', width=1, dash='dash'),
-                                showlegend=False
-                            ))
-                            
-                            fig.add_trace(go.Scatter(
-                                x=hist_3mo.index,
-                                y=bb_lower_series,
-                                mode='lines',
-                                name='BB Lower',
-                                line=dict(color='gray', width=1, dash='dash'),
-                                fill='tonexty',
-                                fillcolor='rgba(128,128,128,0.1)',
-                                showlegend=False
-                            ))
-                            
-                            fig.update_layout(
-                                title=f"{selected_stock} - Advanced Technical Analysis (3 Months)",
-                                xaxis_title="Date",
-                                yaxis_title="Price ($)",
-                                paper_bgcolor=paper_bgcolor,
-                                plot_bgcolor=plot_bgcolor,
-                                font_color=font_color,
-                                title_font_color=font_color,
-                                xaxis=dict(gridcolor=grid_color),
-                                yaxis=dict(gridcolor=grid_color),
-                                height=500,
-                                showlegend=True,
-                                legend=dict(
-                                    yanchor="top",
-                                    y=0.99,
-                                    xanchor="left",
-                                    x=0.01
-                                )
-                            )
-                            
-                            st.plotly_chart(fig, use_container_width=True)
+                            st.plotly_chart(detail_figures['price'], use_container_width=True)
                             
                             # === VOLUME AND RSI CHARTS ===
                             chart_col1, chart_col2 = st.columns(2)
                             
                             with chart_col1:
-                                # Volume chart
-                                fig_vol = go.Figure()
-                                fig_vol.add_trace(go.Bar(
-                                    x=hist_3mo.index,
-                                    y=hist_3mo['Volume'],
-                                    name='Volume',
-                                    marker_color='rgba(79, 172, 254, 0.7)' if st.session_state.dark_mode else 'rgba(102, 126, 234, 0.7)'
-                                ))
-                                
-                                fig_vol.update_layout(
-                                    title="📊 Trading Volume",
-                                    xaxis_title="Date",
-                                    yaxis_title="Volume",
-                                    paper_bgcolor=paper_bgcolor,
-                                    plot_bgcolor=plot_bgcolor,
-                                    font_color=font_color,
-                                    title_font_color=font_color,
-                                    xaxis=dict(gridcolor=grid_color),
-                                    yaxis=dict(gridcolor=grid_color),
-                                    height=300,
-                                    showlegend=False
-                                )
-                                
-                                st.plotly_chart(fig_vol, use_container_width=True)
+                                st.plotly_chart(detail_figures['volume'], use_container_width=True)
                             
                             with chart_col2:
-                                # RSI chart
-                                delta = hist_3mo['Close'].diff()
-                                up = delta.clip(lower=0)
-                                down = -1 * delta.clip(upper=0)
-                                ma_up = up.ewm(com=13).mean()
-                                ma_down = down.ewm(com=13).mean()
-                                rsi_series = 100 - (100 / (1 + ma_up / ma_down))
-                                
-                                fig_rsi = go.Figure()
-                                fig_rsi.add_trace(go.Scatter(
-                                    x=hist_3mo.index,
-                                    y=rsi_series,
-                                    mode='lines',
-                                    name='RSI',
-                                    line=dict(color='purple', width=2)
-                                ))
-                                
-                                # Add RSI levels
-                                fig_rsi.add_hline(y=70, line_dash="dash", line_color="red", annotation_text="Overbought")
-                                fig_rsi.add_hline(y=30, line_dash="dash", line_color="green", annotation_text="Oversold")
-                                fig_rsi.add_hline(y=50, line_dash="dot", line_color="gray", annotation_text="Neutral")
-                                
-                                fig_rsi.update_layout(
-                                    title="📈 RSI Indicator (14-day)",
-                                    xaxis_title="Date",
-                                    yaxis_title="RSI",
-                                    paper_bgcolor=paper_bgcolor,
-                                    plot_bgcolor=plot_bgcolor,
-                                    font_color=font_color,
-                                    title_font_color=font_color,
-                                    xaxis=dict(gridcolor=grid_color),
-                                    yaxis=dict(gridcolor=grid_color, range=[0, 100]),
-                                    height=300,
-                                    showlegend=False
-                                )
-                                
-                                st.plotly_chart(fig_rsi, use_container_width=True)
+                                st.plotly_chart(detail_figures['rsi'], use_container_width=True)
                             
                             # === COMPANY INFORMATION ===
                             if info.get('longBusinessSummary'):
@@ -959,8 +947,10 @@ if st.session_state.screening_results is not None:
                         st.error(f"Could not load comprehensive details for {selected_stock}: {str(e)}")
                         # Fallback to basic chart
                         try:
-                            ticker = yf.Ticker(selected_stock)
-                            hist = ticker.history(period="3mo")
+                            import plotly.graph_objects as go
+                            from providers import get_provider
+
+                            hist = get_provider().history(selected_stock, period="3mo")
                             if not hist.empty:
                                 fig = go.Figure(data=go.Candlestick(x=hist.index,
                                                                   open=hist['Open'],
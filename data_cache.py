@@ -0,0 +1,477 @@
+"""
+Shared time-to-live cache for fetched market data.
+
+One cache per namespace ('info', 'finviz', 'metrics', ...) is shared by every
+Streamlit session and worker thread in the process. Entries are kept in
+memory and persisted by a backend chosen with CACHE_BACKEND:
+
+- files:  one pickle file per entry under CACHE_DIR (default)
+- sqlite: a single CACHE_DIR/cache.sqlite database, safe to share between
+          processes (e.g. several dashboard replicas on one host)
+- memory: no persistence
+
+Misses are single-flight: concurrent requests for the same key wait for one
+fetch instead of each hitting the network. With the SQLite backend a lease
+row extends this across processes. The cache directory is kept under
+CACHE_MAX_BYTES by evicting the least recently written entries.
+
+Large in-memory frames (price histories, indicator frames) are held in
+ByteLRU maps bounded by bytes rather than entry count, after compact_frame
+has shrunk their dtypes. The in-memory layer of each TTL cache is an LRU of
+at most MEMORY_CACHE_ENTRIES entries, and expired entries are dropped when
+read and swept out periodically on writes.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from config import get_config
+from market_calendar import still_current
+
+_MISSING = object()
+
+SQLITE_FILE = 'cache.sqlite'
+LEASE_SECONDS = 30.0
+LEASE_POLL = 0.1
+# TTLCache writes between sweeps of expired in-memory entries
+SWEEP_EVERY = 256
+
+
+def frame_nbytes(value):
+    """Approximate memory held by a frame, array or tuple of them."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(frame_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def compact_frame(df, max_category_ratio=0.5):
+    """
+    Return a copy of a frame with smaller dtypes
+
+    Floats become float32, integers the smallest type that holds them and
+    repetitive string columns categoricals.
+
+    Args:
+        df (DataFrame): Frame to compact
+        max_category_ratio (float): Largest unique/rows ratio converted to category
+
+    Returns:
+        DataFrame: Compacted copy
+    """
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series.dtype):
+            series = series.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(series.dtype) and len(series):
+            series = pd.to_numeric(series, downcast='integer')
+        elif series.dtype == object and len(series):
+            if series.nunique(dropna=False) <= max_category_ratio * len(series):
+                series = series.astype('category')
+        out[col] = series
+    return pd.DataFrame(out, index=df.index)
+
+
+class ByteLRU:
+    """Thread-safe LRU map bounded by the total size of its values."""
+
+    def __init__(self, max_bytes, sizeof=frame_nbytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value):
+        """Store value, evicting least recently used items over the budget."""
+        size = self.sizeof(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.nbytes -= evicted
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return default
+            self.nbytes -= item[1]
+            return item[0]
+
+    def prune(self, expired):
+        """Drop every item whose value expired(value) is true; returns how many."""
+        with self._lock:
+            stale = [key for key, (value, _) in self._items.items() if expired(value)]
+            for key in stale:
+                self.nbytes -= self._items.pop(key)[1]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the call already in progress."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if leader:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        return future.result()
+
+
+class FileBackend:
+    """One pickle file per entry."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, namespace, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, namespace, f"{digest}.pkl")
+
+    def get(self, namespace, key):
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except OSError:
+            return None
+        except Exception:
+            # Truncated or foreign pickles can raise almost anything: a miss
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def set(self, namespace, key, entry):
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+class SQLiteBackend:
+    """All entries in one SQLite database shared across processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, "
+                         "saved_at REAL, value BLOB, PRIMARY KEY (namespace, key))")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (namespace TEXT, key TEXT, "
+                         "owner TEXT, expires REAL, PRIMARY KEY (namespace, key))")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._connect().execute(
+            "SELECT saved_at, value FROM entries WHERE namespace = ? AND key = ?",
+            (namespace, repr(key))).fetchone()
+        if row is None:
+            return None
+        try:
+            return (row[0], pickle.loads(row[1]))
+        except Exception:
+            # Truncated or foreign pickles can raise almost anything: a miss
+            with self._connect() as conn:
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?",
+                             (namespace, repr(key)))
+            return None
+
+    def set(self, namespace, key, entry):
+        blob = pickle.dumps(entry[1], protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                         (namespace, repr(key), entry[0], blob))
+
+    def acquire_lease(self, namespace, key):
+        """Claim the right to fetch key; False if another process holds it."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE namespace = ? AND key = ? AND expires < ?",
+                         (namespace, repr(key), now))
+            cursor = conn.execute("INSERT OR IGNORE INTO leases VALUES (?, ?, ?, ?)",
+                                  (namespace, repr(key), self.owner, now + LEASE_SECONDS))
+            return cursor.rowcount == 1
+
+    def release_lease(self, namespace, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?",
+                         (namespace, repr(key), self.owner))
+
+    def prune(self, max_bytes):
+        """Delete the oldest entries until stored values fit max_bytes."""
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM entries").fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            freed = 0
+            rows = conn.execute("SELECT namespace, key, LENGTH(value) FROM entries "
+                                "ORDER BY saved_at").fetchall()
+            for namespace, key, size in rows:
+                if total - freed <= max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                freed += size
+            return freed
+
+
+class TTLCache:
+    """
+    Thread-safe memory cache for one namespace over a persistent backend
+
+    The memory layer keeps the max_entries most recently used entries.
+    """
+
+    def __init__(self, namespace, ttl, backend=None, max_entries=10000):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.backend = backend
+        self._memory = ByteLRU(max_entries, sizeof=lambda entry: 1)
+        self._writes = 0
+        self._flights = SingleFlight()
+
+    def _expired(self, entry, now=None):
+        return not still_current(entry[0], self.ttl, now)
+
+    def _lookup(self, key, now, max_age=None):
+        entry = self._memory.get(key)
+        if entry is None and self.backend is not None:
+            entry = self.backend.get(self.namespace, key)
+            if entry is not None and not self._expired(entry, now):
+                self._memory.put(key, entry)
+        if entry is None:
+            return _MISSING
+        if self._expired(entry, now):
+            self._memory.pop(key)
+            return _MISSING
+        # A caller needing newer data than the TTL ignores (but keeps) older entries
+        if max_age is not None and max_age < self.ttl and not still_current(entry[0], max_age, now):
+            return _MISSING
+        return entry[1]
+
+    def get(self, key, default=None, max_age=None):
+        """Return a fresh cached value (no older than max_age, if given) or default."""
+        if self.ttl <= 0:
+            return default
+        value = self._lookup(key, time.time(), max_age)
+        return default if value is _MISSING else value
+
+    def saved_at(self, key):
+        """Unix time the fresh entry for key was stored, or None."""
+        if self.ttl <= 0:
+            return None
+        entry = self._memory.get(key)
+        if entry is None and self.backend is not None:
+            entry = self.backend.get(self.namespace, key)
+        return None if entry is None or self._expired(entry) else entry[0]
+
+    def set(self, key, value):
+        """Store a value in memory and in the backend."""
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        entry = (now, value)
+        self._memory.put(key, entry)
+        # Keys that are never read again (e.g. metrics keyed by a moved quote) expire here
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            self._memory.prune(lambda old: self._expired(old, now))
+        if self.backend is not None:
+            try:
+                self.backend.set(self.namespace, key, entry)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not write {self.namespace} cache entry: {e}")
+
+    def get_or_fetch(self, key, fetch, max_age=None):
+        """
+        Return the cached value for key, calling fetch() on a miss
+
+        Concurrent misses for the same key share a single fetch() call.
+        With max_age (seconds), entries older than that count as misses even
+        within the TTL (e.g. quotes polled more often than CACHE_DURATION).
+        """
+        value = self.get(key, _MISSING, max_age)
+        if value is not _MISSING:
+            return value
+        return self._flights.do(key, lambda: self._fill(key, fetch, max_age))
+
+    def _fill(self, key, fetch, max_age=None):
+        # Another flight may have filled the entry while we queued
+        value = self.get(key, _MISSING, max_age)
+        if value is not _MISSING:
+            return value
+
+        leased = False
+        if isinstance(self.backend, SQLiteBackend) and self.ttl > 0:
+            deadline = time.time() + LEASE_SECONDS
+            while not self.backend.acquire_lease(self.namespace, key):
+                # Another process is fetching this key; wait for its result
+                time.sleep(LEASE_POLL)
+                value = self.get(key, _MISSING, max_age)
+                if value is not _MISSING:
+                    return value
+                if time.time() > deadline:
+                    break
+            else:
+                leased = True
+        try:
+            value = fetch()
+            self.set(key, value)
+            return value
+        finally:
+            if leased:
+                self.backend.release_lease(self.namespace, key)
+
+    def __len__(self):
+        return len(self._memory)
+
+    def clear(self):
+        self._memory.clear()
+
+
+def make_backend(config):
+    """Build the persistence backend selected by CACHE_BACKEND."""
+    if config.cache_backend == 'memory':
+        return None
+    if config.cache_backend == 'sqlite':
+        return SQLiteBackend(os.path.join(config.cache_dir, SQLITE_FILE))
+    return FileBackend(config.cache_dir)
+
+
+_caches = {}
+_backend = None
+_caches_lock = threading.Lock()
+
+
+def get_cache(namespace):
+    """Return the process-wide cache for a namespace (rebuilt if the config changes)."""
+    global _backend
+    config = get_config()
+    with _caches_lock:
+        if _backend is None or _backend[0] is not config:
+            _backend = (config, make_backend(config))
+            _caches.clear()
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = TTLCache(namespace, config.cache_duration, _backend[1],
+                                                  config.memory_cache_entries)
+        return cache
+
+
+def prune_cache_dir(cache_dir=None, max_bytes=None):
+    """
+    Delete the oldest cache files until the directory fits the size cap
+
+    The SQLite database (if used) is pruned row by row within the budget
+    left by the files.
+
+    Args:
+        cache_dir (str): Cache root (defaults to CACHE_DIR)
+        max_bytes (int): Size cap (defaults to CACHE_MAX_BYTES)
+
+    Returns:
+        int: Number of bytes freed
+    """
+    config = get_config()
+    cache_dir = cache_dir or config.cache_dir
+    max_bytes = config.cache_max_bytes if max_bytes is None else max_bytes
+
+    # The fundamentals history is a record, not a cache, and is never evicted
+    keep = os.path.normpath(os.path.join(cache_dir, os.path.basename(config.fundamentals_dir)))
+    files = []
+    for root, dirs, names in os.walk(cache_dir):
+        dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(root, d)) != keep]
+        for name in names:
+            if name.startswith(SQLITE_FILE):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    freed = 0
+    for _, size, path in sorted(files):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            pass
+
+    backend = _backend[1] if _backend is not None else None
+    if isinstance(backend, SQLiteBackend):
+        try:
+            freed += backend.prune(max(0, max_bytes - (total - freed)))
+        except sqlite3.Error as e:
+            print(f"Could not prune cache database: {e}")
+    return freed
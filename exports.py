@@ -0,0 +1,222 @@
+"""
+Exports of screening results.
+
+The typed result table (see result_table.results_frame) is rendered to a file
+only when an export is requested, together with the run metadata and the
+screening parameters, and optionally every pick's full bar and indicator
+series for offline analysis:
+
+    csv      the result table; a zip with series.csv and run.json when the
+             series are included
+    parquet  the result table, run metadata and parameters in the file's
+             metadata; a zip with series.parquet when the series are included
+    xlsx     sheets Results, Parameters, Run and (optionally) Series
+    json     {"run": ..., "parameters": ..., "results": [...], "series": {...}}
+
+Rendered files are cached by a hash of their inputs, so downloading the same
+result again, or a dashboard rerun, doesn't render it twice. Parquet needs
+pyarrow (or fastparquet) and Excel openpyxl (or xlsxwriter);
+available_formats() lists what this installation can write.
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import sys
+import zipfile
+
+import pandas as pd
+
+from config import get_config
+from data_cache import ByteLRU
+from indicators import indicators_for
+from timeframes import get_bars, series_key
+
+EXPORT_FORMATS = {
+    'csv': ('CSV', 'csv', 'text/csv'),
+    'parquet': ('Parquet', 'parquet', 'application/vnd.apache.parquet'),
+    'xlsx': ('Excel', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'json': ('JSON', 'json', 'application/json'),
+}
+ENGINES = {'parquet': ('pyarrow', 'fastparquet'), 'xlsx': ('openpyxl', 'xlsxwriter')}
+ZIP_MIME = 'application/zip'
+CACHE_BYTES = 64 * 1024 * 1024
+
+_cache = ByteLRU(CACHE_BYTES, sizeof=lambda export: len(export[0]))
+
+
+def available_formats():
+    """Export formats whose writer library is installed."""
+    return [fmt for fmt in EXPORT_FORMATS
+            if fmt not in ENGINES or any(importlib.util.find_spec(engine) for engine in ENGINES[fmt])]
+
+
+def run_metadata(run_at, rows, report=None, **extra):
+    """
+    Metadata describing a screening run
+
+    Args:
+        run_at (datetime): When the scan finished
+        rows (int): Result rows
+        report (RunReport): Data quality report of the scan
+        **extra: Further JSON-serializable fields (mode, timeframe...)
+
+    Returns:
+        dict: Run metadata
+    """
+    meta = {'run_at': run_at.isoformat(timespec='seconds'), 'rows': int(rows),
+            'data_provider': get_config().data_provider}
+    if report is not None:
+        meta['tickers_scanned'] = report.scanned
+        meta['data_quality'] = report.summary()
+    meta.update(extra)
+    return meta
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _dumps(value, **kwargs):
+    return json.dumps(value, default=_json_default, ensure_ascii=False, **kwargs)
+
+
+def export_key(results, fmt, params, run, include_series):
+    """Hash of everything an export's content depends on."""
+    digest = hashlib.sha1(f"{fmt}:{include_series}".encode())
+    digest.update(pd.util.hash_pandas_object(results, index=False).to_numpy().tobytes())
+    digest.update('\0'.join(map(str, results.columns)).encode())
+    digest.update(_dumps([params, run], sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def indicator_series(symbols, timeframe='1d'):
+    """
+    Bars and screening indicators of every pick, in long format
+
+    Uses the histories and stored indicator frames the scan just produced,
+    so nothing is recomputed or refetched for tickers still in memory.
+
+    Args:
+        symbols (list): Ticker symbols
+        timeframe (str): Bar timeframe the scan used
+
+    Returns:
+        DataFrame: Ticker, Date, OHLCV and indicator columns
+    """
+    frames = []
+    for symbol in dict.fromkeys(symbols):
+        try:
+            hist = get_bars(symbol, timeframe)
+            if hist is None or hist.empty:
+                continue
+            bars = hist[['Open', 'High', 'Low', 'Close', 'Volume']]
+            indicators = indicators_for(series_key(symbol, timeframe), hist)
+            frame = pd.concat([bars, indicators.astype('float64')], axis=1)
+        except Exception as e:
+            print(f"Export: no series for {symbol}: {e}", file=sys.stderr)
+            continue
+        frame.index = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+        frames.append(frame.rename_axis('Date').reset_index().assign(Ticker=symbol))
+    if not frames:
+        return pd.DataFrame(columns=['Ticker', 'Date'])
+    series = pd.concat(frames, ignore_index=True)
+    return series[['Ticker'] + [col for col in series.columns if col != 'Ticker']]
+
+
+def _plain(results):
+    """Result table with categoricals as plain text (for writers that don't keep them)."""
+    return results.astype({col: object for col in results.columns
+                           if isinstance(results[col].dtype, pd.CategoricalDtype)})
+
+
+def _parquet(frame, attrs=None):
+    buffer = io.BytesIO()
+    frame = frame.copy()
+    frame.attrs = attrs or {}
+    frame.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _render(results, fmt, params, run, series):
+    info = {'run': run, 'parameters': params}
+    if fmt == 'json':
+        doc = dict(info, results=json.loads(_plain(results).to_json(orient='records', date_format='iso')))
+        if series is not None:
+            doc['series'] = {symbol: json.loads(rows.drop(columns='Ticker').to_json(orient='records',
+                                                                                     date_format='iso'))
+                             for symbol, rows in series.groupby('Ticker', sort=False)}
+        return _dumps(doc, indent=1).encode()
+
+    if fmt == 'xlsx':
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer) as writer:
+            _plain(results).to_excel(writer, sheet_name='Results', index=False)
+            pd.DataFrame({'Parameter': list(params), 'Value': [_dumps(v) for v in params.values()]}
+                         ).to_excel(writer, sheet_name='Parameters', index=False)
+            pd.DataFrame({'Field': list(run), 'Value': [str(v) for v in run.values()]}
+                         ).to_excel(writer, sheet_name='Run', index=False)
+            if series is not None:
+                series.to_excel(writer, sheet_name='Series', index=False)
+        return buffer.getvalue()
+
+    if fmt == 'parquet':
+        table = _parquet(results, attrs=json.loads(_dumps(info)))
+        if series is None:
+            return table
+        return _zip({'results.parquet': table, 'series.parquet': _parquet(series),
+                     'run.json': _dumps(info, indent=1)})
+
+    table = results.to_csv(index=False)
+    if series is None:
+        return table.encode()
+    return _zip({'results.csv': table, 'series.csv': series.to_csv(index=False),
+                 'run.json': _dumps(info, indent=1)})
+
+
+def export_results(results, fmt, params=None, run=None, include_series=False, timeframe='1d'):
+    """
+    Render a result table as a downloadable file
+
+    Args:
+        results (DataFrame): Typed result table (one row per pick, 'Ticker' column)
+        fmt (str): One of EXPORT_FORMATS
+        params (dict): Screening parameters of the run
+        run (dict): Run metadata (see run_metadata)
+        include_series (bool): Add every pick's bars and indicators
+        timeframe (str): Bar timeframe of the series
+
+    Returns:
+        tuple: (file content bytes, file extension, MIME type)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(EXPORT_FORMATS)})")
+    params = dict(params or {})
+    run = dict(run or {})
+    key = export_key(results, fmt, params, run, include_series and timeframe)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    series = None
+    if include_series and 'Ticker' in results.columns:
+        series = indicator_series(results['Ticker'].tolist(), timeframe)
+    data = _render(results, fmt, params, run, series)
+    extension, mime = EXPORT_FORMATS[fmt][1:]
+    if series is not None and fmt in ('csv', 'parquet'):
+        extension, mime = f"{extension}.zip", ZIP_MIME
+    export = (data, extension, mime)
+    _cache.put(key, export)
+    return export
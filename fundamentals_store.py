@@ -0,0 +1,188 @@
+"""
+Point-in-time history of fetched fundamentals.
+
+yfinance info is a live snapshot: forward P/E, recommendation, beta and
+market cap have no history, so a backtest of the fundamental filters would
+judge past bars by today's values (look-ahead bias). Every fetched snapshot
+of the screening fundamentals is therefore recorded here, at most once per
+ticker and exchange day unless it changed.
+
+Snapshots are buffered and appended as gzip-compressed pickled batches to
+one file per month under CACHE_DIR/fundamentals. Files are only ever
+appended to, and the cache size cap doesn't evict them. history() reads the
+store back as one long table; asof_join() and asof_panel() attach to each
+(ticker, date) the latest snapshot taken on or before that exchange day.
+"""
+import atexit
+import gzip
+import os
+import pickle
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from config import get_config
+from market_calendar import EXCHANGE_TZ
+
+FLUSH_ROWS = 500
+
+_buffer = []
+_latest = {}
+_lock = threading.Lock()
+_history = None
+
+
+def _store_dir(store_dir=None):
+    return store_dir or get_config().fundamentals_dir
+
+
+def _exchange_days(values):
+    """Exchange-local calendar days (naive, midnight) of timestamps or dates."""
+    days = pd.DatetimeIndex(pd.to_datetime(values))
+    if days.tz is not None:
+        days = days.tz_convert(EXCHANGE_TZ).tz_localize(None)
+    return days.normalize()
+
+
+def record_snapshot(symbol, fundamentals, day=None):
+    """
+    Remember a ticker's fundamentals as known today
+
+    Args:
+        symbol (str): Ticker symbol
+        fundamentals (dict): Screening fundamentals (see extract_fundamentals)
+        day (date): Exchange day of the snapshot (defaults to today)
+    """
+    day = pd.Timestamp(day or datetime.now(EXCHANGE_TZ).date())
+    values = dict(fundamentals)
+    with _lock:
+        if _latest.get(symbol) == (day, values):
+            return
+        _latest[symbol] = (day, values)
+        _buffer.append({'ticker': symbol, 'date': day, **values})
+        full = len(_buffer) >= FLUSH_ROWS
+    if full:
+        flush_snapshots()
+
+
+def flush_snapshots(store_dir=None):
+    """Append buffered snapshots to the store (one compressed batch per month file)."""
+    global _history
+    with _lock:
+        if not _buffer:
+            return
+        batch = pd.DataFrame(_buffer)
+        _buffer.clear()
+        directory = _store_dir(store_dir)
+        os.makedirs(directory, exist_ok=True)
+        for month, rows in batch.groupby(batch['date'].dt.strftime('%Y-%m'), sort=True):
+            with gzip.open(os.path.join(directory, f"{month}.pkl.gz"), 'ab') as f:
+                pickle.dump(rows.reset_index(drop=True), f, protocol=pickle.HIGHEST_PROTOCOL)
+        _history = None
+
+
+atexit.register(flush_snapshots)
+
+
+def _read_batches(path):
+    batches = []
+    with gzip.open(path, 'rb') as f:
+        while True:
+            try:
+                batches.append(pickle.load(f))
+            except EOFError:
+                return batches
+
+
+def history(store_dir=None):
+    """
+    Every recorded snapshot
+
+    Returns:
+        DataFrame: One row per ticker and day (the day's last snapshot), with
+        ticker, date and the fundamentals columns, sorted by date
+    """
+    global _history
+    flush_snapshots(store_dir)
+    directory = _store_dir(store_dir)
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.pkl.gz'))
+    except FileNotFoundError:
+        names = []
+    signature = (directory, tuple((name, os.path.getsize(os.path.join(directory, name)))
+                                  for name in names))
+    with _lock:
+        if _history is not None and _history[0] == signature:
+            return _history[1]
+
+    batches = [batch for name in names for batch in _read_batches(os.path.join(directory, name))]
+    if batches:
+        known = pd.concat(batches, ignore_index=True)
+        known = (known.drop_duplicates(['ticker', 'date'], keep='last')
+                 .sort_values('date', kind='stable').reset_index(drop=True))
+    else:
+        known = pd.DataFrame({'ticker': pd.Series(dtype=object),
+                              'date': pd.Series(dtype='datetime64[ns]')})
+    with _lock:
+        _history = (signature, known)
+    return known
+
+
+def asof_join(keys, store_dir=None):
+    """
+    Fundamentals known on given days
+
+    Args:
+        keys (DataFrame): ticker and date columns (timestamps or dates)
+
+    Returns:
+        DataFrame: keys' ticker and date (same index) with the fundamentals
+        of the latest snapshot taken on or before each day, and its day as
+        'snapshot_date'; NaN where the ticker has no earlier snapshot
+    """
+    known = history(store_dir)
+    right = known.rename(columns={'date': 'snapshot_date'})
+    right['_day'] = right['snapshot_date'].astype('datetime64[ns]')
+    left = keys[['ticker', 'date']].assign(
+        _day=_exchange_days(keys['date']).astype('datetime64[ns]'), _row=np.arange(len(keys)))
+    joined = pd.merge_asof(left.sort_values('_day', kind='stable'), right,
+                           on='_day', by='ticker', direction='backward')
+    joined = joined.sort_values('_row').drop(columns=['_day', '_row'])
+    joined.index = keys.index
+    return joined
+
+
+def asof_panel(panel, fields=None, store_dir=None):
+    """
+    Fundamentals known on each day of a price panel
+
+    Args:
+        panel (DataFrame): Dates x tickers (e.g. universe_analytics.price_panel)
+        fields (list): Fundamentals to return (defaults to every recorded one)
+
+    Returns:
+        dict: field -> DataFrame shaped like panel, each cell the value of the
+        latest snapshot taken on or before that day (NaN before the first)
+    """
+    known = history(store_dir)
+    fields = fields or [column for column in known.columns if column not in ('ticker', 'date')]
+    days = _exchange_days(panel.index)
+    snapshot_days = pd.DatetimeIndex(known['date'].unique()).sort_values()
+    # Row of the latest snapshot day at or before each panel day (-1: none yet)
+    rows = snapshot_days.searchsorted(days, side='right') - 1
+    before = rows < 0
+
+    out = {}
+    for field in fields:
+        if field not in known.columns or known.empty:
+            out[field] = pd.DataFrame(np.nan, index=panel.index, columns=panel.columns)
+            continue
+        wide = (known.pivot(index='date', columns='ticker', values=field)
+                .reindex(index=snapshot_days, columns=panel.columns).ffill())
+        frame = pd.DataFrame(wide.to_numpy()[np.maximum(rows, 0)],
+                             index=panel.index, columns=panel.columns)
+        frame.iloc[before] = np.nan
+        out[field] = frame
+    return out
@@ -0,0 +1,287 @@
+"""
+Single-source technical indicator definitions.
+
+Every indicator used by the screener and the dashboard is registered here
+once, with its default parameters. Indicator frames are computed once per
+ticker history and kept (as float32) in a per-process store bounded by
+STORE_BYTES, so the detail view shows exactly the values that qualified a
+pick instead of recomputing them with slightly different settings. When a
+history gains new bars, a stored frame is extended rather than recomputed:
+windowed indicators are evaluated over just the new bars plus their
+lookback, and recursive ones (RSI) continue from their saved state.
+"""
+import numpy as np
+import pandas as pd
+
+from data_cache import ByteLRU, compact_frame
+
+INDICATORS = {}
+LOOKBACKS = {}
+UPDATERS = {}
+STORE_BYTES = 64 * 1024 ** 2
+
+# Relative tolerance when matching a history's closes to a stored frame's;
+# stored closes are float32
+CLOSE_RTOL = 1e-6
+
+_store = ByteLRU(STORE_BYTES)
+
+
+def register(name, lookback=None, **defaults):
+    """
+    Register an indicator function under a name with default parameters
+
+    The function receives the OHLCV history plus its parameters and returns
+    a Series, or a dict of suffix -> Series for multi-output indicators.
+    lookback(params) is the number of trailing bars that determine the
+    newest value; indicators without one are recursive and register an
+    updater with updates().
+    """
+    def decorator(fn):
+        INDICATORS[name] = (fn, defaults)
+        if lookback is not None:
+            LOOKBACKS[name] = lookback
+        return fn
+    return decorator
+
+
+def updates(name):
+    """
+    Register the incremental form of a recursive indicator
+
+    The updater receives a history, the state saved at its first bar (None
+    to start from scratch) and the indicator's parameters. It returns the
+    values for the bars after the first one (every bar when starting from
+    scratch) and the state at the last bar.
+    """
+    def decorator(fn):
+        UPDATERS[name] = fn
+        return fn
+    return decorator
+
+
+@register('sma', lookback=lambda p: p['window'], window=20)
+def sma(hist, window):
+    return hist['Close'].rolling(window).mean()
+
+
+def _wilder_averages(close, period, seed=None):
+    """Smoothed average gain and loss, optionally continuing from seed at close's first bar."""
+    delta = close.diff()
+    up = delta.clip(lower=0)
+    down = -1 * delta.clip(upper=0)
+    if seed is not None:
+        up.iloc[0], down.iloc[0] = seed
+    ma_up = up.ewm(com=period - 1, adjust=False).mean()
+    ma_down = down.ewm(com=period - 1, adjust=False).mean()
+    return ma_up, ma_down
+
+
+@register('rsi', period=14)
+def rsi(hist, period):
+    ma_up, ma_down = _wilder_averages(hist['Close'], period)
+    return 100 - (100 / (1 + ma_up / ma_down))
+
+
+@updates('rsi')
+def rsi_update(hist, state, period):
+    ma_up, ma_down = _wilder_averages(hist['Close'], period, seed=state)
+    values = 100 - (100 / (1 + ma_up / ma_down))
+    if state is not None:
+        values = values.iloc[1:]
+    return values, (float(ma_up.iloc[-1]), float(ma_down.iloc[-1]))
+
+
+@register('bb', lookback=lambda p: p['window'], window=20, num_std=2)
+def bollinger(hist, window, num_std):
+    rolling = hist['Close'].rolling(window)
+    mid = rolling.mean()
+    std = rolling.std()
+    return {
+        'mid': mid,
+        'std': std,
+        'upper': mid + num_std * std,
+        'lower': mid - num_std * std,
+    }
+
+
+@register('atr', lookback=lambda p: p['period'] + 1, period=14)
+def atr(hist, period):
+    high = hist['High'].to_numpy(dtype=float)
+    low = hist['Low'].to_numpy(dtype=float)
+    prev_close = hist['Close'].shift().to_numpy(dtype=float)
+    # True range without building an intermediate 3-column frame
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return pd.Series(tr, index=hist.index).rolling(period).mean()
+
+
+@register('return', lookback=lambda p: p['periods'] + 1, periods=5)
+def returns(hist, periods):
+    return hist['Close'].pct_change(periods)
+
+
+@register('avg_volume', lookback=lambda p: p['window'], window=30)
+def avg_volume(hist, window):
+    return hist['Volume'].rolling(window).mean()
+
+
+def spec(name, **params):
+    """Build an indicator spec, filling in registered defaults."""
+    full = dict(INDICATORS[name][1])
+    full.update(params)
+    return (name, tuple(full.items()))
+
+
+def column_names(indicator_spec):
+    """
+    Column names produced by a spec, e.g. sma_50, rsi_14, bb_upper_20_2
+
+    Args:
+        indicator_spec (tuple): Output of spec()
+
+    Returns:
+        list: Column names
+    """
+    name, params = indicator_spec
+    suffix = '_'.join(str(v) for _, v in params)
+    if name == 'bb':
+        return [f"bb_{part}_{suffix}" for part in ('mid', 'std', 'upper', 'lower')]
+    return [f"{name}_{suffix}"]
+
+
+# Indicators used by run_stock_screening and the detail view
+SCREENER_SPECS = [
+    spec('return', periods=5),
+    spec('sma', window=20),
+    spec('sma', window=50),
+    spec('sma', window=200),
+    spec('rsi', period=14),
+    spec('bb', window=20, num_std=2),
+    spec('atr', period=14),
+    spec('avg_volume', window=30),
+]
+
+
+def _add_columns(columns, indicator_spec, out):
+    names = column_names(indicator_spec)
+    if isinstance(out, dict):
+        for col, series in zip(names, out.values()):
+            columns[col] = series
+    else:
+        columns[names[0]] = out
+
+
+def _compute(hist, specs):
+    """Indicator frame for hist plus the state of its recursive indicators."""
+    columns, state = {}, {}
+    for indicator_spec in specs:
+        name, params = indicator_spec
+        if name in UPDATERS:
+            out, state[indicator_spec] = UPDATERS[name](hist, None, **dict(params))
+        else:
+            out = INDICATORS[name][0](hist, **dict(params))
+        _add_columns(columns, indicator_spec, out)
+    return pd.DataFrame(columns, index=hist.index), state
+
+
+def _extend(frame, state, hist, specs):
+    """
+    Indicator rows for the bars of hist after the stored frame's last bar
+
+    Returns None if some indicator can't be extended (no lookback and no
+    saved state).
+    """
+    pos = hist.index.get_loc(frame.index[-1])
+    columns, new_state = {}, dict(state)
+    for indicator_spec in specs:
+        name, params = indicator_spec
+        params = dict(params)
+        if name in UPDATERS:
+            if indicator_spec not in state:
+                return None
+            out, new_state[indicator_spec] = UPDATERS[name](hist.iloc[pos:], state[indicator_spec],
+                                                             **params)
+        elif name in LOOKBACKS:
+            # Enough history for the first new bar's window
+            start = max(0, pos + 2 - LOOKBACKS[name](params))
+            out = INDICATORS[name][0](hist.iloc[start:], **params)
+            if isinstance(out, dict):
+                out = {key: series.iloc[-(len(hist) - pos - 1):] for key, series in out.items()}
+            else:
+                out = out.iloc[-(len(hist) - pos - 1):]
+        else:
+            return None
+        _add_columns(columns, indicator_spec, out)
+    return pd.DataFrame(columns, index=hist.index[pos + 1:]), new_state
+
+
+def compute_indicators(hist, specs=None):
+    """
+    Compute a set of indicators over a history
+
+    Args:
+        hist (DataFrame): OHLCV history (oldest first)
+        specs (list): Indicator specs (defaults to SCREENER_SPECS)
+
+    Returns:
+        DataFrame: One column per indicator output, aligned to hist
+    """
+    return _compute(hist, specs or SCREENER_SPECS)[0]
+
+
+def indicators_for(symbol, hist, specs=None):
+    """
+    Return indicators for a ticker history, reusing a stored frame
+
+    A stored frame is reused when it covers every bar of hist and has all
+    requested columns; because every indicator is causal, its values over
+    hist's dates equal a fresh computation on the longer history it was
+    computed from (with more warm-up). A frame whose closes differ from hist
+    (e.g. a revised last bar) is not reused. When hist only adds bars after
+    the stored frame's last one, the frame is extended with rows for the new
+    bars. Otherwise the indicators are computed on hist and stored.
+
+    Args:
+        symbol (str): Stock ticker symbol (None disables the store)
+        hist (DataFrame): OHLCV history
+        specs (list): Indicator specs (defaults to SCREENER_SPECS)
+
+    Returns:
+        DataFrame: Indicator columns aligned to hist
+    """
+    specs = specs or SCREENER_SPECS
+    wanted = [col for s in specs for col in column_names(s)]
+
+    if symbol is not None:
+        entry = _store.get(symbol)
+        if entry is not None and len(hist) and set(wanted).issubset(entry[0].columns):
+            frame, closes, state = entry
+            known = hist.index[hist.index <= frame.index[-1]]
+            # Same bars with the same closes (a revised last bar is recomputed)
+            if (len(known) and known.isin(frame.index).all()
+                    and np.allclose(closes.loc[known].to_numpy(), hist['Close'].loc[known].to_numpy(),
+                                    rtol=CLOSE_RTOL, atol=0, equal_nan=True)):
+                if len(known) == len(hist):
+                    return frame.loc[hist.index, wanted]
+                extended = _extend(frame, state, hist, specs) if known[-1] == frame.index[-1] else None
+                if extended is not None:
+                    new_rows, state = extended
+                    frame = pd.concat([frame.loc[known, wanted], new_rows])
+                    store_indicators(symbol, frame, hist['Close'], state)
+                    return frame
+
+    frame, state = _compute(hist, specs)
+    if symbol is not None:
+        store_indicators(symbol, frame, hist['Close'], state)
+    return frame
+
+
+def store_indicators(symbol, frame, closes, state=None):
+    """Keep a ticker's indicator frame, the closes it came from and its recursive state."""
+    _store.put(symbol, (compact_frame(frame), closes.astype(np.float32), state or {}))
+
+
+def cached_indicators(symbol):
+    """Return the stored indicator frame for a ticker, or None."""
+    entry = _store.get(symbol)
+    return entry[0] if entry is not None else None
@@ -1,144 +1,359 @@
-import yfinance as yf
+"""
+Headless command-line stock screener.
+
+Runs the same screen as the dashboard (run_stock_screening) without booting
+Streamlit, so it can be scheduled from cron or used inside pipelines.
+
+Examples:
+    python main.py
+    python main.py --max-pe 20 --recommendation buy --workers 8
+    python main.py --params screen.yaml --format jsonl --output picks.jsonl
+    python main.py --screens screens.yaml --format csv
+    python main.py --format xlsx --series --output picks.xlsx
+    python main.py --top 20 --weights fwd_pe=2,rsi=0.5
+    python main.py --profile sample --profile-memory
+    python main.py --record session/ && python main.py --replay session/ --cache-dir /tmp/replay
+
+Exit codes:
+    0  screening completed
+    1  no stocks matched and --fail-if-empty was given
+    2  invalid arguments or parameter file
+    3  screening or output failed
+"""
+import argparse
+import contextlib
+import os
+import sys
+from dataclasses import replace
+from datetime import datetime
+
 import pandas as pd
-import numpy as np
-import requests
-from bs4 import BeautifulSoup
-import time
 
-# 1. Define your universe (e.g., S&P 500 tickers list)
-sp500 = pd.read_csv('sp500_tickers.csv')  # list of tickers
+from config import get_config, set_config
+from exports import export_results, run_metadata
+from profiling import DEFAULT_DIR, PROFILE_MODES, RunProfile
+from scoring import MARGINS, run_scored_screening
+from screens import coerce_param, load_screens
+from stock_screener import DEFAULT_PARAMS, load_tickers, run_screens, run_stock_screening
+from validation import RunReport
+
+EXIT_OK = 0
+EXIT_EMPTY = 1
+EXIT_USAGE = 2
+EXIT_FAILED = 3
+
+OUTPUT_FORMATS = ['table', 'csv', 'jsonl', 'json', 'parquet', 'xlsx']
+SERIES_FORMATS = ['csv', 'json', 'parquet', 'xlsx']
+
+# CLI flag -> params key
+PARAM_FLAGS = {
+    'max_pe': ('--max-pe', float, "Maximum forward P/E"),
+    'min_price': ('--min-price', float, "Minimum price ($)"),
+    'min_market_cap': ('--min-market-cap', float, "Minimum market cap ($)"),
+    'min_beta': ('--min-beta', float, "Minimum beta"),
+    'min_return': ('--min-return', float, "Minimum 5-bar return (decimal, e.g. 0.05)"),
+    'rsi_min': ('--rsi-min', float, "RSI lower bound (exclusive)"),
+    'rsi_max': ('--rsi-max', float, "RSI upper bound (exclusive)"),
+    'min_volume': ('--min-volume', float, "Minimum 30-bar average volume"),
+    'consecutive_days': ('--consecutive-days', int, "Up-days needed for the momentum flag"),
+    'max_sector_pe_pct': ('--max-sector-pe-pct', float, "Maximum forward P/E percentile within the sector (0-100)"),
+    'min_sector_rs': ('--min-sector-rs', float, "Minimum 5-bar return above the sector median (decimal)"),
+    'min_sector_return_z': ('--min-sector-return-z', float, "Minimum z-score of the 5-bar return within the sector"),
+}
+
+
+class StderrProgress:
+    """Minimal stand-in for the Streamlit progress bar/status text."""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+
+    def progress(self, fraction):
+        pass
+
+    def text(self, message):
+        if not self.quiet:
+            print(message, file=sys.stderr)
+
+
+class UsageError(Exception):
+    pass
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='main.py',
+        description="Screen stocks with the dashboard's criteria from the command line.",
+        epilog="Exit codes: 0 ok, 1 empty result with --fail-if-empty, 2 usage error, 3 failure.",
+    )
+    parser.add_argument('--params', metavar='FILE',
+                        help="YAML file of screening parameters (flags override it)")
+    parser.add_argument('--screens', metavar='FILE',
+                        help="YAML file of named screens run in one shared pass "
+                             "(flags override every screen; adds a 'Screen' column)")
+    for key, (flag, kind, help_text) in PARAM_FLAGS.items():
+        parser.add_argument(flag, dest=key, type=kind, help=help_text)
+    parser.add_argument('--recommendation', dest='recommendation_filter',
+                        choices=['any', 'buy', 'strong_buy'], help="Minimum analyst recommendation")
+    parser.add_argument('--finviz', dest='enable_finviz', action='store_true', default=None,
+                        help="Enable Finviz scraping")
+    parser.add_argument('--no-finviz', dest='enable_finviz', action='store_false',
+                        help="Disable Finviz scraping")
+    parser.add_argument('--timeframe', choices=['1d', '1h', '15m', '5m'], help="Bar timeframe")
+    parser.add_argument('--top', type=int, metavar='K',
+                        help="Ranking mode: score every ticker against the criteria and return the K best")
+    parser.add_argument('--weights', metavar='LIST',
+                        help="Criterion weights for --top, e.g. fwd_pe=2,rsi=0.5 "
+                             f"(criteria: {', '.join(MARGINS)})")
+
+    parser.add_argument('--tickers', metavar='LIST',
+                        help="Comma-separated tickers or a CSV file with a 'Ticker' column")
+    parser.add_argument('--workers', type=int,
+                        help="Number of tickers fetched concurrently (default: SCREENER_WORKERS)")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="Directory for cached market data (default: CACHE_DIR)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--record', metavar='DIR',
+                        help="Save every data response under DIR for later --replay")
+    source.add_argument('--replay', metavar='DIR',
+                        help="Serve data from a --record directory instead of the network")
+
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='table',
+                        help="Output format (default: table)")
+    parser.add_argument('--output', '-o', metavar='FILE', help="Write results here instead of stdout")
+    parser.add_argument('--series', action='store_true',
+                        help="Also export every pick's bars and indicator series "
+                             "(csv and parquet are then written as a zip archive)")
+    parser.add_argument('--sort-by',
+                        help="Result column to sort by, descending (default: Market Cap, Score with --top)")
+    parser.add_argument('--report', metavar='FILE',
+                        help="Write the data quality report (quarantined/flagged tickers) as CSV")
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help="Profile the scan: cprofile (deterministic, .prof) or sample "
+                             "(stack sampling, .folded for flame graphs)")
+    parser.add_argument('--profile-dir', metavar='DIR', default=DEFAULT_DIR,
+                        help=f"Directory for profile artifacts (default: {DEFAULT_DIR})")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Also record the top memory allocators with tracemalloc")
+    parser.add_argument('--fail-if-empty', action='store_true',
+                        help="Exit with status 1 when no stocks match")
+    parser.add_argument('--quiet', '-q', action='store_true', help="No progress output on stderr")
+    return parser
+
+
+def load_params_file(path):
+    """
+    Load screening parameters from a YAML file
+
+    The file is a mapping of params keys, optionally nested under 'params';
+    values are checked and coerced like the API's (see coerce_param).
+    """
+    try:
+        import yaml
+    except ImportError:
+        raise UsageError("--params needs PyYAML (pip install pyyaml)")
+    try:
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise UsageError(f"Cannot read parameter file {path}: {e}")
+    if isinstance(data, dict) and isinstance(data.get('params'), dict):
+        data = data['params']
+    if not isinstance(data, dict):
+        raise UsageError(f"Parameter file {path} must contain a mapping")
+    unknown = sorted(set(data) - set(DEFAULT_PARAMS))
+    if unknown:
+        raise UsageError(f"Unknown parameter(s) in {path}: {', '.join(unknown)}")
+    try:
+        return {key: coerce_param(key, value) for key, value in data.items()}
+    except ValueError as e:
+        raise UsageError(f"{e} in {path}")
+
+
+def flag_overrides(args):
+    """Parameters given as command-line flags."""
+    keys = list(PARAM_FLAGS) + ['recommendation_filter', 'enable_finviz', 'timeframe']
+    return {key: getattr(args, key) for key in keys if getattr(args, key) is not None}
+
 
-results = []
+def resolve_params(args):
+    """Merge defaults, the parameter file and command-line flags (in that order)."""
+    params = dict(DEFAULT_PARAMS, enable_finviz=get_config().enable_finviz)
+    if args.params:
+        params.update(load_params_file(args.params))
+    params.update(flag_overrides(args))
+    if params['rsi_min'] >= params['rsi_max']:
+        raise UsageError("rsi_min must be below rsi_max")
+    return params
 
-total_symbols = len(sp500['Ticker'])
-for i, symbol in enumerate(sp500['Ticker'], 1):
+
+def resolve_screens(args):
+    """Named screens from --screens with command-line flags applied to each."""
+    if args.params:
+        raise UsageError("--params and --screens can't be combined")
     try:
-        print(f"Analyzing {symbol} ({i}/{total_symbols})...")
-        time.sleep(0.05)  # Small delay to avoid overwhelming APIs
-        tk = yf.Ticker(symbol)
-        info = tk.info
-        
-        # Fundamentals
-        fwd_pe = info.get('forwardPE')
-        price = info.get('currentPrice')
-        market_cap = info.get('marketCap')
-        beta = info.get('beta')
-        rec = info.get('recommendationKey')  # e.g., 'strong_buy'
-        
-        if not (fwd_pe and fwd_pe<15 and price>15 and market_cap>1e10 and beta>1 and rec=='strong_buy'):
-            continue
-        
-        # Price history
-        hist = tk.history(period='6mo', interval='1d')
-        hist['5d_return'] = hist['Close'].pct_change(5)
-        if hist['5d_return'].iloc[-1] < 0.05:
-            continue
-        
-        # Moving averages
-        ma50 = hist['Close'].rolling(50).mean().iloc[-1]
-        ma200 = hist['Close'].rolling(200).mean().iloc[-1]
-        if not (price > ma50 and price > ma200):
-            continue
-        
-        # RSI (14-day)
-        delta = hist['Close'].diff()
-        up = delta.clip(lower=0)
-        down = -1*delta.clip(upper=0)
-        ma_up = up.ewm(com=13, adjust=False).mean()
-        ma_down = down.ewm(com=13, adjust=False).mean()
-        rsi = 100 - (100/(1 + ma_up/ma_down))
-        latest_rsi = rsi.iloc[-1]
-        if not (30 < latest_rsi < 70):
-            continue
-        
-        # Bollinger Bands (20d)
-        m20 = hist['Close'].rolling(20).mean().iloc[-1]
-        std20 = hist['Close'].rolling(20).std().iloc[-1]
-        upper_bb = m20 + 2*std20
-        near_upper = price >= (upper_bb * 0.98)
-        
-        # ATR (14-day)
-        high_low = hist['High'] - hist['Low']
-        high_pc = np.abs(hist['High'] - hist['Close'].shift())
-        low_pc = np.abs(hist['Low'] - hist['Close'].shift())
-        tr = pd.concat([high_low, high_pc, low_pc], axis=1).max(axis=1)
-        atr = tr.rolling(14).mean().iloc[-1]
-        stop_loss = price - 1.5*atr
-        
-        # Finviz scrape for sector sentiment & institutional ownership change
+        screens = load_screens(args.screens)
+    except ValueError as e:
+        raise UsageError(str(e))
+    overrides = flag_overrides(args)
+    for name, params in screens.items():
+        params.update(overrides)
+        if params['rsi_min'] >= params['rsi_max']:
+            raise UsageError(f"Screen '{name}': rsi_min must be below rsi_max")
+    return screens
+
+
+def parse_weights(spec):
+    """Parse 'name=weight,...' into a weights dict for ranking mode."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, value = item.partition('=')
+        if name not in MARGINS:
+            raise UsageError(f"Unknown criterion '{name}' in --weights (expected one of {', '.join(MARGINS)})")
         try:
-            time.sleep(0.1)  # Rate limiting to avoid being blocked
-            url = f'https://finviz.com/quote.ashx?t={symbol}'
-            response = requests.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Sector sentiment (Performance row 10)
-            perf_element = soup.find(text='Perf Month')
-            if not perf_element:
-                continue
-            perf = perf_element.find_next('td').text
-            if not perf.startswith('+'):
-                continue
-                
-            # Institutional ownership change (3-month)
-            instro_element = soup.find(text='Inst Own')
-            if not instro_element:
-                continue
-            instro_text = instro_element.find_next('td').text.strip('%')
-            try:
-                instro = float(instro_text)
-                if instro <= 0:
-                    continue
-            except (ValueError, TypeError):
-                continue  # Skip if institutional ownership is not a valid number
-        except Exception as e:
-            print(f"Finviz scraping failed for {symbol}: {e}")
-            continue
-        
-        # Volume & consecutive up-days
-        avg_vol = hist['Volume'].rolling(30).mean().iloc[-1]
-        if avg_vol < 2e6:
-            continue
-        consec_up = (hist['Close'].diff() > 0).tail(3).all()
-        
-        # Compile result
-        results.append({
-            'Ticker': symbol,
-            'Price': price,
-            'Fwd P/E': fwd_pe,
-            'Market Cap': market_cap,
-            'Volume': int(avg_vol),
-            'RSI': round(latest_rsi,1),
-            'MA Position': f'Above 50/200d ✓',
-            'Sector': info.get('sector'),
-            'Beta': round(beta,2),
-            'Momentum': '↑',
-            'Bollinger': '✓' if near_upper else '–',
-            'Consec Up-Days': '✓' if consec_up else '',
-            'Stop-Loss': round(stop_loss,2)
-        })
-    except Exception:
-        continue
-
-df = pd.DataFrame(results)
-print(f"Found {len(results)} stocks that meet all criteria:")
-
-if len(results) > 0:
-    print("\nStock screening results:")
-    df = df.sort_values(by='Market Cap', ascending=False)
-    print(df.to_string(index=False))
-else:
-    print("No stocks met all the screening criteria.")
-    print("This is normal as the criteria are quite strict:")
-    print("- Forward P/E < 15")
-    print("- Price > $15")
-    print("- Market Cap > $10B")  
-    print("- Beta > 1")
-    print("- Strong Buy recommendation")
-    print("- 5-day return > 5%")
-    print("- Price above 50-day and 200-day moving averages")
-    print("- RSI between 30-70")
-    print("- Average volume > 2M shares")
-    print("- Positive monthly performance")
-    print("- Institutional ownership increase")
-    print("- 3 consecutive up days")
+            weights[name] = float(value)
+        except ValueError:
+            raise UsageError(f"Invalid weight for {name}: '{value}'")
+        if weights[name] < 0:
+            raise UsageError(f"Weight for {name} must not be negative")
+    return weights
+
+
+def resolve_tickers(spec):
+    if not spec:
+        return load_tickers()
+    if os.path.exists(spec):
+        try:
+            return pd.read_csv(spec)['Ticker'].tolist()
+        except (KeyError, ValueError) as e:
+            raise UsageError(f"Cannot read tickers from {spec}: {e}")
+    return [t.strip().upper() for t in spec.split(',') if t.strip()]
+
+
+def write_results(df, fmt, output, params=None, run=None, series=False, timeframe='1d'):
+    """Write the result table in the requested format to a file or stdout."""
+    if fmt in ('json', 'parquet', 'xlsx') or series:
+        # Files with run metadata and parameters come from the export pipeline
+        data = export_results(df, fmt, params=params, run=run, include_series=series,
+                              timeframe=timeframe)[0]
+        if output:
+            with open(output, 'wb') as f:
+                f.write(data)
+        else:
+            sys.stdout.buffer.write(data)
+            sys.stdout.flush()
+        return
+
+    if fmt == 'csv':
+        text = df.to_csv(index=False)
+    elif fmt == 'jsonl':
+        text = df.to_json(orient='records', lines=True, force_ascii=False) if len(df) else ''
+    else:
+        text = (df.to_string(index=False) if len(df)
+                else "No stocks met all the screening criteria.") + '\n'
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        config = get_config()
+        if args.cache_dir:
+            config = replace(config, cache_dir=args.cache_dir)
+        if args.workers is not None:
+            if args.workers < 1:
+                raise UsageError("--workers must be at least 1")
+            config = replace(config, workers=args.workers)
+        if args.record:
+            config = replace(config, data_provider=f'record:{args.record}')
+        elif args.replay:
+            if not os.path.isdir(args.replay):
+                raise UsageError(f"Replay directory {args.replay} does not exist")
+            config = replace(config, data_provider=f'replay:{args.replay}')
+        set_config(config)
+        screens = resolve_screens(args) if args.screens else None
+        params = None if screens else resolve_params(args)
+        if args.top is not None:
+            if screens:
+                raise UsageError("--top can't be combined with --screens")
+            if args.top < 1:
+                raise UsageError("--top must be at least 1")
+        elif args.weights:
+            raise UsageError("--weights needs --top")
+        if args.profile_memory and not args.profile:
+            raise UsageError("--profile-memory needs --profile")
+        if args.series and args.format not in SERIES_FORMATS:
+            raise UsageError(f"--series needs --format {', '.join(SERIES_FORMATS)}")
+        weights = parse_weights(args.weights)
+        tickers = resolve_tickers(args.tickers)
+    except (UsageError, ValueError) as e:
+        parser.print_usage(sys.stderr)
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    progress = StderrProgress(quiet=args.quiet)
+    report = RunReport()
+    profile = RunProfile(args.profile, args.profile_memory, args.profile_dir) if args.profile else None
+    try:
+        # Per-ticker diagnostics are printed; keep them off the data stream
+        with contextlib.redirect_stdout(sys.stderr):
+            if screens:
+                results = run_screens(screens, progress_bar=progress, status_text=progress,
+                                      tickers=tickers, report=report, profile=profile)
+            elif args.top is not None:
+                results = run_scored_screening(params, k=args.top, weights=weights,
+                                               progress_bar=progress, status_text=progress,
+                                               tickers=tickers, report=report, profile=profile)
+            else:
+                results = run_stock_screening(params, progress_bar=progress, status_text=progress,
+                                              tickers=tickers, report=report, profile=profile)
+    except Exception as e:
+        print(f"Screening failed: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    sort_column = args.sort_by or ('Score' if args.top is not None else 'Market Cap')
+    if screens:
+        df = pd.DataFrame([dict(Screen=name, **row) for name, rows in results.items() for row in rows])
+        sort_by = ['Screen', sort_column]
+        ascending = [True, False]
+    else:
+        df = pd.DataFrame(results)
+        sort_by, ascending = [sort_column], [False]
+    if len(df) and sort_column in df.columns:
+        df = df.sort_values(by=sort_by, ascending=ascending, kind='stable')
+    if screens:
+        timeframes = {screen.get('timeframe') or '1d' for screen in screens.values()}
+        timeframe = timeframes.pop() if len(timeframes) == 1 else '1d'
+    else:
+        timeframe = params.get('timeframe') or '1d'
+    run = run_metadata(datetime.now(), len(df), report, timeframe=timeframe,
+                       mode='screens' if screens else 'rank' if args.top is not None else 'filter')
+    try:
+        write_results(df, args.format, args.output, params=screens or params, run=run,
+                      series=args.series, timeframe=timeframe)
+        if args.report:
+            report.to_frame().to_csv(args.report, index=False)
+    except (OSError, ImportError, ValueError) as e:
+        print(f"Could not write results: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    if not args.quiet:
+        print(report.summary(), file=sys.stderr)
+        print(f"Found {len(df)} stocks that meet all criteria", file=sys.stderr)
+        if profile is not None:
+            print(f"Profile ({profile.wall_seconds}s): {profile.artifact}, summary {profile.summary_path}",
+                  file=sys.stderr)
+    if df.empty and args.fail_if_empty:
+        return EXIT_EMPTY
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+NYSE trading calendar, computed locally.
+
+Regular sessions run 9:30-16:00 America/New_York on weekdays, except the
+exchange holidays below; early closes are at 13:00. Holidays falling on a
+Saturday are observed the Friday before (except New Year's Day, which is
+then not observed), Sunday holidays the Monday after.
+
+    New Year's Day, Martin Luther King Jr. Day (3rd Mon Jan),
+    Washington's Birthday (3rd Mon Feb), Good Friday, Memorial Day (last
+    Mon May), Juneteenth (Jun 19, from 2022), Independence Day, Labor Day
+    (1st Mon Sep), Thanksgiving (4th Thu Nov), Christmas
+    Early closes: Jul 3, the day after Thanksgiving, Dec 24
+
+The fetch layer uses data_changed_since() to decide whether cached data can
+possibly be stale: outside sessions nothing new is published, so weekend,
+holiday and overnight use is served entirely from the cache. One-off
+closures (e.g. national days of mourning) are not modelled.
+"""
+import functools
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from config import get_config
+
+EXCHANGE_TZ = ZoneInfo('America/New_York')
+OPEN = dtime(9, 30)
+CLOSE = dtime(16, 0)
+EARLY_CLOSE = dtime(13, 0)
+# Final daily bars can lag the close by a few minutes
+SETTLE = timedelta(minutes=20)
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th given weekday (Mon=0) of a month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = (date(year, month + 1, 1) if month < 12 else date(year + 1, 1, 1)) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day):
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@functools.lru_cache(maxsize=64)
+def holidays(year):
+    """
+    NYSE full-day holidays of a year
+
+    Returns:
+        dict: date -> holiday name
+    """
+    days = {}
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days[_observed(new_year)] = "New Year's Day"
+    days[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    days[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    days[_easter(year) - timedelta(days=2)] = "Good Friday"
+    days[_nth_weekday(year, 5, 0, -1)] = "Memorial Day"
+    if year >= 2022:
+        days[_observed(date(year, 6, 19))] = "Juneteenth"
+    days[_observed(date(year, 7, 4))] = "Independence Day"
+    days[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    days[_nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    days[_observed(date(year, 12, 25))] = "Christmas Day"
+    return days
+
+
+@functools.lru_cache(maxsize=64)
+def early_closes(year):
+    """Days the NYSE closes at 13:00."""
+    candidates = {date(year, 7, 3), _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+                  date(year, 12, 24)}
+    return frozenset(day for day in candidates if is_trading_day(day))
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session(day):
+    """
+    Open and close of a day's regular session
+
+    Returns:
+        tuple: (open, close) as aware datetimes, or None on non-trading days
+    """
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else CLOSE
+    return (datetime.combine(day, OPEN, EXCHANGE_TZ), datetime.combine(day, close, EXCHANGE_TZ))
+
+
+def _as_exchange_time(moment):
+    if moment is None:
+        return datetime.now(EXCHANGE_TZ)
+    if isinstance(moment, (int, float)):
+        return datetime.fromtimestamp(moment, EXCHANGE_TZ)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(EXCHANGE_TZ)
+
+
+def is_open(moment=None):
+    """Whether the regular session is in progress (moment defaults to now)."""
+    moment = _as_exchange_time(moment)
+    hours = session(moment.date())
+    return hours is not None and hours[0] <= moment < hours[1]
+
+
+def last_close(moment=None):
+    """Close of the most recent session that ended at or before moment."""
+    moment = _as_exchange_time(moment)
+    day = moment.date()
+    while True:
+        hours = session(day)
+        if hours is not None and hours[1] <= moment:
+            return hours[1]
+        day -= timedelta(days=1)
+
+
+def next_open(moment=None):
+    """Open of the first session starting after moment."""
+    moment = _as_exchange_time(moment)
+    day = moment.date()
+    while True:
+        hours = session(day)
+        if hours is not None and hours[0] > moment:
+            return hours[0]
+        day += timedelta(days=1)
+
+
+@functools.lru_cache(maxsize=4)
+def _market_state(minute):
+    """(open now, timestamp after which the last session's data is final) for a minute."""
+    moment = datetime.fromtimestamp(minute * 60, EXCHANGE_TZ)
+    return is_open(moment), (last_close(moment) + SETTLE).timestamp()
+
+
+def data_changed_since(timestamp, now=None):
+    """
+    Whether the market can have produced new data since a point in time
+
+    False only when no session is in progress and the last session (plus
+    SETTLE) had already ended at timestamp, i.e. anything fetched at
+    timestamp is still current.
+
+    Args:
+        timestamp (float): Unix time the data was fetched or checked
+        now (float): Unix time to evaluate at (defaults to now)
+    """
+    now = time.time() if now is None else now
+    open_now, settled = _market_state(int(now // 60))
+    return open_now or timestamp < settled or now < settled
+
+
+def still_current(timestamp, max_age, now=None):
+    """
+    Whether data fetched at timestamp can be served without a refresh
+
+    True within max_age seconds, and after that as long as the market hasn't
+    produced anything new (unless CALENDAR_FRESHNESS is off).
+    """
+    now = time.time() if now is None else now
+    if now - timestamp < max_age:
+        return True
+    return get_config().calendar_freshness and not data_changed_since(timestamp, now)
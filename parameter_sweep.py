@@ -0,0 +1,246 @@
+"""
+Parameter sweep / grid search over screening thresholds.
+
+The universe is fetched once into a metrics panel (one row per ticker with
+every screening metric, unfiltered). Each parameter combination is then just
+a set of boolean masks over that panel, so thousands of combinations cost
+less than a single extra network scan. Per-criterion masks are cached by
+their parameter values and reused across combinations, and combinations are
+distributed over a process pool for large grids.
+"""
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fundamentals_store import asof_join
+from rate_limiter import ThrottledError, retry_delay
+from stock_screener import (CRITERIA, DEFAULT_PARAMS, FUNDAMENTAL_FIELDS, RETRY_ROUNDS,
+                            compute_technicals, criterion_mask, fetch_ticker_metrics,
+                            load_tickers)
+from sector_metrics import add_sector_metrics
+from timeframes import series_key
+
+# Per-process state shared by every combination a worker evaluates
+_PANELS = {}
+_MASK_CACHE = {}
+
+
+def build_metrics_panel(tickers=None, enable_finviz=False, horizon=None,
+                        progress_callback=None, timeframe='1d'):
+    """
+    Fetch every ticker once and compute its unfiltered screening metrics
+
+    Args:
+        tickers (list): Ticker symbols (defaults to the configured universe)
+        enable_finviz (bool): Also collect the Finviz pass/fail flag
+        horizon (int): If set, also build a backtest panel with technicals
+            computed `horizon` bars ago and the forward return since then;
+            its fundamentals are the ones recorded on or before that bar
+            (see fundamentals_store), today's where none were
+        progress_callback (callable): Called with (i, total, symbol)
+        timeframe (str): Bar timeframe ('1d', '1h', '15m' or '5m')
+
+    Returns:
+        tuple: (current metrics DataFrame, backtest DataFrame or None), both
+        indexed by ticker and including the sector-relative metrics
+    """
+    tickers = tickers if tickers is not None else load_tickers()
+    current, backtest, asof_dates = {}, {}, {}
+
+    fetched = {}
+    pending = list(tickers)
+    for attempt in range(RETRY_ROUNDS + 1):
+        if attempt:
+            time.sleep(retry_delay())
+        throttled = []
+        for i, symbol in enumerate(pending, 1):
+            if progress_callback:
+                progress_callback(i, len(pending), symbol)
+            try:
+                fetched[symbol] = fetch_ticker_metrics(symbol, enable_finviz=enable_finviz,
+                                                       timeframe=timeframe)
+            except ThrottledError:
+                throttled.append(symbol)
+            except Exception as e:
+                print(f"Error processing {symbol}: {e}")
+        pending = throttled
+        if not pending:
+            break
+    if pending:
+        print(f"Skipped {len(pending)} tickers still throttled: {', '.join(pending)}")
+
+    for symbol in tickers:
+        metrics, hist = fetched.get(symbol, (None, None))
+        if metrics is None:
+            continue
+        current[symbol] = metrics
+
+        if horizon and hist is not None and len(hist) >= 50 + horizon:
+            try:
+                # Reuses the indicator frame computed for the current metrics
+                asof = len(hist) - horizon - 1
+                asof_price = hist['Close'].iloc[asof]
+                row = dict(metrics, price=asof_price)
+                row.update(compute_technicals(hist, asof_price, symbol=series_key(symbol, timeframe),
+                                              asof=asof))
+                row['fwd_return'] = hist['Close'].iloc[-1] / asof_price - 1
+                backtest[symbol] = row
+                asof_dates[symbol] = hist.index[asof]
+            except Exception as e:
+                print(f"Backtest metrics failed for {symbol}: {e}")
+    if asof_dates:
+        _point_in_time_fundamentals(backtest, asof_dates)
+
+    # Sector-relative columns so sweeps can vary those thresholds too
+    current_df = add_sector_metrics(pd.DataFrame.from_dict(current, orient='index'))
+    backtest_df = add_sector_metrics(pd.DataFrame.from_dict(backtest, orient='index')) if horizon else None
+    return current_df, backtest_df
+
+
+def _point_in_time_fundamentals(backtest, asof_dates):
+    """Swap today's fundamentals in backtest rows for the ones known on their as-of bar."""
+    keys = pd.DataFrame({'ticker': list(asof_dates), 'date': list(asof_dates.values())})
+    for _, known in asof_join(keys).iterrows():
+        row = backtest[known['ticker']]
+        row['fundamentals_asof'] = known['snapshot_date']
+        if pd.isna(known['snapshot_date']):
+            continue
+        # The as-of price is the bar's close, not the snapshot's quote
+        for field in FUNDAMENTAL_FIELDS:
+            if field != 'price' and field in known:
+                row[field] = known[field]
+
+
+def expand_grid(param_grid, base_params=None):
+    """
+    Expand a grid of parameter ranges into full parameter dicts
+
+    Args:
+        param_grid (dict): params key -> iterable of values to try
+        base_params (dict): Values for keys not being swept
+
+    Returns:
+        list: One complete params dict per combination
+    """
+    base = dict(DEFAULT_PARAMS if base_params is None else base_params)
+    keys = list(param_grid)
+    combos = []
+    for values in itertools.product(*(list(param_grid[k]) for k in keys)):
+        params = dict(base)
+        params.update(zip(keys, values))
+        combos.append(params)
+    return combos
+
+
+def _init_worker(current, backtest):
+    _PANELS['current'] = current
+    _PANELS['backtest'] = backtest
+    _MASK_CACHE.clear()
+
+
+def _cached_mask(panel_name, criterion, params):
+    key = (panel_name, criterion[0], tuple(params.get(k, False) for k in criterion[1]))
+    mask = _MASK_CACHE.get(key)
+    if mask is None:
+        mask = np.broadcast_to(criterion_mask(criterion, _PANELS[panel_name], params),
+                               (len(_PANELS[panel_name]),))
+        _MASK_CACHE[key] = mask
+    return mask
+
+
+def _combined_mask(panel_name, params):
+    mask = np.ones(len(_PANELS[panel_name]), dtype=bool)
+    for criterion in CRITERIA:
+        mask &= _cached_mask(panel_name, criterion, params)
+    return mask
+
+
+def _evaluate_chunk(combos, swept_keys):
+    rows = []
+    current = _PANELS['current']
+    backtest = _PANELS['backtest']
+    for params in combos:
+        row = {k: params[k] for k in swept_keys}
+        mask = _combined_mask('current', params)
+        picks = current.index[mask]
+        row['pick_count'] = int(mask.sum())
+        row['momentum_picks'] = int((current['up_streak'].to_numpy()[mask]
+                                     >= params['consecutive_days']).sum())
+        row['picks'] = ','.join(picks)
+
+        if backtest is not None:
+            bt_mask = _combined_mask('backtest', params)
+            fwd = backtest['fwd_return'].to_numpy(dtype=float)[bt_mask]
+            row['bt_pick_count'] = int(bt_mask.sum())
+            row['bt_mean_return'] = float(fwd.mean()) if len(fwd) else np.nan
+            row['bt_median_return'] = float(np.median(fwd)) if len(fwd) else np.nan
+            row['bt_hit_rate'] = float((fwd > 0).mean()) if len(fwd) else np.nan
+        rows.append(row)
+    return rows
+
+
+def run_parameter_sweep(current, param_grid, base_params=None, backtest=None,
+                        workers=None, chunk_size=256):
+    """
+    Evaluate every combination of a parameter grid against a metrics panel
+
+    Args:
+        current (DataFrame): Current metrics panel from build_metrics_panel
+        param_grid (dict): params key -> iterable of values to try
+        base_params (dict): Values for keys not being swept
+        backtest (DataFrame): Optional backtest panel for forward performance
+        workers (int): Process pool size (defaults to the CPU count; 1 runs
+            in-process)
+        chunk_size (int): Combinations per worker task
+
+    Returns:
+        DataFrame: One row per combination ranked by forward performance (if
+        a backtest panel is given) and pick count; empty when the panel is
+        (e.g. every fetch failed)
+    """
+    if current is None or current.empty or len(current.columns) == 0:
+        return pd.DataFrame()
+    combos = expand_grid(param_grid, base_params)
+    swept_keys = list(param_grid)
+    workers = workers or os.cpu_count() or 1
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(current, backtest)
+        rows = [row for chunk in chunks for row in _evaluate_chunk(chunk, swept_keys)]
+    else:
+        # The panels are sent once per worker via the initializer, not per task
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 initializer=_init_worker,
+                                 initargs=(current, backtest)) as pool:
+            rows = [row for chunk_rows in pool.map(_evaluate_chunk, chunks,
+                                                   itertools.repeat(swept_keys))
+                    for row in chunk_rows]
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    sort_by = ['pick_count']
+    if backtest is not None:
+        sort_by = ['bt_mean_return', 'bt_hit_rate', 'pick_count']
+    return results.sort_values(by=sort_by, ascending=False, na_position='last',
+                               kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    print("Building metrics panel...")
+    current, backtest = build_metrics_panel(horizon=10)
+
+    grid = {
+        'max_pe': [15, 20, 25, 30],
+        'rsi_min': [30, 40],
+        'rsi_max': [70, 80],
+        'min_return': [0.0, 0.02, 0.05],
+        'recommendation_filter': ['any', 'buy', 'strong_buy'],
+    }
+    ranked = run_parameter_sweep(current, grid, backtest=backtest)
+    print(ranked.head(20).to_string(index=False))
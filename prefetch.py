@@ -0,0 +1,79 @@
+"""
+Background prefetch of detail-view data for screen results.
+
+After a scan the detail view is usually opened for several picks in a row,
+each needing the ticker's info and recent bars. A Prefetcher warms those
+caches through get_stock_info_many in a background thread, a batch of
+tickers at a time and in the order the results are shown, so a selected pick
+is usually served from memory. A new request replaces the running one (tickers
+already warmed cost nothing), and cancel() stops it between batches, e.g.
+when a new scan starts and needs the request budget.
+"""
+import sys
+import threading
+
+from config import get_config
+from stock_screener import get_stock_info_many
+
+
+class _Job:
+    __slots__ = ('symbols', 'cancelled', 'done', 'thread')
+
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.cancelled = threading.Event()
+        self.done = 0
+        self.thread = None
+
+
+class Prefetcher:
+    """
+    Warm the detail-view caches for a list of tickers in the background
+
+    Args:
+        period (str): History the detail view shows
+        batch (int): Tickers fetched together (defaults to SCREENER_WORKERS)
+    """
+
+    def __init__(self, period='3mo', batch=None):
+        self.period = period
+        self.batch = batch
+        self._job = None
+        self._lock = threading.Lock()
+
+    def request(self, symbols):
+        """Prefetch symbols in this order, replacing a prefetch of a different list."""
+        symbols = list(dict.fromkeys(symbols))
+        with self._lock:
+            if self._job is not None and self._job.symbols == symbols:
+                return
+            if self._job is not None:
+                self._job.cancelled.set()
+            self._job = job = _Job(symbols)
+            job.thread = threading.Thread(target=self._run, args=(job,), name='prefetch', daemon=True)
+            job.thread.start()
+
+    def cancel(self):
+        """Stop the running prefetch after its current batch."""
+        with self._lock:
+            if self._job is not None:
+                self._job.cancelled.set()
+                self._job = None
+
+    @property
+    def progress(self):
+        """(tickers warmed, tickers requested) of the current prefetch."""
+        job = self._job
+        return (job.done, len(job.symbols)) if job is not None else (0, 0)
+
+    def _run(self, job):
+        batch = self.batch or get_config().workers
+        for start in range(0, len(job.symbols), batch):
+            if job.cancelled.is_set():
+                return
+            chunk = job.symbols[start:start + batch]
+            try:
+                get_stock_info_many(chunk, period=self.period, workers=batch)
+            except Exception as e:
+                print(f"Prefetch failed for {', '.join(chunk)}: {e}", file=sys.stderr)
+            job.done = start + len(chunk)
@@ -0,0 +1,209 @@
+"""
+Opt-in profiling of screening runs.
+
+Pass a RunProfile to a screening run (or --profile to main.py) and the scan
+is captured in one of two modes:
+
+    cprofile  deterministic cProfile of the calling thread and every thread
+              the scan starts (the fetch workers), merged into one .prof file
+              (pstats; snakeviz, flameprof or gprof2dot render it)
+    sample    wall-clock stack sampling of the same threads every
+              SAMPLE_INTERVAL seconds, written as folded stacks (.folded) for
+              flamegraph.pl or speedscope; low overhead, so it can stay on for
+              production scans
+
+With memory=True, tracemalloc also records the lines that allocated the most
+memory still held at the end of the scan, and the peak. Each run writes its
+artifact and a JSON summary (top hotspots and allocators) to the profile
+directory; the same summary is kept on the RunProfile for display.
+"""
+import cProfile
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+PROFILE_MODES = ('cprofile', 'sample')
+DEFAULT_DIR = 'profiles'
+SAMPLE_INTERVAL = 0.005
+TOP_N = 25
+MEMORY_FRAMES = 8
+
+_runs = itertools.count(1)
+
+
+class _Sampler(threading.Thread):
+    """Collect folded stacks of the watched threads until stopped."""
+
+    def __init__(self, interval, ignore):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.ignore = set(ignore)
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.ignore.add(threading.get_ident())
+        while not self._stop_event.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident in self.ignore:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _sample_hotspots(stacks, interval):
+    """Self and inclusive time per function from folded stacks (summed over threads)."""
+    own, inclusive = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for name in set(frames):
+            inclusive[name] += count
+    rows = [{'function': name, 'self_s': round(own[name] * interval, 4),
+             'cumulative_s': round(inclusive[name] * interval, 4)}
+            for name, _ in own.most_common(TOP_N)]
+    return rows
+
+
+def _cprofile_hotspots(stats):
+    """Top functions by own time from pstats."""
+    rows = []
+    for (path, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({'function': f"{name} ({os.path.basename(path)}:{line})", 'calls': calls,
+                     'self_s': round(own, 4), 'cumulative_s': round(cumulative, 4)})
+    rows.sort(key=lambda row: row['self_s'], reverse=True)
+    return rows[:TOP_N]
+
+
+class RunProfile:
+    """
+    Profile of a screening run (filled in by the run it is passed to)
+
+    Args:
+        mode (str): 'cprofile' or 'sample'
+        memory (bool): Also trace allocations with tracemalloc
+        out_dir (str): Directory for the artifacts (created on demand)
+    """
+
+    def __init__(self, mode='sample', memory=False, out_dir=DEFAULT_DIR):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (expected one of {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.memory = memory
+        self.out_dir = out_dir
+        self.wall_seconds = None
+        self.hotspots = []
+        self.allocations = []
+        self.peak_bytes = None
+        self.artifact = None
+        self.summary_path = None
+
+    @contextmanager
+    def capture(self, label='scan'):
+        """Profile the enclosed block and write its artifacts."""
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start(MEMORY_FRAMES)
+        if self.memory:
+            tracemalloc.reset_peak()
+
+        profiles = []
+        sampler = None
+        if self.mode == 'cprofile':
+            def start_thread_profile(*_):
+                # First profile event of a thread started during the capture
+                sys.setprofile(None)
+                profile = cProfile.Profile()
+                profiles.append(profile)
+                profile.enable()
+
+            if sys.version_info < (3, 12):
+                # Before 3.12 cProfile only sees the thread that enabled it
+                threading.setprofile(start_thread_profile)
+            main_profile = cProfile.Profile()
+            profiles.append(main_profile)
+            main_profile.enable()
+        else:
+            # Threads alive before the scan (servers, other sessions) are left out
+            others = {thread.ident for thread in threading.enumerate()} - {threading.get_ident()}
+            sampler = _Sampler(SAMPLE_INTERVAL, others)
+            sampler.start()
+
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_seconds = round(time.perf_counter() - start, 3)
+            if sampler is not None:
+                sampler.stop()
+            else:
+                main_profile.disable()
+                threading.setprofile(None)
+            if self.memory:
+                # The sampler's own stacks aren't the scan's allocations
+                snapshot = tracemalloc.take_snapshot().filter_traces(
+                    [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)])
+                self.peak_bytes = tracemalloc.get_traced_memory()[1]
+                if tracing:
+                    tracemalloc.stop()
+                self.allocations = [
+                    {'where': f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                     'size_kb': round(stat.size / 1024, 1), 'blocks': stat.count}
+                    for stat in snapshot.statistics('lineno')[:TOP_N]]
+            self._write(label, profiles, sampler)
+
+    def _write(self, label, profiles, sampler):
+        os.makedirs(self.out_dir, exist_ok=True)
+        # The pid and a per-process run number keep runs started in the same second apart
+        stem = os.path.join(self.out_dir,
+                            f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{next(_runs)}-{label}")
+        if sampler is not None:
+            # Samples come slower than SAMPLE_INTERVAL under load; spread the wall time over them
+            interval = self.wall_seconds / sampler.samples if sampler.samples else SAMPLE_INTERVAL
+            self.hotspots = _sample_hotspots(sampler.stacks, interval)
+            self.artifact = f"{stem}.folded"
+            with open(self.artifact, 'w', encoding='utf-8') as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in sampler.stacks.items())
+        else:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            self.hotspots = _cprofile_hotspots(stats)
+            self.artifact = f"{stem}.prof"
+            stats.dump_stats(self.artifact)
+
+        self.summary_path = f"{stem}.json"
+        with open(self.summary_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=1)
+
+    def summary(self):
+        """Run profile as a JSON-serializable dict."""
+        return {'mode': self.mode, 'wall_seconds': self.wall_seconds, 'artifact': self.artifact,
+                'peak_bytes': self.peak_bytes, 'hotspots': self.hotspots,
+                'allocations': self.allocations}
+
+    def hotspots_frame(self):
+        return pd.DataFrame(self.hotspots)
+
+    def allocations_frame(self):
+        return pd.DataFrame(self.allocations)
@@ -0,0 +1,281 @@
+"""
+Market data providers.
+
+Every network read the screener makes goes through a provider with three
+calls:
+
+    info(symbol, max_age)              fundamentals (yfinance Ticker.info)
+    history(symbol, period, interval)  OHLCV bars, oldest first
+    page(url)                          raw snapshot page (the Finviz quote page)
+
+LiveProvider combines YFinanceProvider (info, history) and FinvizProvider
+(page), paced by the shared adaptive limiters. CachedProvider adds the TTL
+cache for info; histories are persisted incrementally by the bar store in
+timeframes.py and Finviz verdicts by check_finviz instead. RecordingProvider
+writes every response to a directory and ReplayProvider serves them back
+with no network and no pacing, so a captured session can be rerun, tested
+or profiled offline at full speed.
+
+DATA_PROVIDER selects the process-wide provider: 'live' (default),
+'record:DIR' or 'replay:DIR'. Replays are most faithful with an empty
+CACHE_DIR, since cached data is served before the provider is asked.
+"""
+import hashlib
+import os
+import pickle
+import re
+import threading
+from urllib.parse import quote
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+from config import get_config
+from data_cache import get_cache
+from rate_limiter import FINVIZ, YAHOO, get_limiter
+
+_PERIOD = re.compile(r'^(\d+)(d|wk|mo|y)$')
+_PERIOD_UNITS = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+
+_provider = None
+_override = None
+_provider_lock = threading.Lock()
+
+
+class ReplayMissError(LookupError):
+    """A replayed session has no recorded response for a request."""
+
+
+class Provider:
+    """Interface for market data sources; subclasses implement what they serve."""
+
+    name = 'provider'
+
+    def info(self, symbol, max_age=None):
+        """
+        Fundamentals dict for a ticker (yfinance Ticker.info layout)
+
+        max_age (seconds) bounds how old a cached answer may be; providers
+        without a cache ignore it.
+        """
+        raise NotImplementedError(f"{self.name} provider has no fundamentals")
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        """OHLCV bars (DataFrame indexed by timestamp, oldest first)."""
+        raise NotImplementedError(f"{self.name} provider has no price history")
+
+    def page(self, url):
+        """Raw content (bytes) of a web page."""
+        raise NotImplementedError(f"{self.name} provider has no pages")
+
+
+class YFinanceProvider(Provider):
+    """Fundamentals and history from Yahoo Finance via yfinance."""
+
+    name = 'yfinance'
+
+    def info(self, symbol, max_age=None):
+        with get_limiter(YAHOO).slot():
+            return yf.Ticker(symbol).info
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        return get_limiter(YAHOO).call(yf.Ticker(symbol).history, period=period, interval=interval)
+
+
+class FinvizProvider(Provider):
+    """Snapshot pages fetched over HTTP (used for Finviz quote pages)."""
+
+    name = 'finviz'
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+
+    def page(self, url):
+        with get_limiter(FINVIZ).slot():
+            response = requests.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        return response.content
+
+
+class LiveProvider(Provider):
+    """Network sources: yfinance for fundamentals and history, HTTP for pages."""
+
+    name = 'live'
+
+    def __init__(self, market=None, pages=None):
+        self.market = market or YFinanceProvider()
+        self.pages = pages or FinvizProvider()
+
+    def info(self, symbol, max_age=None):
+        return self.market.info(symbol)
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        return self.market.history(symbol, period=period, interval=interval)
+
+    def page(self, url):
+        return self.pages.page(url)
+
+
+class CachedProvider(Provider):
+    """Serve info from the CACHE_DURATION TTL cache, filling it from inner."""
+
+    name = 'cached'
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def info(self, symbol, max_age=None):
+        return get_cache('info').get_or_fetch(symbol, lambda: self.inner.info(symbol), max_age)
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        return self.inner.history(symbol, period=period, interval=interval)
+
+    def page(self, url):
+        return self.inner.page(url)
+
+
+def _history_path(root, symbol, interval):
+    return os.path.join(root, 'history', interval, f"{quote(symbol, safe='')}.pkl")
+
+
+def _info_path(root, symbol):
+    return os.path.join(root, 'info', f"{quote(symbol, safe='')}.pkl")
+
+
+def _page_path(root, url):
+    return os.path.join(root, 'pages', f"{hashlib.sha1(url.encode()).hexdigest()}.pkl")
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _write(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def period_slice(bars, period):
+    """Trailing part of bars covering a yfinance period string ('5d', '3mo', '2y'...)."""
+    match = _PERIOD.match(period or '')
+    if bars is None or bars.empty or not match:
+        return bars
+    offset = pd.DateOffset(**{_PERIOD_UNITS[match.group(2)]: int(match.group(1))})
+    return bars[bars.index > bars.index[-1] - offset]
+
+
+class RecordingProvider(Provider):
+    """
+    Pass requests to inner and save every response under a directory
+
+    Histories for the same ticker and interval are merged, so one recording
+    can serve both a full download and later incremental refreshes.
+    """
+
+    name = 'record'
+
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.root = root
+        self._lock = threading.Lock()
+
+    def info(self, symbol, max_age=None):
+        info = self.inner.info(symbol, max_age)
+        _write(_info_path(self.root, symbol), info)
+        return info
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        bars = self.inner.history(symbol, period=period, interval=interval)
+        if bars is None:
+            return bars
+        path = _history_path(self.root, symbol, interval)
+        with self._lock:
+            if os.path.exists(path):
+                merged = pd.concat([_read(path), bars])
+                bars_to_save = merged[~merged.index.duplicated(keep='last')].sort_index()
+            else:
+                bars_to_save = bars
+            _write(path, bars_to_save)
+        return bars
+
+    def page(self, url):
+        content = self.inner.page(url)
+        _write(_page_path(self.root, url), content)
+        return content
+
+
+class ReplayProvider(Provider):
+    """
+    Serve responses saved by RecordingProvider, without network or pacing
+
+    Raises:
+        ReplayMissError: For requests the recording doesn't contain
+    """
+
+    name = 'replay'
+
+    def __init__(self, root):
+        if not os.path.isdir(root):
+            raise ValueError(f"Replay directory {root} does not exist")
+        self.root = root
+
+    def _load(self, path, what):
+        try:
+            return _read(path)
+        except FileNotFoundError:
+            raise ReplayMissError(f"No recorded {what} in {self.root}")
+
+    def info(self, symbol, max_age=None):
+        return self._load(_info_path(self.root, symbol), f"info for {symbol}")
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        bars = self._load(_history_path(self.root, symbol, interval),
+                          f"{interval} history for {symbol}")
+        return period_slice(bars, period)
+
+    def page(self, url):
+        return self._load(_page_path(self.root, url), f"page {url}")
+
+
+def make_provider(spec):
+    """
+    Build a provider from a DATA_PROVIDER spec
+
+    Args:
+        spec (str): 'live', 'record:DIR' or 'replay:DIR'
+
+    Returns:
+        Provider: Live data behind the cache, a recording of it, or a replay
+    """
+    kind, _, root = spec.partition(':')
+    if kind == 'live' and not root:
+        return CachedProvider(LiveProvider())
+    if kind == 'record' and root:
+        # Outermost, so responses served from the cache are recorded too
+        return RecordingProvider(CachedProvider(LiveProvider()), root)
+    if kind == 'replay' and root:
+        return ReplayProvider(root)
+    raise ValueError(f"Unknown data provider '{spec}' (expected live, record:DIR or replay:DIR)")
+
+
+def get_provider():
+    """Return the process-wide provider (rebuilt if the configuration is replaced)."""
+    global _provider
+    if _override is not None:
+        return _override
+    config = get_config()
+    with _provider_lock:
+        if _provider is None or _provider[0] is not config:
+            _provider = (config, make_provider(config.data_provider))
+        return _provider[1]
+
+
+def set_provider(provider):
+    """Use a specific provider for this process (None returns to DATA_PROVIDER)."""
+    global _override
+    _override = provider
@@ -0,0 +1,182 @@
+"""
+Adaptive request pacing for upstream data sources.
+
+Each upstream host gets one limiter shared by every worker thread. It runs
+an AIMD (additive-increase / multiplicative-decrease) window, like TCP
+congestion control: the number of requests allowed in flight grows by
+roughly one per window of successful responses and halves when the host
+throttles us (HTTP 429/503, rate-limit errors, timeouts). The spacing between
+request starts likewise widens on throttling and relaxes back to the
+configured API_DELAY / FINVIZ_DELAY floor as responses succeed.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from config import get_config
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:  # older yfinance
+    YFRateLimitError = None
+
+# Upstream hosts
+YAHOO = 'finance.yahoo.com'
+FINVIZ = 'finviz.com'
+
+THROTTLE_STATUS = (429, 503)
+MAX_BACKOFF_FACTOR = 64
+INITIAL_WINDOW = 2.0
+MIN_COOLDOWN = 1.0
+
+
+class ThrottledError(Exception):
+    """An upstream refused or timed out a request because of load."""
+
+    def __init__(self, host, cause=None):
+        super().__init__(f"{host} throttled the request: {cause}")
+        self.host = host
+        self.cause = cause
+
+
+def is_throttle(exc):
+    """Whether an exception means the upstream is throttling or overloaded."""
+    if isinstance(exc, ThrottledError):
+        return True
+    if YFRateLimitError is not None and isinstance(exc, YFRateLimitError):
+        return True
+    if isinstance(exc, (requests.Timeout, TimeoutError)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in THROTTLE_STATUS
+    return 'too many requests' in str(exc).lower()
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency window plus minimum request spacing for one host."""
+
+    def __init__(self, host, min_interval, max_window=8):
+        self.host = host
+        self.base_interval = float(min_interval)
+        self.interval = float(min_interval)
+        self.max_window = max(1.0, float(max_window))
+        self.window = min(INITIAL_WINDOW, self.max_window)
+        self.in_flight = 0
+        self.successes = 0
+        self.throttles = 0
+        self._next_slot = 0.0
+        self._cond = threading.Condition()
+
+    def _acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.window):
+                self._cond.wait()
+            self.in_flight += 1
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def _release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one request slot; throttling errors raised inside are recorded
+        and re-raised as ThrottledError, other errors count as responses.
+        """
+        self._acquire()
+        try:
+            yield
+        except Exception as e:
+            if is_throttle(e):
+                self.record_throttle()
+                if isinstance(e, ThrottledError):
+                    raise
+                raise ThrottledError(self.host, e) from e
+            self.record_success()
+            raise
+        else:
+            self.record_success()
+        finally:
+            self._release()
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn inside a request slot."""
+        with self.slot():
+            return fn(*args, **kwargs)
+
+    def record_success(self):
+        """Additive increase: about +1 window per window of successes."""
+        with self._cond:
+            self.successes += 1
+            self.window = min(self.max_window, self.window + 1.0 / self.window)
+            self.interval = max(self.base_interval, self.interval * 0.9)
+            self._cond.notify_all()
+
+    def record_throttle(self):
+        """Multiplicative decrease of the window and wider spacing."""
+        with self._cond:
+            self.throttles += 1
+            self.window = max(1.0, self.window / 2)
+            floor = self.base_interval or 0.05
+            self.interval = min(max(self.interval, floor) * 2, floor * MAX_BACKOFF_FACTOR)
+            # Push the next start out so in-flight workers don't pile on
+            self._next_slot = max(self._next_slot, time.monotonic() + self.interval)
+
+    def cooldown(self):
+        """Seconds to wait before retrying throttled work."""
+        return max(MIN_COOLDOWN, self.interval * 4)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'host': self.host,
+                'window': round(self.window, 2),
+                'interval': round(self.interval, 3),
+                'in_flight': self.in_flight,
+                'successes': self.successes,
+                'throttles': self.throttles,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host):
+    """
+    Return the shared limiter for an upstream host (YAHOO or FINVIZ)
+
+    The spacing floor comes from API_DELAY / FINVIZ_DELAY and the window
+    ceiling from SCREENER_WORKERS; a new limiter is created if the
+    configuration is replaced.
+    """
+    config = get_config()
+    with _limiters_lock:
+        entry = _limiters.get(host)
+        if entry is None or entry[0] is not config:
+            delay = config.finviz_delay if host == FINVIZ else config.api_delay
+            entry = _limiters[host] = (config, AdaptiveLimiter(host, delay, config.workers))
+        return entry[1]
+
+
+def limiter_stats():
+    """Current state of every limiter (for logs and the run report)."""
+    with _limiters_lock:
+        limiters = [entry[1] for entry in _limiters.values()]
+    return [limiter.stats() for limiter in limiters]
+
+
+def retry_delay():
+    """Seconds to wait before retrying throttled work (0 if nothing throttled)."""
+    with _limiters_lock:
+        limiters = [entry[1] for entry in _limiters.values()]
+    return max((limiter.cooldown() for limiter in limiters if limiter.throttles), default=0.0)
@@ -0,0 +1,57 @@
+"""
+Result table helpers for the dashboard.
+
+Screening results are kept in session state as one compact DataFrame built
+once per scan (repetitive text columns as categoricals), and display
+formatting is vectorized, so a Streamlit rerun neither copies the rows into
+a new frame nor walks them in Python.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = ['Sector', 'MA Position', 'Momentum', 'Bollinger', 'Consec Up-Days']
+
+
+def results_frame(rows):
+    """
+    Build the session's result table from screening result rows
+
+    Args:
+        rows (list): Result rows from run_stock_screening
+
+    Returns:
+        DataFrame: Results with categorical text columns
+    """
+    df = pd.DataFrame(rows)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def format_currency(values, scale=1.0, decimals=2, suffix=''):
+    """
+    Format numbers as dollar strings in one vectorized pass
+
+    Args:
+        values: Array-like of numbers (NaN/None become 'N/A')
+        scale (float): Divisor applied first (e.g. 1e9 for billions)
+        decimals (int): Digits after the decimal point
+        suffix (str): Text appended to each value (e.g. 'B')
+
+    Returns:
+        ndarray: Formatted strings
+    """
+    numbers = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float) / scale
+    text = np.char.add(np.char.add('$', np.char.mod(f'%.{decimals}f', numbers)), suffix)
+    return np.where(np.isnan(numbers), 'N/A', text)
+
+
+def display_frame(df):
+    """Return the result table with Market Cap and Price formatted for display."""
+    formatted = {}
+    if 'Market Cap' in df.columns:
+        formatted['Market Cap'] = format_currency(df['Market Cap'], scale=1e9, decimals=1, suffix='B')
+    if 'Price' in df.columns:
+        formatted['Price'] = format_currency(df['Price'])
+    return df.assign(**formatted)
@@ -0,0 +1,235 @@
+"""
+Ranking mode: weighted scores and top-K selection instead of pass/fail.
+
+Each screening criterion becomes a margin, meaning how far a ticker is on
+the good side of the sidebar threshold (negative when it misses). Each
+margin is scaled by its typical spread across the universe and squashed into
+0-1 with a logistic curve, so a ticker right at the threshold scores 0.5,
+passing tickers score above it and failing ones below; moving a threshold
+shifts every ticker's score on that criterion. Sector-relative bounds
+(sector P/E percentile, strength against the sector median) are scored the
+same way against the universe's sector metrics. The criterion scores are
+averaged with per-criterion weights into a 0-100 score. The K best tickers are picked
+with a partial sort, so results change smoothly with the parameters instead
+of flipping between zero and many picks.
+"""
+import numpy as np
+import pandas as pd
+
+from rate_limiter import ThrottledError
+from sector_metrics import add_sector_metrics
+from stock_screener import (RELATIVE_PARAMS, MetricsTable, build_result_row, fetch_ticker_metrics,
+                            load_tickers, profiled, scan_universe, uses_relative)
+
+REC_LEVELS = {'strong_buy': 2.0, 'buy': 1.0, 'hold': 0.0, 'underperform': -1.0, 'sell': -2.0}
+
+
+def _col(m, name):
+    """A metrics column as floats (None and junk become NaN)."""
+    return pd.to_numeric(m[name], errors='coerce').to_numpy(dtype=float)
+
+
+def _ratio_margin(values, threshold):
+    """log(value / threshold), NaN for non-positive values."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(values > 0, np.log(values / max(threshold, 1e-12)), np.nan)
+
+
+def _pe_margin(m, max_pe):
+    pe = _col(m, 'fwd_pe')
+    # Zero/negative forward P/E (no or negative earnings) ranks last
+    return np.where(pe > 0, (max_pe - pe) / max(max_pe, 1e-12), np.nan)
+
+
+def _ma_margin(m):
+    price = _col(m, 'price')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.fmin(price / _col(m, 'ma50') - 1, price / _col(m, 'ma200') - 1)
+
+
+def _rsi_margin(m, rsi_min, rsi_max):
+    rsi = _col(m, 'rsi')
+    half = max((rsi_max - rsi_min) / 2, 1e-12)
+    return np.fmin(rsi - rsi_min, rsi_max - rsi) / half
+
+
+def _rec_margin(m, level):
+    # Levels above the required one (any: sell) pass; +0.5 puts the required level itself past 0
+    required = REC_LEVELS.get(level, REC_LEVELS['sell'])
+    return m['rec'].map(REC_LEVELS).to_numpy(dtype=float) - required + 0.5
+
+
+# Criterion name (as in CRITERIA) -> (params keys, margin function); higher is better
+MARGINS = {
+    'fwd_pe': (('max_pe',), _pe_margin),
+    'price': (('min_price',), lambda m, min_price: _ratio_margin(_col(m, 'price'), min_price)),
+    'market_cap': (('min_market_cap',),
+                   lambda m, min_cap: _ratio_margin(_col(m, 'market_cap'), min_cap)),
+    'beta': (('min_beta',), lambda m, min_beta: _col(m, 'beta') - min_beta),
+    'recommendation': (('recommendation_filter',), _rec_margin),
+    'return_5d': (('min_return',), lambda m, min_return: _col(m, 'return_5d') - min_return),
+    'moving_averages': ((), _ma_margin),
+    'rsi': (('rsi_min', 'rsi_max'), _rsi_margin),
+    'volume': (('min_volume',),
+               lambda m, min_volume: _ratio_margin(_col(m, 'avg_volume'), min_volume)),
+    'finviz': ((), lambda m: np.where(m['finviz_ok'].to_numpy(dtype=bool), 1.0, -1.0)),
+    # Sector-relative criteria (scored only when their bound is set; see sector_metrics.py)
+    'sector_pe': (('max_sector_pe_pct',),
+                  lambda m, max_pct: (max_pct - _col(m, 'pe_sector_pct')) / 100),
+    'sector_strength': (('min_sector_rs',), lambda m, min_rs: _col(m, 'rs_sector') - min_rs),
+    'sector_return_z': (('min_sector_return_z',),
+                        lambda m, min_z: _col(m, 'return_sector_z') - min_z),
+}
+
+DEFAULT_WEIGHTS = {name: 1.0 for name in MARGINS}
+
+# Normal-consistent scale of the median absolute deviation
+MAD_SCALE = 1.4826
+
+
+def criterion_scores(metrics, params):
+    """
+    Score (0-1) of every ticker's margin on each criterion
+
+    A margin is divided by the robust spread of that criterion's margins
+    across the universe (scaled MAD, 1 when the margins don't vary) and
+    mapped through a logistic curve: 0.5 at the threshold, above it for
+    tickers that pass. The spread doesn't depend on the threshold, so
+    tightening a threshold lowers every ticker's score on that criterion,
+    most for the tickers near it.
+
+    Args:
+        metrics (DataFrame): Metrics table indexed by ticker (with the
+            sector-relative columns when params set a sector bound)
+        params (dict): Screening parameters (thresholds)
+
+    Returns:
+        DataFrame: One column per criterion; missing data scores 0
+    """
+    columns = {}
+    for name, (keys, fn) in MARGINS.items():
+        if name == 'finviz' and not params.get('enable_finviz', False):
+            continue
+        if keys and keys[0] in RELATIVE_PARAMS and params.get(keys[0]) is None:
+            continue
+        margin = fn(metrics, *[params.get(k) for k in keys])
+        columns[name] = np.asarray(margin, dtype=float)
+    margins = pd.DataFrame(columns, index=metrics.index)
+    spread = (margins - margins.median()).abs().median() * MAD_SCALE
+    spread = spread.where(spread > 0, 1.0).fillna(1.0)
+    return (0.5 * (1 + np.tanh(margins / spread / 2))).fillna(0.0)
+
+
+def score_table(metrics, params, weights=None):
+    """
+    Weighted 0-100 score of every ticker
+
+    Args:
+        metrics (DataFrame): Metrics table indexed by ticker
+        params (dict): Screening parameters
+        weights (dict): Criterion name -> weight (missing names use 1.0, 0 drops a criterion)
+
+    Returns:
+        Series: Score per ticker
+    """
+    scores = criterion_scores(metrics, params)
+    w = pd.Series({name: (weights or {}).get(name, DEFAULT_WEIGHTS[name]) for name in scores.columns},
+                  dtype=float)
+    if w.sum() <= 0:
+        raise ValueError("At least one criterion needs a positive weight")
+    return pd.Series(scores.to_numpy() @ w.to_numpy() / w.sum() * 100, index=scores.index)
+
+
+def top_k(scores, k):
+    """
+    Positions of the k highest scores, best first
+
+    Uses a partial sort (np.partition) so large universes aren't fully
+    sorted. Ties keep universe order, including at the cut: of several
+    tickers tied with the k-th score, the earliest ones are kept.
+    """
+    scores = np.asarray(scores, dtype=float)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=int)
+    keys = np.where(np.isnan(scores), -np.inf, scores)
+    kth = -np.partition(-keys, k - 1)[k - 1]
+    above = np.flatnonzero(keys > kth)
+    tied = np.flatnonzero(keys == kth)[:k - len(above)]
+    best = np.concatenate([above, tied])
+    return best[np.lexsort((best, -keys[best]))]
+
+
+def _ma_position(metrics):
+    above50 = metrics['price'] > metrics['ma50']
+    above200 = metrics['price'] > metrics['ma200']
+    if above50 and above200:
+        return 'Above 50/200d ✓'
+    if above50:
+        return 'Above 50d only'
+    if above200:
+        return 'Above 200d only'
+    return 'Below 50/200d'
+
+
+def run_scored_screening(params, k=20, weights=None, progress_bar=None, status_text=None,
+                         workers=None, tickers=None, report=None, profile=None):
+    """
+    Rank the universe by weighted criterion scores and return the top k
+
+    Args:
+        params (dict): Screening parameters; thresholds become score anchors
+        k (int): Number of tickers to return
+        weights (dict): Criterion name -> weight (see MARGINS)
+        progress_bar: Streamlit progress bar object (optional)
+        status_text: Streamlit text object for status updates (optional)
+        workers (int): Number of tickers fetched concurrently
+        tickers (list): Ticker symbols (defaults to DEFAULT_TICKER_LIST)
+        report (RunReport): Filled with quarantined/flagged tickers (optional)
+        profile (RunProfile): Profiles the run and writes its artifacts
+            (optional)
+
+    Returns:
+        list: Result rows (as run_stock_screening, plus 'Score'), best first
+    """
+    if tickers is None:
+        tickers = load_tickers()
+    enable_finviz = params.get('enable_finviz', False)
+    timeframe = params.get('timeframe', '1d')
+    collected = MetricsTable(tickers)
+
+    def work(symbol):
+        try:
+            metrics, _ = fetch_ticker_metrics(symbol, enable_finviz=enable_finviz, timeframe=timeframe)
+        except ThrottledError:
+            raise
+        except Exception as e:
+            print(f"Error processing {symbol}: {e}")
+            return
+        if metrics is not None:
+            collected.set(symbol, metrics)
+
+    with profiled(profile, 'scored'):
+        scan_universe(tickers, work, progress_bar, status_text, workers, report)
+        table = collected.to_frame()
+        if table.empty:
+            return []
+        # Sector peers are the whole scanned universe, as in filter mode
+        if uses_relative(params):
+            table = add_sector_metrics(table)
+
+        # Only tickers with a quote and a full set of technicals can be ranked
+        usable = table[(_col(table, 'price') > 0) & table['avg_volume'].notna() & table['rsi'].notna()]
+        if usable.empty:
+            return []
+        scores = score_table(usable, params, weights)
+
+        rows = []
+        for pos in top_k(scores, k):
+            symbol = usable.index[pos]
+            metrics = usable.iloc[pos].to_dict()
+            row = build_result_row(symbol, metrics, params)
+            row['MA Position'] = _ma_position(metrics)
+            row['Score'] = round(float(scores.iloc[pos]), 1)
+            rows.append(row)
+    return rows
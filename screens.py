@@ -0,0 +1,125 @@
+"""
+Named screens: saved sets of screening parameters.
+
+A screens file is YAML mapping screen names to parameter overrides, each
+applied on top of DEFAULT_PARAMS:
+
+    screens:
+      momentum:
+        max_pe: 25
+        recommendation_filter: buy
+      intraday_breakout:
+        timeframe: 15m
+        min_return: 0.01
+
+Values are checked and coerced with coerce_param, which the CLI parameter
+file and the API use as well.
+"""
+import json
+import math
+
+from stock_screener import DEFAULT_PARAMS
+
+# Parameters that take whole numbers and fixed choices; other numeric ones are floats
+INT_PARAMS = {'consecutive_days'}
+PARAM_CHOICES = {'timeframe': ('1d', '1h', '15m', '5m'),
+                 'recommendation_filter': ('any', 'buy', 'strong_buy')}
+
+
+def coerce_param(key, value):
+    """
+    Validate a screening parameter given as text (query string) or as a
+    parsed value (JSON, YAML)
+
+    Returns:
+        The value with the parameter's type: bool, int for INT_PARAMS, str
+        for PARAM_CHOICES, float otherwise (None where the default is None)
+
+    Raises:
+        ValueError: If the value has the wrong type or is out of its choices
+    """
+    default = DEFAULT_PARAMS[key]
+    invalid = ValueError(f"Invalid value for {key}: {json.dumps(value, default=str)}")
+    if value is None:
+        if default is None:
+            return None
+        raise invalid
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value
+        lowered = str(value).strip().lower()
+        if lowered not in ('1', 'true', 'yes', 'on', '0', 'false', 'no', 'off'):
+            raise invalid
+        return lowered in ('1', 'true', 'yes', 'on')
+    if key in PARAM_CHOICES:
+        if not isinstance(value, str) or value.strip().lower() not in PARAM_CHOICES[key]:
+            raise ValueError(f"Invalid value for {key}: {json.dumps(value, default=str)} "
+                             f"(expected one of {', '.join(PARAM_CHOICES[key])})")
+        return value.strip().lower()
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise invalid
+    try:
+        number = float(value)
+    except ValueError:
+        raise invalid
+    if not math.isfinite(number):
+        raise invalid
+    if key in INT_PARAMS:
+        if not number.is_integer():
+            raise invalid
+        return int(number)
+    return number
+
+
+def screen_params(overrides, name='screen'):
+    """
+    Full parameters for a screen from its overrides
+
+    Raises:
+        ValueError: If the overrides contain unknown keys or invalid values,
+            or the RSI range is empty
+    """
+    if not isinstance(overrides, dict):
+        raise ValueError(f"Screen '{name}' must be a mapping of parameters")
+    unknown = sorted(set(overrides) - set(DEFAULT_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) in screen '{name}': {', '.join(unknown)}")
+    coerced = {}
+    for key, value in overrides.items():
+        try:
+            coerced[key] = coerce_param(key, value)
+        except ValueError as e:
+            raise ValueError(f"Screen '{name}': {e}")
+    params = dict(DEFAULT_PARAMS, **coerced)
+    if params['rsi_min'] >= params['rsi_max']:
+        raise ValueError(f"Screen '{name}': rsi_min must be below rsi_max")
+    return params
+
+
+def load_screens(path):
+    """
+    Load named screens from a YAML file
+
+    Args:
+        path (str): File with a 'screens' mapping (or the mapping itself)
+
+    Returns:
+        dict: Screen name -> full parameters
+
+    Raises:
+        ValueError: If the file can't be read or a screen is invalid
+    """
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("Screens files need PyYAML (pip install pyyaml)")
+    try:
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise ValueError(f"Cannot read screens file {path}: {e}")
+    if isinstance(data, dict) and isinstance(data.get('screens'), dict):
+        data = data['screens']
+    if not isinstance(data, dict) or not data:
+        raise ValueError(f"Screens file {path} must map screen names to parameters")
+    return {str(name): screen_params(overrides or {}, name) for name, overrides in data.items()}
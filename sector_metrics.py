@@ -0,0 +1,95 @@
+"""
+Sector-relative metrics over a universe metrics table.
+
+Absolute thresholds treat a 20x P/E the same in utilities and software.
+These metrics place each ticker against its sector peers instead, using
+grouped vectorized operations over the whole table:
+
+    pe_sector_pct    percentile (0-100) of forward P/E within the sector; lower is cheaper
+    pe_sector_z      z-score of forward P/E within the sector
+    rs_sector        5-bar return minus the sector median (relative strength)
+    return_sector_z  z-score of the 5-bar return within the sector
+
+Only positive P/Es are compared. Sectors with fewer than MIN_PEERS tickers
+with data (and 'Unknown') get NaN, which fails any sector-relative filter.
+Results are cached per snapshot of the input columns, so evaluating several
+screens, or re-rendering, against the same table computes them once.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from data_cache import ByteLRU
+
+RELATIVE_FIELDS = ['pe_sector_pct', 'pe_sector_z', 'rs_sector', 'return_sector_z']
+INPUT_FIELDS = ['sector', 'fwd_pe', 'return_5d']
+
+MIN_PEERS = 3
+CACHE_BYTES = 16 * 1024 * 1024
+
+_cache = ByteLRU(CACHE_BYTES)
+
+
+def _snapshot_key(table):
+    """Digest of the index and the columns the relative metrics depend on."""
+    hashed = pd.util.hash_pandas_object(table[INPUT_FIELDS], index=True)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()
+
+
+def _grouped(values, sectors):
+    """Per-sector statistics of values, NaN where a sector has too few peers."""
+    groups = values.groupby(sectors, observed=True, sort=False)
+    count = groups.transform('count')
+    enough = (count >= MIN_PEERS) & values.notna()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (values - groups.transform('mean')) / groups.transform('std')
+    return groups, enough, z.replace([np.inf, -np.inf], np.nan)
+
+
+def compute_sector_metrics(table):
+    """
+    Sector-relative metrics for every row of a metrics table
+
+    Args:
+        table (DataFrame): Metrics indexed by ticker with sector, fwd_pe and
+            return_5d columns
+
+    Returns:
+        DataFrame: RELATIVE_FIELDS columns aligned with table
+    """
+    sectors = table['sector'].astype(object).where(table['sector'].notna(), 'Unknown')
+    sectors = sectors.where(sectors != 'Unknown')
+    pe = pd.to_numeric(table['fwd_pe'], errors='coerce').astype(float)
+    pe = pe.where(pe > 0)
+    ret = pd.to_numeric(table['return_5d'], errors='coerce').astype(float)
+
+    out = pd.DataFrame(index=table.index)
+    pe_groups, pe_ok, pe_z = _grouped(pe, sectors)
+    out['pe_sector_pct'] = (pe_groups.rank(pct=True) * 100).where(pe_ok)
+    out['pe_sector_z'] = pe_z.where(pe_ok)
+
+    ret_groups, ret_ok, ret_z = _grouped(ret, sectors)
+    out['rs_sector'] = (ret - ret_groups.transform('median')).where(ret_ok)
+    out['return_sector_z'] = ret_z.where(ret_ok)
+    return out
+
+
+def add_sector_metrics(table):
+    """
+    Copy of a metrics table with the sector-relative columns added
+
+    Args:
+        table (DataFrame): Metrics indexed by ticker
+
+    Returns:
+        DataFrame: table plus RELATIVE_FIELDS (cached per input snapshot)
+    """
+    if table.empty:
+        return table.assign(**{field: pd.Series(dtype=float) for field in RELATIVE_FIELDS})
+    key = _snapshot_key(table)
+    relative = _cache.get(key)
+    if relative is None:
+        relative = compute_sector_metrics(table)
+        _cache.put(key, relative)
+    return table.drop(columns=RELATIVE_FIELDS, errors='ignore').join(relative)
@@ -1,11 +1,558 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import requests
-from bs4 import BeautifulSoup
+import threading
 import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
-def run_stock_screening(params, progress_bar=None, status_text=None):
+from config import get_config
+from data_cache import get_cache, prune_cache_dir
+from fundamentals_store import flush_snapshots, record_snapshot
+from indicators import indicators_for
+from market_calendar import EXCHANGE_TZ
+from providers import ReplayProvider, get_provider, period_slice
+from rate_limiter import ThrottledError, retry_delay
+from sector_metrics import add_sector_metrics
+from timeframes import cached_base_bars, get_bars, series_key
+from validation import check_quote
+
+SAMPLE_TICKERS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NVDA',
+                  'JPM', 'JNJ', 'V', 'UNH', 'HD', 'PG', 'MA', 'DIS']
+
+# Per-ticker metric columns produced by fetch_ticker_metrics / compute_technicals
+FUNDAMENTAL_FIELDS = ['fwd_pe', 'price', 'market_cap', 'beta', 'rec', 'sector']
+TECHNICAL_FIELDS = ['return_5d', 'ma50', 'ma200', 'rsi', 'avg_volume',
+                    'up_streak', 'near_upper', 'stop_loss']
+
+# Retry rounds for tickers an upstream throttled during a scan
+RETRY_ROUNDS = 2
+_THROTTLED = object()
+
+# Default parameters (match the dashboard sidebar defaults)
+DEFAULT_PARAMS = {
+    'max_pe': 15,
+    'min_price': 15,
+    'min_market_cap': 1e10,
+    'min_beta': 1.0,
+    'min_return': 0.05,
+    'rsi_min': 30,
+    'rsi_max': 70,
+    'min_volume': 2e6,
+    'enable_finviz': True,
+    'consecutive_days': 3,
+    'recommendation_filter': 'strong_buy',
+    'timeframe': '1d',
+    # Sector-relative filters (None disables; see sector_metrics.py)
+    'max_sector_pe_pct': None,
+    'min_sector_rs': None,
+    'min_sector_return_z': None,
+}
+
+
+def _num(values):
+    """Coerce a scalar or array-like metric to floats (None and junk become NaN)."""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        flat = pd.to_numeric(pd.Series(np.ravel(np.asarray(values, dtype=object))), errors='coerce')
+        return flat.to_numpy(dtype=float).reshape(np.shape(values))
+
+
+def _recommendation_ok(rec, level):
+    if level == 'strong_buy':
+        return np.isin(rec, ['strong_buy'])
+    if level == 'buy':
+        return np.isin(rec, ['buy', 'strong_buy'])
+    return np.ones(np.shape(rec), dtype=bool)
+
+
+def _relative_ok(m, column, bound, compare):
+    """Mask for an optional sector-relative criterion; an unset bound passes everything."""
+    if bound is None or bound is False:
+        return np.ones(np.shape(m['price']), dtype=bool)
+    return compare(_num(m[column]), bound)
+
+
+# Screening criteria: (name, params keys, stage, mask function). Each mask
+# function works element-wise, so the same definition filters a single
+# ticker inside the scan loop and a whole metrics table in a sweep.
+CRITERIA = [
+    ('fwd_pe', ('max_pe',), 'fundamental',
+     lambda m, max_pe: (_num(m['fwd_pe']) != 0) & (_num(m['fwd_pe']) <= max_pe)),
+    ('price', ('min_price',), 'fundamental',
+     lambda m, min_price: (_num(m['price']) != 0) & (_num(m['price']) >= min_price)),
+    ('market_cap', ('min_market_cap',), 'fundamental',
+     lambda m, min_cap: (_num(m['market_cap']) != 0) & (_num(m['market_cap']) >= min_cap)),
+    ('beta', ('min_beta',), 'fundamental',
+     lambda m, min_beta: (_num(m['beta']) != 0) & (_num(m['beta']) >= min_beta)),
+    ('recommendation', ('recommendation_filter',), 'fundamental',
+     lambda m, level: _recommendation_ok(m['rec'], level)),
+    ('return_5d', ('min_return',), 'technical',
+     lambda m, min_return: _num(m['return_5d']) >= min_return),
+    ('moving_averages', (), 'technical',
+     lambda m: (_num(m['price']) > _num(m['ma50'])) & (_num(m['price']) > _num(m['ma200']))),
+    ('rsi', ('rsi_min', 'rsi_max'), 'technical',
+     lambda m, rsi_min, rsi_max: (_num(m['rsi']) > rsi_min) & (_num(m['rsi']) < rsi_max)),
+    ('volume', ('min_volume',), 'technical',
+     lambda m, min_volume: _num(m['avg_volume']) >= min_volume),
+    ('finviz', ('enable_finviz',), 'finviz',
+     lambda m, enabled: np.asarray(m['finviz_ok'], dtype=bool) if enabled
+     else np.ones(np.shape(m['finviz_ok']), dtype=bool)),
+    # Need the whole universe's metrics (see add_sector_metrics)
+    ('sector_pe', ('max_sector_pe_pct',), 'relative',
+     lambda m, max_pct: _relative_ok(m, 'pe_sector_pct', max_pct, np.less_equal)),
+    ('sector_strength', ('min_sector_rs',), 'relative',
+     lambda m, min_rs: _relative_ok(m, 'rs_sector', min_rs, np.greater_equal)),
+    ('sector_return_z', ('min_sector_return_z',), 'relative',
+     lambda m, min_z: _relative_ok(m, 'return_sector_z', min_z, np.greater_equal)),
+]
+
+RELATIVE_PARAMS = [keys[0] for _, keys, stage, _ in CRITERIA if stage == 'relative']
+
+
+def criterion_mask(criterion, metrics, params):
+    """
+    Evaluate a single screening criterion
+
+    Args:
+        criterion (tuple): Entry from CRITERIA
+        metrics: Mapping of metric name to scalar or array values
+        params (dict): Screening parameters
+
+    Returns:
+        numpy.ndarray: Boolean mask (0-d for scalar metrics)
+    """
+    _, keys, _, fn = criterion
+    return fn(metrics, *[params.get(k, False) for k in keys])
+
+
+def uses_relative(params):
+    """Whether any sector-relative criterion is enabled in params."""
+    return any(params.get(key) is not None for key in RELATIVE_PARAMS)
+
+
+def screen_mask(metrics, params, stages=('fundamental', 'technical', 'finviz', 'relative')):
+    """
+    Combine all criteria of the given stages into one boolean mask
+
+    Args:
+        metrics: Mapping (dict or DataFrame) of metric name to values
+        params (dict): Screening parameters
+        stages (tuple): Criterion stages to include
+
+    Returns:
+        numpy.ndarray: Boolean mask of rows passing every criterion
+    """
+    mask = True
+    for criterion in CRITERIA:
+        if criterion[2] in stages:
+            mask = mask & criterion_mask(criterion, metrics, params)
+    return np.asarray(mask, dtype=bool)
+
+
+def load_tickers(path=None):
+    """
+    Load the ticker universe
+
+    Args:
+        path (str): CSV file with a 'Ticker' column (defaults to
+            DEFAULT_TICKER_LIST)
+
+    Returns:
+        list: Ticker symbols (a small sample if the file doesn't exist)
+    """
+    path = path or get_config().ticker_list
+    try:
+        return pd.read_csv(path)['Ticker'].tolist()
+    except FileNotFoundError:
+        return list(SAMPLE_TICKERS)
+
+
+def fetch_info(symbol, max_age=None):
+    """
+    Fetch a ticker's fundamentals through the data provider (cached and paced)
+
+    Live snapshots are also recorded in the point-in-time fundamentals store,
+    dated by the exchange day they were fetched (info served from the cache
+    on later days is not a new observation).
+
+    Args:
+        symbol (str): Stock ticker symbol
+        max_age (float): Oldest cached info served, in seconds (defaults to
+            CACHE_DURATION); callers polling quotes pass their interval
+
+    Returns:
+        dict: yfinance Ticker.info
+    """
+    provider = get_provider()
+    info = provider.info(symbol, max_age)
+    if info and 'currentPrice' in info and not isinstance(provider, ReplayProvider):
+        fetched = get_cache('info').saved_at(symbol) or time.time()
+        record_snapshot(symbol, extract_fundamentals(info),
+                        day=datetime.fromtimestamp(fetched, EXCHANGE_TZ).date())
+    return info
+
+
+def extract_fundamentals(info):
+    """
+    Pull the screening fundamentals out of a yfinance info dict
+
+    Args:
+        info (dict): yfinance Ticker.info
+
+    Returns:
+        dict: Fundamental metrics keyed by FUNDAMENTAL_FIELDS
+    """
+    return {
+        'fwd_pe': info.get('forwardPE'),
+        'price': info.get('currentPrice'),
+        'market_cap': info.get('marketCap'),
+        'beta': info.get('beta'),
+        'rec': info.get('recommendationKey', '') or '',
+        'sector': info.get('sector', 'Unknown'),
+    }
+
+
+def compute_technicals(hist, price, symbol=None, asof=None):
+    """
+    Compute technical screening metrics from a price history
+    
+    Windows are counted in bars, so the same definitions apply to daily and
+    intraday timeframes.
+    
+    Args:
+        hist (DataFrame): OHLCV history (oldest first)
+        price (float): Reference price for MA/Bollinger/stop-loss checks
+        symbol (str): Ticker; when given the indicator frame is stored and
+            reused by the dashboard detail view
+        asof (int): Row position to evaluate at (defaults to the last bar);
+            indicators are causal, so this equals truncating the history
+    
+    Returns:
+        dict: Technical metrics keyed by TECHNICAL_FIELDS
+    """
+    frame = indicators_for(symbol, hist)
+    pos = len(hist) - 1 if asof is None else asof
+    row = frame.iloc[pos].astype(np.float64)
+
+    # Moving averages (fall back to the 50-day when history is too short)
+    ma50 = row['sma_50']
+    ma200 = row['sma_200'] if pos + 1 >= 200 else ma50
+
+    # Consecutive up days (length of the trailing run of positive closes)
+    gains = (hist['Close'].diff().to_numpy()[:pos + 1] > 0)[::-1]
+    up_streak = int(gains.argmin()) if not gains.all() else len(gains)
+
+    # Bollinger Bands
+    upper_bb = row['bb_upper_20_2']
+    near_upper = bool(price >= (upper_bb * 0.98)) if not pd.isna(upper_bb) else False
+
+    # ATR for stop loss
+    atr = row['atr_14']
+    stop_loss = price - 1.5 * atr if not pd.isna(atr) else price * 0.9
+
+    return {
+        'return_5d': row['return_5'],
+        'ma50': ma50,
+        'ma200': ma200,
+        'rsi': row['rsi_14'],
+        'avg_volume': row['avg_volume_30'],
+        'up_streak': up_streak,
+        'near_upper': near_upper,
+        'stop_loss': stop_loss,
+    }
+
+
+def ticker_technicals(symbol, timeframe, price):
+    """
+    Technical metrics for a ticker at a timeframe through the shared cache
+
+    Sessions and workers screening the same ticker share one bar load and
+    computation per CACHE_DURATION.
+
+    Args:
+        symbol (str): Stock ticker symbol
+        timeframe (str): Bar timeframe
+        price (float): Reference price (part of the cache key)
+
+    Returns:
+        dict: Technical metrics, or None if the history is too short or
+        the quote doesn't match it
+    """
+    def compute():
+        hist = get_bars(symbol, timeframe)
+        if hist.empty or len(hist) < 50 or not check_quote(symbol, price, hist):
+            return None
+        return compute_technicals(hist, price, symbol=series_key(symbol, timeframe))
+
+    return get_cache('metrics').get_or_fetch((symbol, timeframe, price), compute)
+
+
+def check_finviz(symbol):
+    """
+    Scrape Finviz for monthly performance and institutional ownership
+    
+    Results are cached for CACHE_DURATION seconds; failed scrapes are not.
+    Throttling raises ThrottledError so the caller can retry the ticker.
+    
+    Args:
+        symbol (str): Stock ticker symbol
+    
+    Returns:
+        bool: True if the ticker passes the Finviz checks
+    """
+    cache = get_cache('finviz')
+    cached = cache.get(symbol)
+    if cached is not None:
+        return cached
+
+    try:
+        content = get_provider().page(f'https://finviz.com/quote.ashx?t={symbol}')
+    except ThrottledError:
+        raise
+    except Exception as e:
+        print(f"Finviz scraping failed for {symbol}: {e}")
+        return False
+
+    from bs4 import BeautifulSoup  # only needed when Finviz checks are enabled
+
+    finviz_passed = True
+    try:
+        soup = BeautifulSoup(content, 'html.parser')
+
+        # Monthly performance
+        perf_element = soup.find(text='Perf Month')
+        if perf_element:
+            perf = perf_element.find_next('td').text
+            if not perf.startswith('+'):
+                finviz_passed = False
+
+        # Institutional ownership
+        if finviz_passed:
+            instro_element = soup.find(text='Inst Own')
+            if instro_element:
+                instro_text = instro_element.find_next('td').text.strip('%')
+                try:
+                    instro = float(instro_text)
+                    if instro <= 0:
+                        finviz_passed = False
+                except (ValueError, TypeError):
+                    finviz_passed = False
+
+    except Exception as e:
+        print(f"Finviz scraping failed for {symbol}: {e}")
+        return False
+
+    cache.set(symbol, finviz_passed)
+    return finviz_passed
+
+
+def build_result_row(symbol, metrics, params):
+    """
+    Format the metrics of a ticker that passed screening as a result row
+
+    Args:
+        symbol (str): Stock ticker symbol
+        metrics (dict): Fundamental and technical metrics
+        params (dict): Screening parameters
+
+    Returns:
+        dict: Display-ready result row
+    """
+    consec_up = metrics['up_streak'] >= params['consecutive_days']
+    row = {
+        'Ticker': symbol,
+        'Price': round(metrics['price'], 2),
+        'Fwd P/E': round(metrics['fwd_pe'], 1),
+        'Market Cap': metrics['market_cap'],
+        'Volume': int(metrics['avg_volume']),
+        'RSI': round(metrics['rsi'], 1),
+        'MA Position': 'Above 50/200d ✓',
+        'Sector': metrics['sector'],
+        'Beta': round(metrics['beta'], 2),
+        'Momentum': '↑' if consec_up else '→',
+        'Bollinger': '✓' if metrics['near_upper'] else '–',
+        'Consec Up-Days': '✓' if consec_up else '',
+        'Stop-Loss': round(metrics['stop_loss'], 2),
+        '5d Return': f"{metrics['return_5d']*100:.1f}%"
+    }
+    if 'pe_sector_pct' in metrics:
+        row['Sector P/E Pctl'] = round(metrics['pe_sector_pct'], 0)
+        row['Sector RS'] = 'N/A' if pd.isna(metrics['rs_sector']) else f"{metrics['rs_sector']*100:+.1f}%"
+    return row
+
+
+def fetch_ticker_metrics(symbol, enable_finviz=False, timeframe='1d'):
+    """
+    Fetch fundamentals and price history for a ticker and compute every
+    screening metric without applying any filter
+
+    Args:
+        symbol (str): Stock ticker symbol
+        enable_finviz (bool): Also run the Finviz checks
+        timeframe (str): Bar timeframe ('1d', '1h', '15m' or '5m')
+
+    Returns:
+        tuple: (metrics dict, price history DataFrame) or (None, None) if the
+        ticker has no usable quote
+    """
+    info = fetch_info(symbol)
+    if not info or 'currentPrice' not in info:
+        return None, None
+
+    metrics = extract_fundamentals(info)
+    metrics.update({field: np.nan for field in TECHNICAL_FIELDS})
+    hist = get_bars(symbol, timeframe)
+    if (not hist.empty and len(hist) >= 50 and metrics['price']
+            and check_quote(symbol, metrics['price'], hist)):
+        metrics.update(compute_technicals(hist, metrics['price'],
+                                          symbol=series_key(symbol, timeframe)))
+    metrics['finviz_ok'] = check_finviz(symbol) if enable_finviz else True
+    return metrics, hist
+
+
+def screen_symbol(symbol, params):
+    """
+    Screen a single ticker, fetching only what its filters need
+    
+    Args:
+        symbol (str): Stock ticker symbol
+        params (dict): Screening parameters
+    
+    Returns:
+        dict: Result row if the ticker passed every filter, else None
+    
+    Raises:
+        ThrottledError: If an upstream throttled a request for this ticker
+    """
+    timeframe = params.get('timeframe', '1d')
+    try:
+        info = fetch_info(symbol)
+        
+        # Basic validation
+        if not info or 'currentPrice' not in info:
+            return None
+            
+        # Fundamental and recommendation filters
+        metrics = extract_fundamentals(info)
+        if not screen_mask(metrics, params, stages=('fundamental',)):
+            return None
+        
+        # Price history analysis
+        try:
+            technicals = ticker_technicals(symbol, timeframe, metrics['price'])
+            if technicals is None:
+                return None
+            metrics.update(technicals)
+        except ThrottledError:
+            raise
+        except Exception as e:
+            print(f"Technical analysis failed for {symbol}: {e}")
+            return None
+        
+        if not screen_mask(metrics, params, stages=('technical',)):
+            return None
+        
+        # Finviz scraping (if enabled)
+        if params.get('enable_finviz', False) and not check_finviz(symbol):
+            return None
+        
+        # If we get here, stock passed all filters
+        return build_result_row(symbol, metrics, params)
+        
+    except ThrottledError:
+        raise
+    except Exception as e:
+        print(f"Error processing {symbol}: {e}")
+        return None
+
+
+def _screen_positions(tickers, positions, work, workers):
+    """Yield (position, work result or _THROTTLED) for each ticker as it completes."""
+    def screen(pos):
+        try:
+            return work(tickers[pos])
+        except ThrottledError:
+            return _THROTTLED
+
+    if workers <= 1:
+        for pos in positions:
+            yield pos, screen(pos)
+    else:
+        # Results are consumed in the caller's thread so Streamlit widgets
+        # are only touched from the script thread
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(screen, pos): pos for pos in positions}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
+def scan_universe(tickers, work, progress_bar=None, status_text=None, workers=None,
+                  report=None):
+    """
+    Run work(symbol) over the universe with progress reporting
+
+    Tickers throttled by an upstream are retried after the pass, up to
+    RETRY_ROUNDS times. If a RunReport is given, it receives the data
+    quality issues of the scanned tickers and the ones skipped.
+
+    Returns:
+        list: work() result per ticker position (None for skipped tickers)
+    """
+    if workers is None:
+        workers = get_config().workers
+
+    total_symbols = len(tickers)
+    results = [None] * total_symbols
+    pending = list(range(total_symbols))
+    
+    # Throttled tickers are retried after the pass instead of being dropped
+    for attempt in range(RETRY_ROUNDS + 1):
+        if attempt:
+            delay = retry_delay()
+            print(f"Retrying {len(pending)} throttled tickers in {delay:.1f}s "
+                  f"(round {attempt}/{RETRY_ROUNDS})")
+            time.sleep(delay)
+        throttled = []
+        for i, (pos, result) in enumerate(_screen_positions(tickers, pending, work, workers), 1):
+            if result is _THROTTLED:
+                throttled.append(pos)
+            else:
+                results[pos] = result
+            if progress_bar:
+                progress_bar.progress(i / len(pending))
+            if status_text:
+                prefix = f"Retry {attempt}: " if attempt else ""
+                status_text.text(f"{prefix}Analyzing {tickers[pos]} ({i}/{len(pending)})...")
+        pending = sorted(throttled)
+        if not pending:
+            break
+    
+    if pending:
+        print(f"Skipped {len(pending)} tickers still throttled after {RETRY_ROUNDS} "
+              f"retries: {', '.join(tickers[pos] for pos in pending)}")
+    if report is not None:
+        report.collect(tickers, skipped=[tickers[pos] for pos in pending])
+    
+    flush_snapshots()
+    prune_cache_dir()
+    
+    # Clear progress indicators
+    if progress_bar:
+        progress_bar.progress(1.0)
+    if status_text:
+        status_text.text("Screening completed!")
+    return results
+
+
+def profiled(profile, label):
+    """Context that profiles a run if a RunProfile is given."""
+    return profile.capture(label) if profile is not None else nullcontext()
+
+
+def run_stock_screening(params, progress_bar=None, status_text=None, workers=None,
+                        tickers=None, report=None, profile=None):
     """
     Run stock screening based on provided parameters
     
@@ -13,184 +560,324 @@ def run_stock_screening(params, progress_bar=None, status_text=None):
         params (dict): Dictionary containing screening parameters
         progress_bar: Streamlit progress bar object (optional)
         status_text: Streamlit text object for status updates (optional)
+        workers (int): Number of tickers fetched concurrently (defaults to
+            SCREENER_WORKERS); requests stay paced by the adaptive per-host
+            limiters, and tickers throttled by an upstream are retried at
+            the end of the scan
+        tickers (list): Ticker symbols (defaults to DEFAULT_TICKER_LIST)
+        report (RunReport): Filled with quarantined/flagged tickers (optional)
+        profile (RunProfile): Profiles the run and writes its artifacts
+            (optional)
     
     Returns:
         list: List of dictionaries containing stock data that meet criteria
     """
     
     # Load S&P 500 tickers
-    try:
-        sp500 = pd.read_csv('sp500_tickers.csv')
-    except FileNotFoundError:
-        # Create a sample if file doesn't exist
-        sample_tickers = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NVDA', 
-                         'JPM', 'JNJ', 'V', 'UNH', 'HD', 'PG', 'MA', 'DIS']
-        sp500 = pd.DataFrame({'Ticker': sample_tickers})
+    if tickers is None:
+        tickers = load_tickers()
     
-    results = []
-    total_symbols = len(sp500['Ticker'])
+    # Sector-relative filters compare each ticker with the whole universe,
+    # so they go through the shared metrics table instead of per-ticker exits
+    if uses_relative(params):
+        return run_screens({'screen': params}, progress_bar, status_text, workers, tickers,
+                           report, profile)['screen']
     
-    for i, symbol in enumerate(sp500['Ticker'], 1):
-        try:
-            # Update progress
-            if progress_bar:
-                progress_bar.progress(i / total_symbols)
-            if status_text:
-                status_text.text(f"Analyzing {symbol} ({i}/{total_symbols})...")
-            
-            time.sleep(0.05)  # Rate limiting
-            tk = yf.Ticker(symbol)
-            info = tk.info
-            
-            # Basic validation
-            if not info or 'currentPrice' not in info:
-                continue
-                
-            # Fundamentals
-            fwd_pe = info.get('forwardPE')
-            price = info.get('currentPrice')
-            market_cap = info.get('marketCap')
-            beta = info.get('beta')
-            rec = info.get('recommendationKey', '')
-            
-            # Apply fundamental filters
-            if not fwd_pe or fwd_pe > params['max_pe']:
-                continue
-            if not price or price < params['min_price']:
-                continue
-            if not market_cap or market_cap < params['min_market_cap']:
-                continue
-            if not beta or beta < params['min_beta']:
-                continue
-                
-            # Recommendation filter
-            if params['recommendation_filter'] == 'strong_buy' and rec != 'strong_buy':
-                continue
-            elif params['recommendation_filter'] == 'buy' and rec not in ['buy', 'strong_buy']:
-                continue
-            
-            # Price history analysis
+    with profiled(profile, 'screen'):
+        rows = scan_universe(tickers, lambda symbol: screen_symbol(symbol, params),
+                             progress_bar, status_text, workers, report)
+    return [row for row in rows if row is not None]
+
+
+def screen_metrics(symbol, screens):
+    """
+    Metrics of one ticker for every timeframe used by a set of screens
+
+    Data is fetched only as far as some screen needs it: price history only
+    if the ticker passes a screen's fundamental filters (or a screen has
+    sector-relative filters, which need every peer's returns), Finviz only if
+    it also passes the technical filters of a screen with Finviz enabled.
+
+    Args:
+        symbol (str): Stock ticker symbol
+        screens (dict): Screen name -> parameters
+
+    Returns:
+        dict: timeframe -> metrics dict (empty if the ticker has no quote)
+
+    Raises:
+        ThrottledError: If an upstream throttled a request for this ticker
+    """
+    info = fetch_info(symbol)
+    if not info or 'currentPrice' not in info:
+        return {}
+
+    fundamentals = extract_fundamentals(info)
+    by_timeframe = {}
+    for params in screens.values():
+        by_timeframe.setdefault(params.get('timeframe', '1d'), []).append(params)
+
+    out = {}
+    for timeframe, group in by_timeframe.items():
+        metrics = dict(fundamentals, finviz_ok=False)
+        metrics.update({field: np.nan for field in TECHNICAL_FIELDS})
+        candidates = [p for p in group if uses_relative(p)
+                      or screen_mask(fundamentals, p, stages=('fundamental',))]
+        if candidates:
             try:
-                hist = tk.history(period='6mo', interval='1d')
-                if hist.empty or len(hist) < 50:
-                    continue
-                    
-                # 5-day return
-                hist['5d_return'] = hist['Close'].pct_change(5)
-                latest_return = hist['5d_return'].iloc[-1]
-                if pd.isna(latest_return) or latest_return < params['min_return']:
-                    continue
-                
-                # Moving averages
-                ma50 = hist['Close'].rolling(50).mean().iloc[-1]
-                ma200 = hist['Close'].rolling(200).mean().iloc[-1] if len(hist) >= 200 else ma50
-                if pd.isna(ma50) or pd.isna(ma200) or not (price > ma50 and price > ma200):
-                    continue
-                
-                # RSI calculation
-                delta = hist['Close'].diff()
-                up = delta.clip(lower=0)
-                down = -1 * delta.clip(upper=0)
-                ma_up = up.ewm(com=13, adjust=False).mean()
-                ma_down = down.ewm(com=13, adjust=False).mean()
-                rsi = 100 - (100 / (1 + ma_up / ma_down))
-                latest_rsi = rsi.iloc[-1]
-                
-                if pd.isna(latest_rsi) or not (params['rsi_min'] < latest_rsi < params['rsi_max']):
-                    continue
-                
-                # Volume check
-                avg_vol = hist['Volume'].rolling(30).mean().iloc[-1]
-                if pd.isna(avg_vol) or avg_vol < params['min_volume']:
-                    continue
-                
-                # Consecutive up days
-                recent_changes = hist['Close'].diff().tail(params['consecutive_days'])
-                consec_up = (recent_changes > 0).all()
-                
-                # Bollinger Bands
-                m20 = hist['Close'].rolling(20).mean().iloc[-1]
-                std20 = hist['Close'].rolling(20).std().iloc[-1]
-                upper_bb = m20 + 2 * std20
-                near_upper = price >= (upper_bb * 0.98) if not pd.isna(upper_bb) else False
-                
-                # ATR for stop loss
-                high_low = hist['High'] - hist['Low']
-                high_pc = np.abs(hist['High'] - hist['Close'].shift())
-                low_pc = np.abs(hist['Low'] - hist['Close'].shift())
-                tr = pd.concat([high_low, high_pc, low_pc], axis=1).max(axis=1)
-                atr = tr.rolling(14).mean().iloc[-1]
-                stop_loss = price - 1.5 * atr if not pd.isna(atr) else price * 0.9
-                
+                technicals = ticker_technicals(symbol, timeframe, metrics['price'])
+            except ThrottledError:
+                raise
             except Exception as e:
                 print(f"Technical analysis failed for {symbol}: {e}")
+                technicals = None
+            if technicals is not None:
+                metrics.update(technicals)
+                if any(p.get('enable_finviz', False) and screen_mask(metrics, p, stages=('technical',))
+                       for p in candidates):
+                    metrics['finviz_ok'] = check_finviz(symbol)
+        out[timeframe] = metrics
+    return out
+
+
+class MetricsTable:
+    """
+    Per-ticker screening metrics of a scan, column-oriented
+
+    A scan over the full universe keeps every ticker's metrics, not only the
+    survivors'. Held as one dict per ticker that costs several hundred bytes
+    each (the dict plus a boxed value per field); here each metric is one numpy
+    column indexed by the ticker's position in the universe, and the text
+    fields are small integer codes into a shared list of labels. Workers
+    write rows as tickers complete; the DataFrame is built once, by
+    to_frame(), where the table is screened or shown.
+
+    Args:
+        symbols (list): Ticker symbols of the scan, in universe order
+    """
+
+    NUMERIC_FIELDS = [field for field in FUNDAMENTAL_FIELDS + TECHNICAL_FIELDS
+                      if field not in ('rec', 'sector')]
+    TEXT_FIELDS = ['rec', 'sector']
+    FLAG_FIELDS = ['finviz_ok']
+
+    __slots__ = ('symbols', 'present', '_positions', '_numeric', '_flags', '_codes', '_labels',
+                 '_lock')
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        size = len(self.symbols)
+        self._positions = {symbol: pos for pos, symbol in enumerate(self.symbols)}
+        self.present = np.zeros(size, dtype=bool)
+        self._numeric = {field: np.full(size, np.nan) for field in self.NUMERIC_FIELDS}
+        self._flags = {field: np.zeros(size, dtype=bool) for field in self.FLAG_FIELDS}
+        self._codes = {field: np.full(size, -1, dtype=np.int32) for field in self.TEXT_FIELDS}
+        self._labels = {field: {} for field in self.TEXT_FIELDS}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return int(self.present.sum())
+
+    @property
+    def nbytes(self):
+        """Bytes held by the columns (labels not included)."""
+        arrays = [self.present, *self._numeric.values(), *self._flags.values(), *self._codes.values()]
+        return sum(array.nbytes for array in arrays)
+
+    def set(self, symbol, metrics):
+        """Store a ticker's metrics dict (fields it lacks stay missing)."""
+        pos = self._positions[symbol]
+        for field, column in self._numeric.items():
+            value = metrics.get(field)
+            try:
+                column[pos] = np.nan if value is None else float(value)
+            except (TypeError, ValueError):
+                column[pos] = np.nan
+        for field, column in self._flags.items():
+            column[pos] = bool(metrics.get(field, False))
+        for field, codes in self._codes.items():
+            value = metrics.get(field)
+            if value is None:
                 continue
-            
-            # Finviz scraping (if enabled)
-            finviz_passed = True
-            if params.get('enable_finviz', False):
-                try:
-                    time.sleep(0.1)  # Rate limiting
-                    url = f'https://finviz.com/quote.ashx?t={symbol}'
-                    response = requests.get(url, timeout=10)
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Monthly performance
-                    perf_element = soup.find(text='Perf Month')
-                    if perf_element:
-                        perf = perf_element.find_next('td').text
-                        if not perf.startswith('+'):
-                            finviz_passed = False
-                    
-                    # Institutional ownership
-                    if finviz_passed:
-                        instro_element = soup.find(text='Inst Own')
-                        if instro_element:
-                            instro_text = instro_element.find_next('td').text.strip('%')
-                            try:
-                                instro = float(instro_text)
-                                if instro <= 0:
-                                    finviz_passed = False
-                            except (ValueError, TypeError):
-                                finviz_passed = False
-                                
-                except Exception as e:
-                    print(f"Finviz scraping failed for {symbol}: {e}")
-                    finviz_passed = False
-                    
-                if not finviz_passed:
-                    continue
-            
-            # If we get here, stock passed all filters
-            results.append({
-                'Ticker': symbol,
-                'Price': round(price, 2),
-                'Fwd P/E': round(fwd_pe, 1),
-                'Market Cap': market_cap,
-                'Volume': int(avg_vol),
-                'RSI': round(latest_rsi, 1),
-                'MA Position': 'Above 50/200d ✓',
-                'Sector': info.get('sector', 'Unknown'),
-                'Beta': round(beta, 2),
-                'Momentum': '↑' if consec_up else '→',
-                'Bollinger': '✓' if near_upper else '–',
-                'Consec Up-Days': '✓' if consec_up else '',
-                'Stop-Loss': round(stop_loss, 2),
-                '5d Return': f"{latest_return*100:.1f}%"
-            })
-            
+            labels = self._labels[field]
+            code = labels.get(value)
+            if code is None:
+                with self._lock:
+                    code = labels.setdefault(value, len(labels))
+            codes[pos] = code
+        self.present[pos] = True
+
+    def to_frame(self):
+        """
+        Tickers with metrics as a DataFrame indexed by symbol
+
+        Returns:
+            DataFrame: FUNDAMENTAL_FIELDS, finviz_ok and TECHNICAL_FIELDS
+            columns (text fields as objects, finviz_ok as bool)
+        """
+        rows = np.flatnonzero(self.present)
+        data = {}
+        for field in FUNDAMENTAL_FIELDS + self.FLAG_FIELDS + TECHNICAL_FIELDS:
+            if field in self._codes:
+                # Code -1 (missing) picks the trailing None
+                labels = np.array(list(self._labels[field]) + [None], dtype=object)
+                data[field] = labels[self._codes[field][rows]]
+            elif field in self._flags:
+                data[field] = self._flags[field][rows]
+            else:
+                data[field] = self._numeric[field][rows]
+        return pd.DataFrame(data, index=pd.Index(np.array(self.symbols, dtype=object)[rows]))
+
+
+def run_screens(screens, progress_bar=None, status_text=None, workers=None, tickers=None,
+                report=None, profile=None):
+    """
+    Run several named screens in one pass over the universe
+    
+    Each ticker is fetched and its metrics computed once (per timeframe),
+    then every screen is evaluated against the shared metrics table, so N
+    screens cost one scan plus a vectorized mask per screen.
+    
+    Args:
+        screens (dict): Screen name -> screening parameters
+        progress_bar: Streamlit progress bar object (optional)
+        status_text: Streamlit text object for status updates (optional)
+        workers (int): Number of tickers fetched concurrently (defaults to
+            SCREENER_WORKERS)
+        tickers (list): Ticker symbols (defaults to DEFAULT_TICKER_LIST)
+        report (RunReport): Filled with quarantined/flagged tickers (optional)
+        profile (RunProfile): Profiles the run and writes its artifacts
+            (optional)
+    
+    Returns:
+        dict: Screen name -> result rows, as returned by run_stock_screening
+    """
+    if tickers is None:
+        tickers = load_tickers()
+    collected = {params.get('timeframe', '1d'): MetricsTable(tickers) for params in screens.values()}
+    
+    def work(symbol):
+        try:
+            per_timeframe = screen_metrics(symbol, screens)
+        except ThrottledError:
+            raise
         except Exception as e:
             print(f"Error processing {symbol}: {e}")
-            continue
-    
-    # Clear progress indicators
-    if progress_bar:
-        progress_bar.progress(1.0)
-    if status_text:
-        status_text.text("Screening completed!")
+            return None
+        for timeframe, metrics in per_timeframe.items():
+            collected[timeframe].set(symbol, metrics)
     
+    with profiled(profile, 'screens'):
+        scan_universe(tickers, work, progress_bar, status_text, workers, report)
+
+        tables = {timeframe: table.to_frame() for timeframe, table in collected.items() if len(table)}
+        if any(uses_relative(params) for params in screens.values()):
+            tables = {timeframe: add_sector_metrics(table) for timeframe, table in tables.items()}
+
+        results = {}
+        for name, params in screens.items():
+            table = tables.get(params.get('timeframe', '1d'))
+            if table is None or table.empty:
+                results[name] = []
+                continue
+            mask = screen_mask(table, params)
+            passing = table[mask]
+            results[name] = [build_result_row(symbol, metrics, params)
+                             for symbol, metrics in zip(passing.index, passing.to_dict('records'))]
     return results
 
+
+# StockInfoBatch summary column -> yfinance info key
+INFO_SUMMARY_FIELDS = {
+    'current_price': 'currentPrice',
+    'market_cap': 'marketCap',
+    'pe_ratio': 'forwardPE',
+    'beta': 'beta',
+    'dividend_yield': 'dividendYield',
+    'fifty_two_week_high': 'fiftyTwoWeekHigh',
+    'fifty_two_week_low': 'fiftyTwoWeekLow',
+}
+
+
+class StockInfoBatch:
+    """
+    Details of several tickers, column-oriented
+
+    Attributes:
+        summary (DataFrame): One row per fetched ticker with the
+            INFO_SUMMARY_FIELDS columns (floats)
+        info (dict): symbol -> yfinance info
+        history (dict): symbol -> daily OHLCV bars (shared with the bar
+            cache, so treat them as read-only)
+        errors (dict): symbol -> why the ticker couldn't be fetched
+    """
+
+    __slots__ = ('summary', 'info', 'history', 'errors')
+
+    def __init__(self, summary, info, history, errors):
+        self.summary = summary
+        self.info = info
+        self.history = history
+        self.errors = errors
+
+    def __len__(self):
+        return len(self.info)
+
+    def __contains__(self, symbol):
+        return symbol in self.info
+
+    def get(self, symbol):
+        """Details of one ticker in the get_stock_info layout, or None."""
+        if symbol not in self.info:
+            return None
+        details = {'info': self.info[symbol], 'history': self.history[symbol]}
+        for field, value in self.summary.loc[symbol].items():
+            details[field] = None if pd.isna(value) else value
+        return details
+
+
+def get_stock_info_many(symbols, period='1y', workers=None):
+    """
+    Fetch details for several tickers at once
+
+    Fundamentals come through the info cache and daily bars from the shared
+    bar store (sliced to period), fetched concurrently, so tickers a scan
+    just loaded cost no further requests.
+
+    Args:
+        symbols (list): Stock ticker symbols
+        period (str): History to return per ticker ('3mo', '1y'...)
+        workers (int): Tickers fetched concurrently (defaults to SCREENER_WORKERS)
+
+    Returns:
+        StockInfoBatch: Details of the tickers that could be fetched
+    """
+    symbols = list(dict.fromkeys(symbols))
+
+    def fetch(symbol):
+        try:
+            info = fetch_info(symbol)
+            return info, period_slice(cached_base_bars(symbol, '1d'), period), None
+        except Exception as e:
+            return None, None, str(e) or type(e).__name__
+
+    info, history, errors = {}, {}, {}
+    if symbols:
+        with ThreadPoolExecutor(max_workers=min(workers or get_config().workers, len(symbols))) as pool:
+            for symbol, (ticker_info, bars, error) in zip(symbols, pool.map(fetch, symbols)):
+                if error is not None or not ticker_info:
+                    errors[symbol] = error or "no data"
+                    continue
+                info[symbol] = ticker_info
+                history[symbol] = bars
+    summary = pd.DataFrame(
+        {field: pd.to_numeric(pd.Series([info[s].get(key) for s in info], index=list(info), dtype=object),
+                              errors='coerce').astype(float)
+         for field, key in INFO_SUMMARY_FIELDS.items()},
+        index=pd.Index(list(info), name='Ticker'))
+    return StockInfoBatch(summary, info, history, errors)
+
+
 def get_stock_info(symbol):
     """
     Get detailed information for a specific stock
@@ -199,46 +886,16 @@ def get_stock_info(symbol):
         symbol (str): Stock ticker symbol
     
     Returns:
-        dict: Stock information
+        dict: Stock information (see get_stock_info_many), or None
     """
-    try:
-        tk = yf.Ticker(symbol)
-        info = tk.info
-        hist = tk.history(period='1y')
-        
-        return {
-            'info': info,
-            'history': hist,
-            'current_price': info.get('currentPrice'),
-            'market_cap': info.get('marketCap'),
-            'pe_ratio': info.get('forwardPE'),
-            'beta': info.get('beta'),
-            'dividend_yield': info.get('dividendYield'),
-            'fifty_two_week_high': info.get('fiftyTwoWeekHigh'),
-            'fifty_two_week_low': info.get('fiftyTwoWeekLow')
-        }
-    except Exception as e:
-        print(f"Error getting info for {symbol}: {e}")
-        return None
+    details = get_stock_info_many([symbol])
+    if symbol in details.errors:
+        print(f"Error getting info for {symbol}: {details.errors[symbol]}")
+    return details.get(symbol)
 
 if __name__ == "__main__":
-    # Default parameters for testing
-    default_params = {
-        'max_pe': 15,
-        'min_price': 15,
-        'min_market_cap': 1e10,
-        'min_beta': 1.0,
-        'min_return': 0.05,
-        'rsi_min': 30,
-        'rsi_max': 70,
-        'min_volume': 2e6,
-        'enable_finviz': True,
-        'consecutive_days': 3,
-        'recommendation_filter': 'strong_buy'
-    }
-    
     print("Running stock screening with default parameters...")
-    results = run_stock_screening(default_params)
+    results = run_stock_screening(DEFAULT_PARAMS)
     
     print(f"Found {len(results)} stocks that meet all criteria:")
     if results:
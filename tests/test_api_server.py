@@ -0,0 +1,50 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_server import ApiError, ApiServer, parse_screen_request  # noqa: E402
+
+
+def test_query_params_parse_as_floats():
+    request = parse_screen_request({'max_pe': '20.5', 'rsi_min': '30.5', 'consecutive_days': '2',
+                                    'enable_finviz': 'no'}, None)
+    params = request['params']
+    assert params['max_pe'] == 20.5 and params['rsi_min'] == 30.5
+    assert params['consecutive_days'] == 2 and params['enable_finviz'] is False
+
+
+def test_body_params_are_type_checked():
+    params = parse_screen_request({}, {'params': {'max_pe': 20, 'min_sector_rs': None,
+                                                  'timeframe': '1h'}})['params']
+    assert params['max_pe'] == 20.0 and params['min_sector_rs'] is None
+    for bad in ({'max_pe': None}, {'max_pe': 'cheap'}, {'max_pe': True}, {'max_pe': [1]},
+                {'consecutive_days': 2.5}, {'timeframe': '2h'}, {'enable_finviz': 'maybe'}):
+        with pytest.raises(ApiError) as error:
+            parse_screen_request({}, {'params': bad})
+        assert error.value.status == 400
+    with pytest.raises(ApiError):
+        parse_screen_request({}, {'params': [1, 2]})
+
+
+async def _exchange(request):
+    server = await asyncio.start_server(ApiServer().serve_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+    return response
+
+
+@pytest.mark.parametrize('length', ['abc', '-5', '1.5'])
+def test_bad_content_length_is_rejected(length):
+    request = f"POST /screen HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode()
+    response = asyncio.run(_exchange(request))
+    assert response.startswith(b'HTTP/1.1 400 ')
+    assert b'Invalid Content-Length' in response
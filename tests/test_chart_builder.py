@@ -0,0 +1,79 @@
+import os
+import sys
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators  # noqa: E402
+from chart_builder import compute_overlays, detail_history, get_detail_figures  # noqa: E402
+from config import get_config, set_config  # noqa: E402
+from data_cache import ByteLRU  # noqa: E402
+from indicators import compute_indicators  # noqa: E402
+from providers import Provider, period_slice, set_provider  # noqa: E402
+from stock_screener import compute_technicals  # noqa: E402
+from timeframes import cached_base_bars, get_bars  # noqa: E402
+
+TZ = 'America/New_York'
+
+
+def walk_bars(index, seed):
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.02, len(index))))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+                         'Close': close, 'Volume': 1_000_000.0}, index=index)
+
+
+class WalkProvider(Provider):
+    """Random-walk bars: two years of daily bars and 60 sessions of 5-minute bars."""
+
+    name = 'walk'
+
+    def __init__(self, seed=0):
+        days = pd.bdate_range(end=pd.Timestamp.now(tz=TZ).normalize(), periods=500)
+        session = pd.timedelta_range('9:30:00', '15:55:00', freq='5min')
+        intraday = pd.DatetimeIndex([day + offset for day in days[-60:] for offset in session])
+        self.bars = {'1d': walk_bars(days, seed), '5m': walk_bars(intraday, seed + 1)}
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        return period_slice(self.bars[interval], period)
+
+
+@pytest.fixture
+def walk(tmp_path, monkeypatch):
+    config = get_config()
+    set_config(replace(config, cache_dir=str(tmp_path), calendar_freshness=False))
+    set_provider(WalkProvider())
+    monkeypatch.setattr(indicators, '_store', ByteLRU(indicators.STORE_BYTES))
+    yield
+    set_provider(None)
+    set_config(config)
+
+
+def test_detail_rsi_matches_screen_with_empty_store(walk):
+    bars = get_bars('ABC', '1d')
+    screen_rsi = compute_technicals(bars, bars['Close'].iloc[-1], symbol='ABC')['rsi']
+    indicators._store.clear()
+
+    hist_3mo = period_slice(cached_base_bars('ABC', '1d'), '3mo')
+    overlays = compute_overlays(hist_3mo, 'ABC')
+
+    assert overlays.index.equals(hist_3mo.index)
+    assert overlays['rsi_14'].iloc[-1] == pytest.approx(screen_rsi, rel=1e-5)
+    # Recomputing on the displayed slice alone warms up differently
+    assert compute_indicators(hist_3mo)['rsi_14'].iloc[-1] != pytest.approx(screen_rsi, rel=1e-5)
+
+
+def test_intraday_detail_uses_scan_timeframe(walk):
+    bars = get_bars('ABC', '1h')
+    screen_rsi = compute_technicals(bars, bars['Close'].iloc[-1], symbol='ABC:1h')['rsi']
+    indicators._store.clear()
+
+    hist = detail_history('ABC', '1h')
+    figures, overlays = get_detail_figures('ABC', hist, period='1mo', timeframe='1h')
+
+    assert (hist.index.to_series().diff().dropna() < pd.Timedelta(days=1)).any()
+    assert overlays['rsi_14'].iloc[-1] == pytest.approx(screen_rsi, rel=1e-5)
+    assert 'hourly' in figures['rsi'].layout.title.text
@@ -0,0 +1,76 @@
+import os
+import pickle
+import sys
+import time
+from dataclasses import replace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_cache  # noqa: E402
+from config import get_config, set_config  # noqa: E402
+from data_cache import TTLCache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def plain_ttl():
+    config = get_config()
+    set_config(replace(config, calendar_freshness=False))
+    yield
+    set_config(config)
+
+
+def test_memory_layer_is_capped():
+    cache = TTLCache('test', 3600, max_entries=50)
+    for price in range(500):
+        cache.set(('AAPL', '1d', price), price)
+    assert len(cache) == 50
+    assert cache.get(('AAPL', '1d', 499)) == 499
+    assert cache.get(('AAPL', '1d', 0)) is None
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    monkeypatch.setattr(data_cache, 'SWEEP_EVERY', 5)
+    cache = TTLCache('test', 0.05, max_entries=100)
+    for price in range(20):
+        cache.set(('AAPL', '1d', price), price)
+    time.sleep(0.1)
+    assert cache.get(('AAPL', '1d', 0)) is None
+    assert len(cache) == 19
+    for price in range(5):
+        cache.set(('MSFT', '1d', price), price)
+    assert len(cache) == 5
+
+
+def test_max_age_refetches_without_evicting():
+    cache = TTLCache('test', 3600, max_entries=10)
+    cache.set('AAPL', 'old')
+    time.sleep(0.05)
+    assert cache.get_or_fetch('AAPL', lambda: 'new', max_age=0.01) == 'new'
+    assert cache.get_or_fetch('AAPL', lambda: 'newer') == 'new'
+
+
+
+# Pickles this process can't load: a missing global (AttributeError) and a truncated stream
+BAD_PICKLES = [b'cbuiltins\nno_such_name\n.', pickle.dumps((1.0, {'currentPrice': 1.0}))[:10]]
+
+
+@pytest.mark.parametrize('blob', BAD_PICKLES)
+def test_unreadable_file_entries_are_removed(tmp_path, blob):
+    store = data_cache.FileBackend(str(tmp_path))
+    store.set('info', 'AAPL', (time.time(), {}))
+    path = store._path('info', 'AAPL')
+    with open(path, 'wb') as f:
+        f.write(blob)
+    assert store.get('info', 'AAPL') is None
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize('blob', BAD_PICKLES)
+def test_unreadable_sqlite_entries_are_removed(tmp_path, blob):
+    store = data_cache.SQLiteBackend(str(tmp_path / 'cache.db'))
+    with store._connect() as conn:
+        conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?)", ('info', repr('AAPL'), time.time(), blob))
+    assert store.get('info', 'AAPL') is None
+    assert store._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
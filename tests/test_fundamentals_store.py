@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fundamentals_store  # noqa: E402
+from config import get_config, set_config  # noqa: E402
+from data_cache import get_cache  # noqa: E402
+from market_calendar import EXCHANGE_TZ  # noqa: E402
+from providers import CachedProvider, Provider, set_provider  # noqa: E402
+from stock_screener import fetch_info  # noqa: E402
+
+INFO = {'currentPrice': 50.0, 'forwardPE': 12.0, 'marketCap': 2e10, 'beta': 1.1,
+        'recommendationKey': 'buy', 'sector': 'Energy'}
+
+
+class InfoProvider(Provider):
+    name = 'info'
+
+    def __init__(self):
+        self.calls = 0
+
+    def info(self, symbol, max_age=None):
+        self.calls += 1
+        return dict(INFO)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    config = get_config()
+    set_config(replace(config, cache_dir=str(tmp_path), cache_duration=7 * 86400,
+                       calendar_freshness=False))
+    monkeypatch.setattr(fundamentals_store, '_buffer', [])
+    monkeypatch.setattr(fundamentals_store, '_latest', {})
+    inner = InfoProvider()
+    set_provider(CachedProvider(inner))
+    yield inner
+    set_provider(None)
+    set_config(config)
+
+
+def test_cached_info_is_dated_by_its_fetch(store):
+    fetched = time.time() - 3 * 86400
+    get_cache('info')._memory.put('ABC', (fetched, dict(INFO)))
+
+    assert fetch_info('ABC')['currentPrice'] == 50.0
+    assert fetch_info('ABC')['currentPrice'] == 50.0
+
+    assert store.calls == 0
+    days = [row['date'].date() for row in fundamentals_store._buffer]
+    assert days == [datetime.fromtimestamp(fetched, EXCHANGE_TZ).date()]
+
+
+def test_fresh_fetch_is_dated_today(store):
+    fetch_info('XYZ')
+    assert store.calls == 1
+    assert fundamentals_store._buffer[-1]['date'].date() == datetime.now(EXCHANGE_TZ).date()
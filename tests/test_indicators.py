@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators  # noqa: E402
+from data_cache import ByteLRU  # noqa: E402
+from indicators import SCREENER_SPECS, _compute, indicators_for  # noqa: E402
+
+
+def walk(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    index = pd.bdate_range('2024-01-02', periods=n, tz='America/New_York')
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': rng.uniform(1e6, 5e6, n)}, index=index)
+
+
+@pytest.fixture
+def extensions(monkeypatch):
+    monkeypatch.setattr(indicators, '_store', ByteLRU(indicators.STORE_BYTES))
+    calls = []
+    extend = indicators._extend
+
+    def spy(*args):
+        calls.append(args)
+        return extend(*args)
+
+    monkeypatch.setattr(indicators, '_extend', spy)
+    return calls
+
+
+def assert_matches(frame, expected):
+    assert frame.index.equals(expected.index)
+    assert list(frame.columns) == list(expected.columns)
+    # Stored frames are float32
+    np.testing.assert_allclose(frame.to_numpy(dtype=float), expected.to_numpy(dtype=float),
+                               rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('new_bars', [1, 7, 60])
+def test_extended_frame_equals_full_computation(extensions, new_bars):
+    hist = walk()
+    indicators_for('ABC', hist.iloc[:-new_bars - 10])
+
+    frame = indicators_for('ABC', hist.iloc[:-10])
+
+    assert len(extensions) == 1
+    assert_matches(frame, _compute(hist.iloc[:-10], SCREENER_SPECS)[0])
+    # The extension's saved RSI state carries over to the next one
+    assert_matches(indicators_for('ABC', hist), _compute(hist, SCREENER_SPECS)[0])
+    assert len(extensions) == 2
+
+
+def test_revised_last_close_is_recomputed(extensions):
+    hist = walk()
+    indicators_for('ABC', hist.iloc[:-5])
+    revised = hist.copy()
+    # The stored last bar was written mid-session and closed higher
+    revised.iloc[-6, revised.columns.get_loc('Close')] *= 1.03
+
+    frame = indicators_for('ABC', revised)
+
+    assert not extensions
+    assert_matches(frame, _compute(revised, SCREENER_SPECS)[0])
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import UsageError, load_params_file  # noqa: E402
+from screens import screen_params  # noqa: E402
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'params.yaml'
+    path.write_text(text)
+    return str(path)
+
+
+def test_params_file_values_are_coerced(tmp_path):
+    params = load_params_file(write(tmp_path, 'params:\n  rsi_min: "40"\n  consecutive_days: 2\n'
+                                              '  recommendation_filter: Buy\n  enable_finviz: no\n'))
+    assert params == {'rsi_min': 40.0, 'consecutive_days': 2, 'recommendation_filter': 'buy',
+                      'enable_finviz': False}
+
+
+@pytest.mark.parametrize('line', ['rsi_min: [40]', 'max_pe: cheap', 'max_pe: null',
+                                  'consecutive_days: 2.5', 'timeframe: 2h', 'min_price: {a: 1}'])
+def test_invalid_params_file_values_are_usage_errors(tmp_path, line):
+    with pytest.raises(UsageError):
+        load_params_file(write(tmp_path, line + '\n'))
+
+
+def test_screen_values_are_checked():
+    assert screen_params({'max_pe': '25'}, 'value')['max_pe'] == 25.0
+    with pytest.raises(ValueError, match="Screen 'value'"):
+        screen_params({'max_pe': [25]}, 'value')
@@ -0,0 +1,72 @@
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_calendar import (EXCHANGE_TZ, data_changed_since, early_closes, holidays,  # noqa: E402
+                             is_trading_day, session)
+
+
+def ts(*args):
+    return datetime(*args, tzinfo=EXCHANGE_TZ).timestamp()
+
+
+def test_new_year_on_saturday_is_not_observed():
+    assert date(2021, 12, 31) not in holidays(2021)
+    assert date(2022, 1, 1) not in holidays(2022)
+    assert is_trading_day(date(2021, 12, 31))
+    # On a Sunday it moves to Monday
+    assert holidays(2023)[date(2023, 1, 2)] == "New Year's Day"
+
+
+def test_juneteenth_from_2022():
+    assert date(2021, 6, 18) not in holidays(2021) and date(2021, 6, 21) not in holidays(2021)
+    assert holidays(2022)[date(2022, 6, 20)] == "Juneteenth"
+    assert holidays(2023)[date(2023, 6, 19)] == "Juneteenth"
+
+
+@pytest.mark.parametrize('day', [date(2023, 4, 7), date(2024, 3, 29), date(2025, 4, 18)])
+def test_good_friday(day):
+    assert holidays(day.year)[day] == "Good Friday"
+
+
+@pytest.mark.parametrize('day, name', [
+    (date(2021, 7, 5), "Independence Day"),   # Jul 4 on a Sunday
+    (date(2026, 7, 3), "Independence Day"),   # Jul 4 on a Saturday
+    (date(2021, 12, 24), "Christmas Day"),    # Dec 25 on a Saturday
+    (date(2022, 12, 26), "Christmas Day"),    # Dec 25 on a Sunday
+])
+def test_observed_shifts(day, name):
+    assert holidays(day.year)[day] == name
+
+
+def test_early_closes():
+    assert early_closes(2024) == {date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)}
+    # Dec 24 on a Sunday
+    assert early_closes(2023) == {date(2023, 7, 3), date(2023, 11, 24)}
+    # Jul 3 and Dec 24 are themselves holidays
+    assert date(2026, 7, 3) not in early_closes(2026)
+    assert date(2021, 12, 24) not in early_closes(2021)
+    assert session(date(2024, 11, 29))[1] == datetime(2024, 11, 29, 13, 0, tzinfo=EXCHANGE_TZ)
+
+
+def test_data_changed_since_across_weekend():
+    friday_settled = ts(2024, 6, 7, 16, 30)
+    assert not data_changed_since(friday_settled, now=ts(2024, 6, 8, 12, 0))
+    assert not data_changed_since(friday_settled, now=ts(2024, 6, 10, 9, 0))
+    assert data_changed_since(friday_settled, now=ts(2024, 6, 10, 9, 30))
+    # Fetched during Friday's session: the close came after it
+    assert data_changed_since(ts(2024, 6, 7, 15, 0), now=ts(2024, 6, 8, 12, 0))
+
+
+def test_data_changed_since_around_settle():
+    # Daily bars can lag the 16:00 close by up to SETTLE (20 minutes)
+    assert data_changed_since(ts(2024, 6, 7, 16, 10), now=ts(2024, 6, 7, 16, 15))
+    assert data_changed_since(ts(2024, 6, 7, 16, 10), now=ts(2024, 6, 7, 18, 0))
+    assert not data_changed_since(ts(2024, 6, 7, 16, 20), now=ts(2024, 6, 7, 18, 0))
+    # After an early close, settled 13:20
+    assert not data_changed_since(ts(2024, 11, 29, 13, 25), now=ts(2024, 11, 30, 10, 0))
+    assert data_changed_since(ts(2024, 11, 29, 13, 5), now=ts(2024, 11, 30, 10, 0))
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parameter_sweep import run_parameter_sweep  # noqa: E402
+from stock_screener import FUNDAMENTAL_FIELDS, TECHNICAL_FIELDS  # noqa: E402
+
+
+@pytest.mark.parametrize('current', [pd.DataFrame(),
+                                     pd.DataFrame(columns=FUNDAMENTAL_FIELDS + TECHNICAL_FIELDS)])
+def test_empty_panel_gives_empty_result(current):
+    results = run_parameter_sweep(current, {'max_pe': [15, 20], 'rsi_min': [30, 40]}, workers=1)
+    assert isinstance(results, pd.DataFrame) and results.empty
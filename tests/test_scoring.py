@@ -0,0 +1,74 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scoring import criterion_scores, score_table, top_k  # noqa: E402
+from sector_metrics import add_sector_metrics  # noqa: E402
+from stock_screener import DEFAULT_PARAMS  # noqa: E402
+
+
+def metrics_table(n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(10, 400, n)
+    return pd.DataFrame({
+        'fwd_pe': rng.uniform(3, 45, n), 'price': price, 'market_cap': rng.uniform(1e9, 1e12, n),
+        'beta': rng.uniform(0.3, 2.2, n), 'rec': rng.choice(['strong_buy', 'buy', 'hold'], n),
+        'sector': 'Technology', 'return_5d': rng.normal(0, 0.05, n),
+        'ma50': price * rng.uniform(0.9, 1.1, n), 'ma200': price * rng.uniform(0.8, 1.2, n),
+        'rsi': rng.uniform(20, 80, n), 'avg_volume': rng.uniform(1e5, 3e7, n),
+        'up_streak': rng.integers(0, 6, n), 'near_upper': rng.random(n) < 0.2,
+        'stop_loss': price * 0.93, 'finviz_ok': True,
+    }, index=[f"T{i:02d}" for i in range(n)])
+
+
+def params(**overrides):
+    return dict(DEFAULT_PARAMS, enable_finviz=False, **overrides)
+
+
+def test_threshold_at_margin_scores_half():
+    table = metrics_table()
+    scores = criterion_scores(table, params(max_pe=float(table['fwd_pe'].iloc[0])))
+    assert abs(scores['fwd_pe'].iloc[0] - 0.5) < 1e-9
+    passing = table['fwd_pe'] < table['fwd_pe'].iloc[0]
+    assert (scores.loc[passing, 'fwd_pe'] > 0.5).all()
+    assert (scores.loc[~passing, 'fwd_pe'] <= 0.5).all()
+
+
+def test_moving_a_threshold_changes_the_ranking():
+    table = metrics_table()
+    weights = {'fwd_pe': 1.0, 'volume': 1.0}
+    weights.update({name: 0.0 for name in ('price', 'market_cap', 'beta', 'recommendation',
+                                           'return_5d', 'moving_averages', 'rsi')})
+    loose = score_table(table, params(max_pe=40), weights)
+    strict = score_table(table, params(max_pe=5), weights)
+    assert not np.allclose(loose, strict)
+    assert list(top_k(loose, 10)) != list(top_k(strict, 10))
+
+    no_volume = score_table(table, params(min_volume=1e9), weights)
+    assert (no_volume < score_table(table, params(min_volume=1e5), weights)).all()
+
+
+def test_top_k_keeps_universe_order_for_ties_at_the_cut():
+    scores = np.array([1.0, 3.0, 2.0, 2.0, 2.0, np.nan, 2.0])
+    assert list(top_k(scores, 3)) == [1, 2, 3]
+    assert list(top_k(scores, 10)) == [1, 2, 3, 4, 6, 0, 5]
+
+
+def test_sector_bounds_are_scored():
+    metrics = add_sector_metrics(metrics_table().assign(
+        sector=['Technology', 'Energy'] * 20))
+    plain = criterion_scores(metrics, params())
+    assert 'sector_pe' not in plain.columns
+
+    scores = criterion_scores(metrics, params(max_sector_pe_pct=50, min_sector_rs=0.0))
+    assert {'sector_pe', 'sector_strength'} <= set(scores.columns)
+    cheap = metrics['pe_sector_pct'] <= 50
+    assert (scores.loc[cheap, 'sector_pe'] >= 0.5).all()
+    assert (scores.loc[~cheap, 'sector_pe'] < 0.5).all()
+    # Tightening the sector bound lowers the scores on it
+    tighter = criterion_scores(metrics, params(max_sector_pe_pct=25, min_sector_rs=0.0))
+    assert (tighter['sector_pe'] < scores['sector_pe']).all()
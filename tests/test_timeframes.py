@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_config, set_config  # noqa: E402
+from providers import Provider, set_provider  # noqa: E402
+from timeframes import load_base_bars, write_stored_bars  # noqa: E402
+from validation import validate_bars  # noqa: E402
+
+TZ = 'America/New_York'
+
+
+def daily_bars(index, close, splits=None):
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': 1_000_000.0, 'Dividends': 0.0,
+                         'Stock Splits': 0.0 if splits is None else splits}, index=index)
+
+
+class SplitProvider(Provider):
+    """Upstream after a 2:1 split on split_day: every bar before it is halved."""
+
+    name = 'split'
+
+    def __init__(self, index, split_day):
+        self.index = index
+        self.split_day = split_day
+        self.periods = []
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        self.periods.append(period)
+        index = self.index if period == '2y' else self.index[-21:]
+        splits = np.where(index == self.split_day, 2.0, 0.0)
+        return daily_bars(index, np.full(len(index), 50.0), splits)
+
+
+@pytest.fixture
+def store(tmp_path):
+    config = get_config()
+    set_config(replace(config, cache_dir=str(tmp_path), calendar_freshness=False))
+    yield str(tmp_path / 'bars')
+    set_config(config)
+    set_provider(None)
+
+
+@pytest.mark.parametrize('split_offset', [5, 15])
+def test_refresh_after_split_downloads_full_history(store, split_offset):
+    index = pd.bdate_range(end=pd.Timestamp.now(tz=TZ).normalize(), periods=500)
+    # Stored before the split (unadjusted, 100), last refreshed 10 bars ago
+    stored_index = index[:-10]
+    write_stored_bars('ABC', '1d', daily_bars(stored_index, np.full(len(stored_index), 100.0)),
+                      store_dir=store)
+    os.utime(os.path.join(store, '1d', 'ABC.pkl.gz'), (time.time() - 86400, time.time() - 86400))
+    # The split is either newer than the store or inside the refresh overlap
+    provider = SplitProvider(index, index[-split_offset])
+    set_provider(provider)
+
+    bars = load_base_bars('ABC', '1d', store_dir=store, max_age=0)
+
+    assert provider.periods == ['1mo', '2y']
+    assert np.allclose(bars['Close'], 50.0)
+    _, issues = validate_bars(bars)
+    assert not [issue for issue in issues if issue.code in ('possible_split', 'price_jump')]
+
+
+def test_matching_refresh_is_merged(store):
+    index = pd.bdate_range(end=pd.Timestamp.now(tz=TZ).normalize(), periods=500)
+    write_stored_bars('ABC', '1d', daily_bars(index[:-10], np.full(490, 50.0)), store_dir=store)
+    os.utime(os.path.join(store, '1d', 'ABC.pkl.gz'), (time.time() - 86400, time.time() - 86400))
+    provider = SplitProvider(index, None)
+    set_provider(provider)
+
+    bars = load_base_bars('ABC', '1d', store_dir=store, max_age=0)
+
+    assert provider.periods == ['1mo']
+    assert len(bars) == 500
+
+
+class EmptyProvider(Provider):
+    """Upstream failing the way yfinance does: an empty frame."""
+
+    name = 'empty'
+
+    def history(self, symbol, period='6mo', interval='1d'):
+        return pd.DataFrame()
+
+
+def test_empty_refresh_leaves_store_due(store):
+    index = pd.bdate_range(end=pd.Timestamp.now(tz=TZ).normalize(), periods=490)
+    write_stored_bars('ABC', '1d', daily_bars(index, np.full(490, 50.0)), store_dir=store)
+    path = os.path.join(store, '1d', 'ABC.pkl.gz')
+    checked = time.time() - 86400
+    os.utime(path, (checked, checked))
+    set_provider(EmptyProvider())
+
+    bars = load_base_bars('ABC', '1d', store_dir=store, max_age=0)
+
+    assert len(bars) == 490
+    assert os.path.getmtime(path) == pytest.approx(checked)
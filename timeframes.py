@@ -0,0 +1,285 @@
+"""
+Timeframes for screening and a local bar store.
+
+Each timeframe is derived from a base resolution that is stored on disk per
+ticker: intraday screens (5m/15m/1h) all read cached 5-minute bars and
+resample them, so switching from 15m to 1h costs no extra download. Stored
+bars younger than CACHE_DURATION, or checked since the last session closed
+(see market_calendar), are used as-is; otherwise a refresh only fetches the
+bars newer than what's stored, unless those come back re-adjusted (a new
+split, or closes that no longer match the stored ones), in which case the
+full history is downloaded again. Concurrent loads of the same
+ticker (several sessions screening at once) share one fetch, and recently
+used histories stay in memory, compacted, within HISTORY_CACHE_BYTES.
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import get_config
+from data_cache import ByteLRU, SingleFlight, compact_frame
+from market_calendar import still_current
+from providers import get_provider
+from validation import is_quarantined, record_issues, validate_bars
+
+# timeframe -> base interval, resample rule, lookback used for screening
+TIMEFRAMES = {
+    '1d': {'base': '1d', 'rule': None, 'lookback': pd.DateOffset(months=6)},
+    '1h': {'base': '5m', 'rule': '1h', 'lookback': pd.Timedelta(days=60)},
+    '15m': {'base': '5m', 'rule': '15min', 'lookback': pd.Timedelta(days=60)},
+    '5m': {'base': '5m', 'rule': None, 'lookback': pd.Timedelta(days=60)},
+}
+
+# base interval -> full download period, incremental period, retention
+BASE_INTERVALS = {
+    '1d': {'period': '2y', 'refresh': '1mo', 'refresh_within': pd.Timedelta(days=25),
+           'retention': pd.DateOffset(years=2)},
+    '5m': {'period': '60d', 'refresh': '5d', 'refresh_within': pd.Timedelta(days=4),
+           'retention': pd.Timedelta(days=120)},
+}
+
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+# Relative close difference on overlapping bars that means history was re-adjusted
+REBASE_TOLERANCE = 0.03
+
+_bar_flights = SingleFlight()
+_bar_memory = None
+
+
+def series_key(symbol, timeframe='1d'):
+    """Key identifying a ticker's series at a timeframe (daily keeps the bare symbol)."""
+    return symbol if timeframe == '1d' else f"{symbol}:{timeframe}"
+
+
+def _store_path(symbol, base, store_dir):
+    return os.path.join(store_dir or get_config().bar_store_dir, base, f"{symbol}.pkl.gz")
+
+
+def read_stored_bars(symbol, base, store_dir=None):
+    """
+    Read a ticker's stored base bars
+
+    Returns:
+        DataFrame or None: Stored bars, or None if nothing is stored
+    """
+    path = _store_path(symbol, base, store_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path, compression='gzip')
+    except Exception as e:
+        print(f"Discarding unreadable bar store for {symbol} ({base}): {e}")
+        return None
+
+
+def write_stored_bars(symbol, base, bars, store_dir=None):
+    """Atomically replace a ticker's stored base bars."""
+    path = _store_path(symbol, base, store_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    bars.to_pickle(tmp, compression='gzip')
+    os.replace(tmp, path)
+
+
+def merge_bars(stored, fresh):
+    """Append fresh bars to stored ones, newer rows winning on overlap."""
+    if stored is None or stored.empty:
+        return fresh
+    if fresh is None or fresh.empty:
+        return stored
+    merged = pd.concat([stored, fresh])
+    merged = merged[~merged.index.duplicated(keep='last')]
+    return merged.sort_index()
+
+
+def needs_rebase(stored, fresh):
+    """
+    Whether an incremental refresh no longer lines up with the stored bars
+
+    Upstream histories are split-adjusted, so after a split every earlier
+    bar changes: a refresh then reports the split on a bar newer than the
+    store, or (when the split falls inside the overlap) its closes disagree
+    with the stored closes. Merging would leave a split-sized step at the
+    merge boundary. The stored last bar is not compared, as it may have been
+    written mid-session.
+    """
+    if stored is None or stored.empty or fresh is None or fresh.empty:
+        return False
+    if 'Stock Splits' in fresh.columns:
+        splits = fresh['Stock Splits'].to_numpy(dtype=float)
+        if (np.nan_to_num(splits[fresh.index > stored.index[-1]]) > 0).any():
+            return True
+    common = stored.index[:-1].intersection(fresh.index)
+    if common.empty:
+        return False
+    old = stored.loc[common, 'Close'].to_numpy(dtype=float)
+    new = fresh.loc[common, 'Close'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deviation = np.abs(new / old - 1)
+    return bool((deviation > REBASE_TOLERANCE).any())
+
+
+def _max_age(max_age):
+    return get_config().cache_duration if max_age is None else max_age
+
+
+def load_base_bars(symbol, base, store_dir=None, max_age=None):
+    """
+    Return up-to-date base bars for a ticker, fetching only what's missing
+
+    Args:
+        symbol (str): Stock ticker symbol
+        base (str): Base interval ('1d' or '5m')
+        store_dir (str): Bar store directory (defaults to CACHE_DIR/bars)
+        max_age (float): Seconds stored bars are served without a request
+            (defaults to CACHE_DURATION); outside trading sessions they are
+            served as long as nothing has traded since they were checked
+
+    Returns:
+        DataFrame: OHLCV bars, oldest first
+    """
+    spec = BASE_INTERVALS[base]
+    stored = read_stored_bars(symbol, base, store_dir)
+
+    # Bars written (or checked) within max_age, or since which no session
+    # has traded, are served without a request
+    if stored is not None and len(stored):
+        try:
+            written = os.path.getmtime(_store_path(symbol, base, store_dir))
+            if still_current(written, _max_age(max_age)):
+                return stored
+        except OSError:
+            pass
+
+    period = spec['period']
+    if stored is not None and len(stored):
+        age = pd.Timestamp.now(tz=stored.index.tz) - stored.index[-1]
+        if age < spec['refresh_within']:
+            period = spec['refresh']
+
+    fresh = get_provider().history(symbol, period=period, interval=base)
+    if period != spec['period'] and needs_rebase(stored, fresh):
+        print(f"History of {symbol} ({base}) was re-adjusted upstream; downloading it again")
+        stored = None
+        fresh = get_provider().history(symbol, period=spec['period'], interval=base)
+    bars = merge_bars(stored, fresh)
+    if bars is None or bars.empty:
+        return pd.DataFrame(columns=list(OHLCV_AGG))
+
+    bars = bars[bars.index >= bars.index[-1] - spec['retention']]
+    if fresh is None or fresh.empty:
+        # A refresh always covers the last stored bar, so an empty response is
+        # a failed request (yfinance returns one on errors and throttling):
+        # serve the stored bars but leave them due for a refresh
+        print(f"Refresh of {symbol} ({base}) returned no bars; serving the stored ones")
+        return bars
+    try:
+        write_stored_bars(symbol, base, bars, store_dir)
+    except OSError as e:
+        print(f"Could not store bars for {symbol} ({base}): {e}")
+    return bars
+
+
+def _memory_store():
+    """Process-wide history LRU (rebuilt if the configuration is replaced)."""
+    global _bar_memory
+    config = get_config()
+    if _bar_memory is None or _bar_memory[0] is not config:
+        _bar_memory = (config, ByteLRU(config.history_cache_bytes))
+    return _bar_memory[1]
+
+
+def cached_base_bars(symbol, base, store_dir=None, max_age=None):
+    """
+    load_base_bars through the in-memory history LRU
+
+    Histories are kept as compact frames stamped with the time they were
+    stored, and served from memory while that is within max_age (defaults
+    to CACHE_DURATION). Each loaded snapshot is validated and repaired once
+    (see validation.py); quarantined tickers get no bars.
+    """
+    memory = _memory_store()
+    key = (symbol, base, store_dir)
+    entry = memory.get(key)
+    if entry is not None and still_current(entry[0], _max_age(max_age)):
+        return entry[1]
+
+    def load():
+        bars, issues = validate_bars(load_base_bars(symbol, base, store_dir=store_dir, max_age=max_age),
+                                     base)
+        record_issues(symbol, f'bars:{base}', issues)
+        if is_quarantined(issues):
+            bars = bars.iloc[:0]
+        bars = compact_frame(bars)
+        try:
+            stamp = os.path.getmtime(_store_path(symbol, base, store_dir))
+        except OSError:
+            stamp = time.time()
+        memory.put(key, (stamp, bars))
+        return bars
+
+    return _bar_flights.do(key, load)
+
+
+def resample_ohlcv(bars, rule):
+    """
+    Resample OHLCV bars to a coarser interval
+
+    Hourly bins are aligned to the 9:30 session open rather than the top of
+    the hour, and bins without trades are dropped.
+
+    Args:
+        bars (DataFrame): OHLCV bars
+        rule (str): pandas offset alias (e.g. '15min', '1h')
+
+    Returns:
+        DataFrame: Resampled bars
+    """
+    if rule is None or bars.empty:
+        return bars
+    offset = '30min' if pd.Timedelta(rule) >= pd.Timedelta('1h') else None
+    agg = {col: how for col, how in OHLCV_AGG.items() if col in bars.columns}
+    out = bars.resample(rule, offset=offset, label='left', closed='left').agg(agg)
+    return out.dropna(subset=['Close'])
+
+
+def slice_bars(bars, timeframe):
+    """
+    Cut base bars to a timeframe's lookback and resample them to its bar size
+
+    Args:
+        bars (DataFrame): Base bars from load_base_bars/cached_base_bars
+        timeframe (str): One of TIMEFRAMES
+
+    Returns:
+        DataFrame: OHLCV bars covering the timeframe's lookback
+    """
+    tf = TIMEFRAMES[timeframe]
+    if bars.empty:
+        return bars
+    bars = bars[bars.index > bars.index[-1] - tf['lookback']]
+    return resample_ohlcv(bars, tf['rule'])
+
+
+def get_bars(symbol, timeframe='1d', store_dir=None, max_age=None):
+    """
+    Bars for screening a ticker at a timeframe
+
+    Args:
+        symbol (str): Stock ticker symbol
+        timeframe (str): One of TIMEFRAMES
+        store_dir (str): Bar store directory (defaults to CACHE_DIR/bars)
+        max_age (float): Seconds cached bars are used without a refresh
+            (defaults to CACHE_DURATION)
+
+    Returns:
+        DataFrame: OHLCV bars covering the timeframe's lookback
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe '{timeframe}' (expected one of {', '.join(TIMEFRAMES)})")
+    bars = cached_base_bars(symbol, TIMEFRAMES[timeframe]['base'], store_dir=store_dir,
+                            max_age=max_age)
+    return slice_bars(bars, timeframe)
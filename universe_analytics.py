@@ -0,0 +1,258 @@
+"""
+Universe-level analytics over the stored daily price panel.
+
+The bar store already holds two years of daily bars per ticker; these
+helpers align the closes of many tickers into one panel and compute, with
+matrix operations instead of per-pair loops:
+
+    relative_strength   rolling return of each ticker over the index proxy's
+    correlation_matrix  pairwise return correlations (NaN-aware, blocked)
+    price_beta          beta against the index proxy from returns, not info['beta']
+    redundant_pairs     highly correlated pairs among a set of picks
+
+Missing bars are handled with pairwise-complete statistics: every pair uses
+the days both tickers traded. Results are cached per panel snapshot, so a
+500x500 correlation over a year of returns is computed once per scan.
+"""
+import hashlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import get_config
+from data_cache import ByteLRU
+from timeframes import cached_base_bars
+
+INDEX_PROXY = 'SPY'
+PANEL_DAYS = 252
+RS_WINDOW = 63
+CORR_BLOCK = 512
+MIN_OVERLAP = 20
+CACHE_BYTES = 64 * 1024 * 1024
+
+_cache = ByteLRU(CACHE_BYTES)
+
+
+def _frame_key(name, *frames):
+    """Cache key for a computation over the exact contents of some frames/series."""
+    digest = hashlib.sha1(name.encode())
+    for frame in frames:
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+        if isinstance(frame, pd.DataFrame):
+            digest.update('\0'.join(map(str, frame.columns)).encode())
+    return digest.hexdigest()
+
+
+def price_panel(symbols, days=PANEL_DAYS, workers=None):
+    """
+    Aligned daily closes for a set of tickers from the bar store
+
+    Args:
+        symbols (list): Ticker symbols
+        days (int): Most recent trading days to keep
+        workers (int): Tickers loaded concurrently (defaults to SCREENER_WORKERS)
+
+    Returns:
+        DataFrame: Dates x tickers of closes (NaN where a ticker has no bar);
+        tickers whose bars can't be loaded are left out
+    """
+    def load(symbol):
+        try:
+            bars = cached_base_bars(symbol, '1d')
+        except Exception as e:
+            print(f"Price panel: no bars for {symbol}: {e}", file=sys.stderr)
+            return None
+        return bars['Close'] if bars is not None and len(bars) else None
+
+    symbols = list(dict.fromkeys(symbols))
+    with ThreadPoolExecutor(max_workers=workers or get_config().workers) as pool:
+        closes = dict(zip(symbols, pool.map(load, symbols)))
+    closes = {symbol: close for symbol, close in closes.items() if close is not None}
+    if not closes:
+        return pd.DataFrame()
+    panel = pd.concat(closes, axis=1).sort_index()
+    return panel.iloc[-days:].astype(float)
+
+
+def returns_panel(panel):
+    """Daily simple returns of a price panel (first row dropped)."""
+    return panel.pct_change(fill_method=None).iloc[1:]
+
+
+def index_returns(panel, index_symbol=INDEX_PROXY):
+    """
+    Returns of the index proxy
+
+    Uses index_symbol's column if the panel has it, else the equal-weighted
+    mean return of the panel.
+    """
+    returns = returns_panel(panel)
+    if index_symbol in returns.columns:
+        return returns[index_symbol]
+    return returns.mean(axis=1).rename('equal_weight')
+
+
+def relative_strength(panel, index_symbol=INDEX_PROXY, window=RS_WINDOW):
+    """
+    Rolling relative strength of every ticker against the index proxy
+
+    Args:
+        panel (DataFrame): Price panel from price_panel
+        index_symbol (str): Column used as the index (equal-weighted panel if absent)
+        window (int): Trading days per return
+
+    Returns:
+        DataFrame: (1 + ticker return) / (1 + index return) - 1 over each
+        trailing window; positive values mean outperformance
+    """
+    key = _frame_key(f"rs:{index_symbol}:{window}", panel)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    growth = panel / panel.shift(window)
+    if index_symbol in panel.columns:
+        index_growth = growth[index_symbol]
+    else:
+        log_growth = np.log1p(index_returns(panel, index_symbol)).rolling(window).sum()
+        index_growth = np.exp(log_growth).reindex(panel.index)
+    rs = growth.div(index_growth, axis=0) - 1
+    _cache.put(key, rs)
+    return rs
+
+
+def _pairwise_moments(x, mask, y, y_mask):
+    """Pairwise-complete counts, sums and cross products between column blocks."""
+    n = mask.T @ y_mask
+    sx = x.T @ y_mask
+    sy = mask.T @ y
+    sxx = (x * x).T @ y_mask
+    syy = mask.T @ (y * y)
+    sxy = x.T @ y
+    return n, sx, sy, sxx, syy, sxy
+
+
+def correlation_matrix(returns, min_overlap=MIN_OVERLAP, block=CORR_BLOCK):
+    """
+    Pairwise return correlations
+
+    Each pair uses the days both tickers have a return, computed as a few
+    matrix products per block of columns (equivalent to
+    DataFrame.corr(min_periods=min_overlap), without the per-pair loop).
+
+    Args:
+        returns (DataFrame): Dates x tickers of returns
+        min_overlap (int): Fewer common days than this gives NaN
+        block (int): Columns per block, bounding the temporaries
+
+    Returns:
+        DataFrame: Tickers x tickers correlation matrix
+    """
+    key = _frame_key(f"corr:{min_overlap}", returns)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    values = returns.to_numpy(dtype=np.float64)
+    mask = np.isfinite(values).astype(np.float64)
+    x = np.where(mask > 0, values, 0.0)
+    cols = values.shape[1]
+    corr = np.empty((cols, cols))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, cols, block):
+            stop = min(start + block, cols)
+            n, sx, sy, sxx, syy, sxy = _pairwise_moments(x[:, start:stop], mask[:, start:stop], x, mask)
+            cov = n * sxy - sx * sy
+            var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+            block_corr = cov / np.sqrt(var)
+            block_corr[n < min_overlap] = np.nan
+            corr[start:stop] = np.clip(block_corr, -1.0, 1.0)
+    result = pd.DataFrame(corr, index=returns.columns, columns=returns.columns)
+    _cache.put(key, result)
+    return result
+
+
+def price_beta(returns, benchmark, min_overlap=MIN_OVERLAP):
+    """
+    Beta of every ticker against a benchmark return series
+
+    Args:
+        returns (DataFrame): Dates x tickers of returns
+        benchmark (Series): Benchmark returns on the same dates
+        min_overlap (int): Fewer common days than this gives NaN
+
+    Returns:
+        Series: cov(ticker, benchmark) / var(benchmark) per ticker, over the
+        days both have a return
+    """
+    key = _frame_key(f"beta:{min_overlap}", returns, benchmark)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    values = returns.to_numpy(dtype=np.float64)
+    bench = benchmark.reindex(returns.index).to_numpy(dtype=np.float64)[:, None]
+    both = (np.isfinite(values) & np.isfinite(bench)).astype(np.float64)
+    x = np.where(both > 0, values, 0.0)
+    b = np.where(both > 0, bench, 0.0)
+    n = both.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (x * b).sum(axis=0) - x.sum(axis=0) * b.sum(axis=0) / n
+        var = (b * b).sum(axis=0) - b.sum(axis=0) ** 2 / n
+        beta = np.where(n >= min_overlap, cov / var, np.nan)
+    result = pd.Series(beta, index=returns.columns)
+    _cache.put(key, result)
+    return result
+
+
+def redundant_pairs(corr, threshold=0.9):
+    """
+    Pairs of tickers whose returns move almost together
+
+    Args:
+        corr (DataFrame): Correlation matrix from correlation_matrix
+        threshold (float): Minimum correlation to report
+
+    Returns:
+        DataFrame: Columns Ticker A, Ticker B, Correlation; strongest first
+    """
+    values = corr.to_numpy()
+    i, j = np.triu_indices(len(values), k=1)
+    picked = np.nan_to_num(values[i, j], nan=-np.inf) >= threshold
+    pairs = pd.DataFrame({
+        'Ticker A': corr.index[i[picked]],
+        'Ticker B': corr.columns[j[picked]],
+        'Correlation': values[i[picked], j[picked]],
+    })
+    return pairs.sort_values('Correlation', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def universe_analytics(symbols, index_symbol=INDEX_PROXY, days=PANEL_DAYS, window=RS_WINDOW):
+    """
+    Relative strength, correlations and price-derived beta for a set of tickers
+
+    Args:
+        symbols (list): Tickers to analyze (e.g. screen results)
+        index_symbol (str): Index proxy loaded alongside the tickers
+        days (int): Trading days in the panel
+        window (int): Relative-strength window in trading days
+
+    Returns:
+        dict: 'panel' (closes), 'relative_strength' (latest value per ticker),
+        'correlation' (matrix), 'beta' (Series); empty frames if no bars load
+    """
+    panel = price_panel(list(symbols) + [index_symbol], days=days)
+    tickers = [symbol for symbol in symbols if symbol in panel.columns]
+    if not tickers:
+        empty = pd.Series(dtype=float)
+        return {'panel': panel, 'relative_strength': empty,
+                'correlation': pd.DataFrame(), 'beta': empty}
+    returns = returns_panel(panel)
+    rs = relative_strength(panel, index_symbol, window)
+    return {
+        'panel': panel[tickers],
+        'relative_strength': rs[tickers].iloc[-1],
+        'correlation': correlation_matrix(returns[tickers]),
+        'beta': price_beta(returns[tickers], index_returns(panel, index_symbol)),
+    }
@@ -0,0 +1,242 @@
+"""
+Data quality checks for fetched bars and quotes.
+
+Bars are validated once per snapshot, when a history is loaded into the
+in-memory bar cache (see timeframes.cached_base_bars), with array
+operations over the whole history:
+
+    bad_rows        bars with a missing or non-positive close (dropped)
+    ohlc_fixed      high/low inconsistent with open/close (widened)
+    split_adjusted  a reported split the prices weren't adjusted for, e.g.
+                    stored pre-split bars merged with a post-split refresh
+                    (earlier bars back-adjusted)
+    possible_split  a jump by a split ratio with no split reported (flagged)
+    price_jump      other one-bar moves above JUMP_THRESHOLD (kept, flagged)
+    gaps            daily bars more than MAX_GAP_DAYS calendar days apart
+    zero_volume     most recent bars without volume (quarantined)
+    stale_quote     currentPrice far from the last close (quarantined)
+
+Repairs are applied to the bars the indicators see. Quarantined tickers get
+no bars or technicals, so they fail screening instead of passing on bad
+data; their reasons are recorded per ticker and collected into a RunReport.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+SPLIT_RATIOS = np.array([2, 3, 4, 5, 8, 10, 15, 20, 1.5])
+SPLIT_TOLERANCE = 0.03
+JUMP_THRESHOLD = 0.5
+MAX_GAP_DAYS = 6
+BAD_ROW_LIMIT = 0.05
+ZERO_VOLUME_WINDOW = 30
+ZERO_VOLUME_LIMIT = 0.5
+STALE_QUOTE_LIMIT = 0.25
+
+_issues = {}
+_issues_lock = threading.Lock()
+
+
+class Issue:
+    """One data problem found for a ticker."""
+
+    __slots__ = ('code', 'detail', 'fatal')
+
+    def __init__(self, code, detail, fatal=False):
+        self.code = code
+        self.detail = detail
+        self.fatal = fatal
+
+    def __repr__(self):
+        return f"Issue({self.code!r}, {self.detail!r}, fatal={self.fatal})"
+
+    def __str__(self):
+        return f"{self.code}: {self.detail}"
+
+
+def _split_factors(close, split_col):
+    """
+    Back-adjustment factor per bar for unadjusted splits in a close series
+
+    A split is only adjusted when the bars' own 'Stock Splits' column reports
+    it on the bar where the price jumps by the inverse ratio; a jump that
+    merely looks like a split (a crash can halve a price too) is counted but
+    left alone.
+
+    Returns:
+        tuple: (factor array, splits adjusted, split-like jumps left alone)
+    """
+    ratio = close[1:] / close[:-1]
+    # A 2:1 split halves the price (ratio 1/2), a 1:2 reverse split doubles it
+    reported = split_col[1:]
+    with np.errstate(invalid='ignore'):
+        splits = (reported > 0) & (np.abs(ratio * reported - 1) < SPLIT_TOLERANCE)
+        looks_like = (np.abs(ratio[:, None] * SPLIT_RATIOS - 1) < SPLIT_TOLERANCE).any(axis=1)
+        looks_like |= (np.abs(ratio[:, None] / SPLIT_RATIOS - 1) < SPLIT_TOLERANCE).any(axis=1)
+    unconfirmed = int((looks_like & ~splits).sum())
+    if not splits.any():
+        return None, 0, unconfirmed
+
+    step = np.ones(len(close))
+    step[:-1][splits] = 1 / reported[splits]
+    # Bars before each split are scaled by the product of later split ratios
+    factors = np.cumprod(step[::-1])[::-1]
+    return factors, int(splits.sum()), unconfirmed
+
+
+def validate_bars(bars, base='1d'):
+    """
+    Check and repair a ticker's base bars
+
+    Args:
+        bars (DataFrame): OHLCV bars, oldest first
+        base (str): Base interval ('1d' or '5m')
+
+    Returns:
+        tuple: (repaired bars, list of Issue)
+    """
+    issues = []
+    if bars is None or bars.empty:
+        return bars, issues
+
+    close = bars['Close'].to_numpy(dtype=float)
+    bad = ~np.isfinite(close) | (close <= 0)
+    if bad.any():
+        share = bad.mean()
+        issues.append(Issue('bad_rows', f"{int(bad.sum())} bar(s) without a valid close",
+                            fatal=share > BAD_ROW_LIMIT))
+        bars = bars[~bad]
+        close = close[~bad]
+        if bars.empty:
+            return bars, issues
+
+    prices = bars[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float)
+    high = np.fmax(prices[:, 1], np.nanmax(prices, axis=1))
+    low = np.fmin(prices[:, 2], np.nanmin(prices, axis=1))
+    inconsistent = (high != prices[:, 1]) | (low != prices[:, 2])
+    if inconsistent.any():
+        issues.append(Issue('ohlc_fixed', f"{int(inconsistent.sum())} bar(s) with high/low outside open/close"))
+        bars = bars.assign(High=high, Low=low)
+
+    if len(close) > 1:
+        split_col = (bars['Stock Splits'].to_numpy(dtype=float) if 'Stock Splits' in bars.columns
+                     else np.zeros(len(close)))
+        factors, splits, unconfirmed = _split_factors(close, split_col)
+        if unconfirmed:
+            issues.append(Issue('possible_split', f"{unconfirmed} jump(s) matching a split ratio "
+                                                  "with no split reported"))
+        if splits:
+            issues.append(Issue('split_adjusted', f"{splits} unadjusted split(s) back-adjusted"))
+            adjusted = {col: bars[col].to_numpy(dtype=float) * factors for col in ('Open', 'High', 'Low', 'Close')}
+            adjusted['Volume'] = bars['Volume'].to_numpy(dtype=float) / factors
+            bars = bars.assign(**adjusted)
+            close = adjusted['Close']
+
+        moves = np.abs(close[1:] / close[:-1] - 1)
+        jumps = int((moves > JUMP_THRESHOLD).sum())
+        if jumps:
+            issues.append(Issue('price_jump', f"{jumps} one-bar move(s) above {JUMP_THRESHOLD:.0%}"))
+
+        if base == '1d':
+            gap_days = np.diff(bars.index.asi8) / 86_400e9
+            gaps = int((gap_days > MAX_GAP_DAYS).sum())
+            if gaps:
+                issues.append(Issue('gaps', f"{gaps} gap(s) longer than {MAX_GAP_DAYS} days"))
+
+    volume = bars['Volume'].to_numpy(dtype=float)[-ZERO_VOLUME_WINDOW:]
+    zero = np.nan_to_num(volume) <= 0
+    if len(volume) >= ZERO_VOLUME_WINDOW // 2 and zero.mean() >= ZERO_VOLUME_LIMIT:
+        issues.append(Issue('zero_volume', f"{int(zero.sum())} of the last {len(volume)} bars without volume",
+                            fatal=True))
+    return bars, issues
+
+
+def quote_issues(price, bars):
+    """Issues with a quoted price given the ticker's bars (stale or mismatched quote)."""
+    if not price or bars is None or bars.empty:
+        return []
+    last = float(bars['Close'].iloc[-1])
+    deviation = abs(price / last - 1) if last > 0 else np.inf
+    if deviation > STALE_QUOTE_LIMIT:
+        return [Issue('stale_quote', f"price {price:.2f} is {deviation:.0%} away from the last close "
+                                     f"{last:.2f}", fatal=True)]
+    return []
+
+
+def record_issues(symbol, source, issues):
+    """Remember the issues a check found for a ticker (replacing that check's earlier ones)."""
+    with _issues_lock:
+        if issues:
+            _issues.setdefault(symbol, {})[source] = list(issues)
+        elif symbol in _issues:
+            _issues[symbol].pop(source, None)
+            if not _issues[symbol]:
+                del _issues[symbol]
+
+
+def issues_for(symbol):
+    """Every recorded issue for a ticker."""
+    with _issues_lock:
+        return [issue for issues in _issues.get(symbol, {}).values() for issue in issues]
+
+
+def is_quarantined(issues):
+    return any(issue.fatal for issue in issues)
+
+
+def check_quote(symbol, price, bars):
+    """
+    Validate a quote against the bars and record the result
+
+    Returns:
+        bool: False if the ticker is quarantined for its quote
+    """
+    issues = quote_issues(price, bars)
+    record_issues(symbol, 'quote', issues)
+    return not is_quarantined(issues)
+
+
+class RunReport:
+    """Data quality outcome of a scan: quarantined, repaired and skipped tickers."""
+
+    def __init__(self):
+        self.scanned = 0
+        self.skipped = []
+        self.issues = {}
+
+    def collect(self, tickers, skipped=()):
+        """Gather the recorded issues of the scanned tickers."""
+        self.scanned = len(tickers)
+        self.skipped = list(skipped)
+        self.issues = {}
+        for symbol in tickers:
+            issues = issues_for(symbol)
+            if issues:
+                self.issues[symbol] = issues
+
+    @property
+    def quarantined(self):
+        return sorted(symbol for symbol, issues in self.issues.items() if is_quarantined(issues))
+
+    @property
+    def flagged(self):
+        return sorted(symbol for symbol, issues in self.issues.items() if not is_quarantined(issues))
+
+    def summary(self):
+        text = (f"Data quality: {self.scanned} tickers scanned, {len(self.quarantined)} quarantined, "
+                f"{len(self.flagged)} flagged or repaired")
+        if self.skipped:
+            text += f", {len(self.skipped)} skipped (throttled)"
+        return text
+
+    def to_frame(self):
+        """One row per affected ticker: Ticker, Status, Reasons."""
+        rows = [{'Ticker': symbol,
+                 'Status': 'quarantined' if is_quarantined(issues) else 'flagged',
+                 'Reasons': '; '.join(map(str, issues))}
+                for symbol, issues in self.issues.items()]
+        rows += [{'Ticker': symbol, 'Status': 'skipped', 'Reasons': 'throttled'}
+                 for symbol in self.skipped]
+        frame = pd.DataFrame(rows, columns=['Ticker', 'Status', 'Reasons'])
+        return frame.sort_values(['Status', 'Ticker'], kind='stable').reset_index(drop=True)
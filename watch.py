@@ -0,0 +1,335 @@
+"""
+Watch mode: alerts when tickers enter or leave saved screens.
+
+A long-lived process polls the universe once per interval. Each ticker's
+base bars are refreshed once per poll and shared by every screen and
+timeframe built on them; indicator frames are extended with the new bars
+instead of being recomputed, and only tickers whose bars or quote changed
+are re-evaluated against the screens. Quotes are refetched every poll
+rather than served from the CACHE_DURATION info cache. Membership changes
+are emitted as 'enter' / 'exit' events to one or more sinks.
+
+Examples:
+    python watch.py --screens screens.yaml
+    python watch.py --screens screens.yaml --interval 60 --sink file:alerts.jsonl
+    python watch.py --screens screens.yaml --sink webhook:http://localhost:9000/hook --once
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import requests
+
+from config import get_config
+from data_cache import prune_cache_dir
+from main import UsageError, resolve_tickers
+from rate_limiter import ThrottledError
+from screens import load_screens
+from sector_metrics import add_sector_metrics
+from stock_screener import (TECHNICAL_FIELDS, check_finviz, compute_technicals,
+                            extract_fundamentals, fetch_info, screen_mask, uses_relative)
+from timeframes import TIMEFRAMES, cached_base_bars, series_key, slice_bars
+from validation import check_quote
+
+DEFAULT_INTERVAL = 300
+
+
+class LogSink:
+    """Print events as one line each."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def emit(self, event):
+        print(f"{event['time']} {event['event'].upper():5} {event['screen']}: {event['ticker']} "
+              f"({event['timeframe']} bar {event['bar']}, price {event['price']})",
+              file=self.stream, flush=True)
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Append events to a JSON Lines file."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def emit(self, event):
+        self.file.write(json.dumps(event) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class WebhookSink:
+    """POST each event as JSON to a URL; delivery failures are logged, not retried."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def emit(self, event):
+        try:
+            requests.post(self.url, json=event, timeout=self.timeout).raise_for_status()
+        except requests.RequestException as e:
+            print(f"Webhook delivery failed for {event['ticker']} ({event['screen']}): {e}",
+                  file=sys.stderr)
+
+    def close(self):
+        pass
+
+
+def make_sink(spec):
+    """Build a sink from 'log', 'file:PATH' or 'webhook:URL'."""
+    kind, _, target = spec.partition(':')
+    if kind == 'log' and not target:
+        return LogSink()
+    if kind == 'file' and target:
+        return FileSink(target)
+    if kind == 'webhook' and target:
+        return WebhookSink(target)
+    raise ValueError(f"Unknown sink '{spec}' (expected log, file:PATH or webhook:URL)")
+
+
+def _scalar(value):
+    return None if value is None or pd.isna(value) else round(float(value), 4)
+
+
+class Watcher:
+    """
+    Incremental screen membership over a fixed universe
+
+    Args:
+        screens (dict): Screen name -> parameters
+        tickers (list): Universe to watch
+        sinks (list): Objects with emit(event)
+        workers (int): Tickers refreshed concurrently (defaults to SCREENER_WORKERS)
+        emit_initial (bool): Emit 'enter' events for the first poll's members
+    """
+
+    def __init__(self, screens, tickers, sinks, workers=None, emit_initial=False):
+        self.screens = screens
+        self.tickers = list(tickers)
+        self.sinks = sinks
+        self.workers = workers or get_config().workers
+        self.emit_initial = emit_initial
+
+        self.timeframes = sorted({params.get('timeframe', '1d') for params in screens.values()})
+        # One refresh per base interval serves every timeframe resampled from it
+        self.bases = {}
+        for timeframe in self.timeframes:
+            self.bases.setdefault(TIMEFRAMES[timeframe]['base'], []).append(timeframe)
+
+        self.metrics = {timeframe: {} for timeframe in self.timeframes}
+        self.bar_times = {}
+        self.fingerprints = {}
+        self.members = {name: set() for name in screens}
+        self.polls = 0
+        # Oldest quote a poll may use (set from the poll interval by run())
+        self.quote_max_age = DEFAULT_INTERVAL / 2
+
+    def refresh_ticker(self, symbol):
+        """
+        Refresh one ticker's data and recompute the timeframes that changed
+
+        Returns:
+            dict: timeframe -> metrics dict (None if the ticker has no quote)
+            for each timeframe whose bars or fundamentals changed
+        """
+        info = fetch_info(symbol, max_age=self.quote_max_age)
+        if not info or 'currentPrice' not in info:
+            return {timeframe: None for timeframe in self.timeframes
+                    if symbol in self.metrics[timeframe]}
+
+        fundamentals = extract_fundamentals(info)
+        changed = {}
+        for base, timeframes in self.bases.items():
+            bars = cached_base_bars(symbol, base, max_age=0)
+            for timeframe in timeframes:
+                hist = slice_bars(bars, timeframe)
+                last = (hist.index[-1], float(hist['Close'].iloc[-1])) if len(hist) else None
+                fingerprint = (last, tuple(fundamentals.values()))
+                if self.fingerprints.get((symbol, timeframe)) == fingerprint:
+                    continue
+                self.fingerprints[(symbol, timeframe)] = fingerprint
+                self.bar_times[(symbol, timeframe)] = last[0] if last else None
+
+                metrics = dict(fundamentals, **{field: np.nan for field in TECHNICAL_FIELDS})
+                if len(hist) >= 50 and metrics['price'] and check_quote(symbol, metrics['price'], hist):
+                    metrics.update(compute_technicals(hist, metrics['price'],
+                                                      symbol=series_key(symbol, timeframe)))
+                changed[timeframe] = metrics
+        return changed
+
+    def _refresh(self):
+        """Refresh the universe; returns timeframe -> set of tickers that changed."""
+        affected = {timeframe: set() for timeframe in self.timeframes}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.refresh_ticker, symbol): symbol for symbol in self.tickers}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    changed = future.result()
+                except ThrottledError:
+                    print(f"Throttled while refreshing {symbol}; keeping its last state", file=sys.stderr)
+                    continue
+                except Exception as e:
+                    print(f"Error refreshing {symbol}: {e}", file=sys.stderr)
+                    continue
+                for timeframe, metrics in changed.items():
+                    if metrics is None:
+                        self.metrics[timeframe].pop(symbol, None)
+                    else:
+                        self.metrics[timeframe][symbol] = metrics
+                    affected[timeframe].add(symbol)
+        return affected
+
+    def _passing(self, name, params, symbols):
+        """Affected tickers that pass a screen."""
+        table = self.metrics[params.get('timeframe', '1d')]
+        rows = [symbol for symbol in symbols if symbol in table]
+        if not rows:
+            return set()
+        stages = ('fundamental', 'technical')
+        if uses_relative(params):
+            # Sector statistics come from the whole universe, not just the changed rows
+            frame = add_sector_metrics(pd.DataFrame.from_dict(table, orient='index')).loc[rows]
+            stages += ('relative',)
+        else:
+            frame = pd.DataFrame.from_dict({symbol: table[symbol] for symbol in rows}, orient='index')
+        mask = screen_mask(frame, params, stages=stages)
+        passing = set(frame.index[np.asarray(mask, dtype=bool)])
+        if params.get('enable_finviz', False):
+            kept = set()
+            for symbol in passing:
+                try:
+                    if check_finviz(symbol):
+                        kept.add(symbol)
+                except ThrottledError:
+                    # Keep the previous membership until Finviz answers
+                    if symbol in self.members[name]:
+                        kept.add(symbol)
+            passing = kept
+        return passing
+
+    def _event(self, kind, name, params, symbol):
+        timeframe = params.get('timeframe', '1d')
+        metrics = self.metrics[timeframe].get(symbol, {})
+        bar = self.bar_times.get((symbol, timeframe))
+        return {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'event': kind,
+            'screen': name,
+            'ticker': symbol,
+            'timeframe': timeframe,
+            'bar': bar.isoformat() if bar is not None else None,
+            'price': _scalar(metrics.get('price')),
+            'rsi': _scalar(metrics.get('rsi')),
+            'return_5d': _scalar(metrics.get('return_5d')),
+        }
+
+    def poll(self):
+        """
+        Refresh data once and re-evaluate every screen on the changed tickers
+
+        Returns:
+            list: Events emitted by this poll
+        """
+        affected = self._refresh()
+        emit = self.polls > 0 or self.emit_initial
+        self.polls += 1
+
+        events = []
+        for name, params in self.screens.items():
+            symbols = affected[params.get('timeframe', '1d')]
+            if not symbols:
+                continue
+            if uses_relative(params):
+                # Any change moves the sector statistics, so re-check every ticker
+                symbols = symbols | set(self.metrics[params.get('timeframe', '1d')]) | self.members[name]
+            passing = self._passing(name, params, symbols)
+            before = self.members[name]
+            entered = passing - before
+            exited = (before & symbols) - passing
+            self.members[name] = (before - symbols) | passing
+            if emit:
+                events += [self._event('enter', name, params, s) for s in sorted(entered)]
+                events += [self._event('exit', name, params, s) for s in sorted(exited)]
+
+        for event in events:
+            for sink in self.sinks:
+                sink.emit(event)
+        prune_cache_dir()
+        return events
+
+    def run(self, interval=DEFAULT_INTERVAL, polls=None):
+        """Poll every interval seconds until interrupted (or for a number of polls)."""
+        # Half the interval, so a quote cached at the start of one poll is refetched by the next
+        self.quote_max_age = interval / 2
+        try:
+            while polls is None or self.polls < polls:
+                started = time.monotonic()
+                events = self.poll()
+                print(f"Poll {self.polls}: {len(events)} event(s); members "
+                      + ', '.join(f"{name}={len(m)}" for name, m in self.members.items()),
+                      file=sys.stderr)
+                if polls is not None and self.polls >= polls:
+                    break
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for sink in self.sinks:
+                sink.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='watch.py',
+        description="Re-screen the universe as new bars arrive and report screen entries and exits.",
+    )
+    parser.add_argument('--screens', metavar='FILE', required=True,
+                        help="YAML file of named screens (see screens.py)")
+    parser.add_argument('--tickers', metavar='LIST',
+                        help="Comma-separated tickers or a CSV file with a 'Ticker' column")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f"Seconds between polls (default: {DEFAULT_INTERVAL})")
+    parser.add_argument('--sink', action='append', metavar='SPEC',
+                        help="log, file:PATH or webhook:URL (repeatable; default: log)")
+    parser.add_argument('--workers', type=int,
+                        help="Tickers refreshed concurrently (default: SCREENER_WORKERS)")
+    parser.add_argument('--emit-initial', action='store_true',
+                        help="Emit 'enter' events for the members found by the first poll")
+    parser.add_argument('--once', action='store_true', help="Poll once and exit")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        screens = load_screens(args.screens)
+        tickers = resolve_tickers(args.tickers)
+        sinks = [make_sink(spec) for spec in (args.sink or ['log'])]
+        if args.interval <= 0:
+            raise UsageError("--interval must be positive")
+    except (UsageError, ValueError, OSError) as e:
+        parser.print_usage(sys.stderr)
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return 2
+
+    watcher = Watcher(screens, tickers, sinks, workers=args.workers,
+                      emit_initial=args.emit_initial or args.once)
+    watcher.run(interval=args.interval, polls=1 if args.once else None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())